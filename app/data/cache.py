@@ -0,0 +1,148 @@
+"""
+cache.py - In-memory read cache for the app/data query helpers.
+
+Includes:
+- cached_read(): serve a query result from memory until its tables change
+- bump_table_version(): called by insert/update/delete helpers after a commit
+- cache_stats() / clear_cache() for monitoring and tests
+
+Entries are keyed by query function + arguments + the current data version
+of every table the query reads, so a write never has to know which queries
+depend on it: bumping the table's version makes those keys unreachable.
+
+Versions come from the table_versions counters (bumped by triggers, see
+get_table_versions), so writes made by other processes invalidate too.
+The in-process counter bumped by the CRUD helpers also evicts entries
+right away and covers databases without table_versions.
+"""
+
+# Import required modules
+import threading
+from collections import OrderedDict
+from app.data.db import get_table_versions
+
+# ----------------- SETTINGS -----------------
+CACHE_MAX_ENTRIES = 256  # LRU bound on stored results
+
+_lock = threading.Lock()
+_entries = OrderedDict()   # key -> (db, tables, result)
+_table_versions = {}       # (db, table) -> int
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+
+# ----------------- HELPERS -----------------
+def _database_key(conn):
+    """Return the file behind a connection (in-memory DBs are per connection)."""
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    return path or f":memory:{id(conn)}"
+
+
+def _copy_result(result):
+    """Copy DataFrames (or tuples of them) so callers can mutate freely."""
+    if isinstance(result, tuple):
+        return tuple(_copy_result(r) for r in result)
+    if hasattr(result, "copy"):
+        return result.copy()
+    return result
+
+
+def _freeze(value):
+    """Make list/dict arguments usable as part of a cache key."""
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+# ----------------- VERSIONS -----------------
+def get_table_version(conn, table_name):
+    """Return the in-process write counter of a table (0 until first write)."""
+    with _lock:
+        return _table_versions.get((_database_key(conn), table_name), 0)
+
+
+def bump_table_version(conn, *table_names):
+    """
+    Mark tables as changed so cached reads of them miss next time.
+
+    Call after the write has been committed.
+
+    Args:
+        conn: Connection the write was made on
+        *table_names: Tables that were modified
+    """
+    db = _database_key(conn)
+    with _lock:
+        for table_name in table_names:
+            key = (db, table_name)
+            _table_versions[key] = _table_versions.get(key, 0) + 1
+
+        # Drop entries that can no longer be hit instead of waiting for LRU
+        stale = [k for k, (entry_db, tables, _) in _entries.items()
+                 if entry_db == db and set(tables) & set(table_names)]
+        for k in stale:
+            del _entries[k]
+        _stats["invalidations"] += len(stale)
+
+
+# ----------------- READS -----------------
+def cached_read(conn, tables, func, *args, **kwargs):
+    """
+    Run func(conn, *args, **kwargs) through the cache.
+
+    Args:
+        conn: Database connection
+        tables: Table names the query reads from
+        func: Query helper, e.g. get_all_incidents
+        *args, **kwargs: Passed on to func (must be hashable or list/dict)
+
+    Returns:
+        A copy of the cached (or freshly queried) result
+    """
+    if isinstance(tables, str):
+        tables = (tables,)
+    tables = tuple(tables)
+    db = _database_key(conn)
+    db_versions = get_table_versions(conn, tables)  # one indexed read
+
+    with _lock:
+        versions = tuple((db_versions.get(t), _table_versions.get((db, t), 0)) for t in tables)
+        key = (db, func.__module__, func.__qualname__,
+               _freeze(args), _freeze(kwargs), tables, versions)
+        entry = _entries.get(key)
+        if entry is not None:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return _copy_result(entry[2])
+        _stats["misses"] += 1
+
+    result = func(conn, *args, **kwargs)
+
+    with _lock:
+        _entries[key] = (db, tables, result)
+        _entries.move_to_end(key)
+        while len(_entries) > CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+            _stats["evictions"] += 1
+
+    return _copy_result(result)
+
+
+# ----------------- MONITORING -----------------
+def cache_stats():
+    """Return hit/miss counters, hit ratio and current size."""
+    with _lock:
+        stats = dict(_stats)
+        stats["entries"] = len(_entries)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    return stats
+
+
+def clear_cache():
+    """Drop all cached results and reset the counters."""
+    with _lock:
+        _entries.clear()
+        for name in _stats:
+            _stats[name] = 0
@@ -0,0 +1,162 @@
+"""
+chatwriter.py - Write-behind queue for chat_history.
+
+Includes:
+- queue_message(): hand a chat message to the writer thread and return
+- flush_chat_writes(): wait until everything queued is on disk
+- chat_writer_stats(): counters for monitoring
+
+Chat turns used to commit (and fsync) once per message. Messages are now
+put on a bounded queue and a single background thread inserts them in
+batches, one transaction per batch and database. A single writer
+draining a FIFO queue keeps the insert order, so messages of each
+(user_id, domain) get increasing ids in the order they were sent. The
+queue is flushed at exit; readers that need their own writes (loading
+or clearing a chat) call flush_chat_writes() first.
+"""
+
+# Import required modules
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+
+# ----------------- SETTINGS -----------------
+CHAT_QUEUE_SIZE = 10000     # Messages waiting for the writer; put() blocks beyond this
+CHAT_BATCH_SIZE = 500       # Messages per transaction at most
+CHAT_BATCH_WAIT = 0.05      # Seconds the writer waits for more messages to batch
+CHAT_WRITE_RETRIES = 3      # Attempts per batch before its messages count as failed
+
+_queue = queue.Queue(maxsize=CHAT_QUEUE_SIZE)
+_counters = {"queued": 0, "written": 0, "batches": 0, "failed": 0}
+_lock = threading.Lock()
+_writer = None
+_FLUSH = object()  # Queued by flush_chat_writes() so the writer stops waiting for more
+
+INSERT_CHAT_SQL = """
+    INSERT INTO chat_history (user_id, domain, role, content, timestamp)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def _start_writer():
+    global _writer
+    with _lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_write_messages, name="chat-writer", daemon=True)
+            _writer.start()
+
+
+# ----------------- QUEUE -----------------
+def queue_message(db_path, user_id, domain, role, content):
+    """
+    Queue a chat message for the writer thread.
+
+    The timestamp is taken now, so it reflects when the message was sent
+    rather than when the batch was committed. Blocks only if the queue is
+    full (the disk is far behind), which bounds memory.
+
+    Args:
+        db_path: Database file the message belongs to
+        user_id: Owner of the conversation
+        domain: Chat domain
+        role: 'user', 'assistant' or 'system'
+        content: Message text
+    """
+    _start_writer()
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+    _queue.put((str(db_path), (user_id, domain, role, content, timestamp)))
+    with _lock:
+        _counters["queued"] += 1
+
+
+def _write_messages():
+    """Writer thread: insert queued messages in batches, in queue order."""
+    connections = {}  # db_path -> autocommit connection owned by this thread
+    while True:
+        batch = [_queue.get()]
+        deadline = time.monotonic() + CHAT_BATCH_WAIT
+        while len(batch) < CHAT_BATCH_SIZE and batch[-1] is not None and batch[-1] is not _FLUSH:
+            try:
+                batch.append(_queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+
+        stop = batch[-1] is None
+        by_db = {}  # dicts keep insertion order, so queue order is kept per database
+        for item in batch:
+            if item is not None and item is not _FLUSH:
+                by_db.setdefault(item[0], []).append(item[1])
+
+        for db_path, rows in by_db.items():
+            for attempt in range(1, CHAT_WRITE_RETRIES + 1):
+                conn = connections.get(db_path)
+                try:
+                    if conn is None:
+                        conn = connections[db_path] = sqlite3.connect(
+                            db_path, timeout=30, isolation_level=None)
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.executemany(INSERT_CHAT_SQL, rows)
+                    conn.execute("COMMIT")
+                    with _lock:
+                        _counters["written"] += len(rows)
+                        _counters["batches"] += 1
+                    break
+                except sqlite3.Error as e:
+                    if conn is not None and conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    if attempt == CHAT_WRITE_RETRIES:
+                        print(f"⚠️ Could not save {len(rows)} chat messages to '{db_path}': {e}")
+                        with _lock:
+                            _counters["failed"] += len(rows)
+                    else:
+                        time.sleep(0.1 * attempt)
+
+        for _ in batch:
+            _queue.task_done()
+        if stop:
+            break
+
+    for conn in connections.values():
+        conn.close()
+
+
+# ----------------- FLUSH / STATS -----------------
+def flush_chat_writes(timeout=5.0):
+    """
+    Wait until every queued message has been written (or has failed).
+
+    Returns immediately when nothing is queued.
+
+    Returns:
+        bool: True if the queue drained within the timeout
+    """
+    if not _queue.unfinished_tasks:
+        return True
+    try:
+        _queue.put_nowait(_FLUSH)
+    except queue.Full:
+        pass  # a full queue is written without waiting anyway
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks:
+        if time.monotonic() >= deadline or _writer is None or not _writer.is_alive():
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def chat_writer_stats():
+    """Return the writer counters plus the number of messages still queued."""
+    with _lock:
+        stats = dict(_counters)
+    stats["pending"] = _queue.unfinished_tasks
+    return stats
+
+
+@atexit.register
+def _stop_writer():
+    """Write what is still queued, then stop the writer thread."""
+    if _writer is not None and _writer.is_alive():
+        _queue.put(None)
+        _writer.join(timeout=10)
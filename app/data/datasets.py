@@ -8,6 +8,15 @@ datasets.py - Provide helper functions for managing user in daabase
 # Import required modules
 import pandas as pd
 import sqlite3
+from app.data.db import (
+    fetch_page, count_rows, build_filter, filter_rows,
+    write_transaction, as_row_tuples, insert_many, update_many, delete_many, NATURAL_KEYS
+)
+from app.data.cache import bump_table_version
+
+# Argument order of insert_dataset(), used for batch rows
+DATASET_COLUMNS = ("dataset_name", "source", "category", "last_updated",
+                   "record_count", "file_size_mb", "created_at")
 
 # 🌟 Add a new dataset
 def insert_dataset(conn, dataset_name, source, category, last_updated,
@@ -42,6 +51,7 @@ def insert_dataset(conn, dataset_name, source, category, last_updated,
             record_count, file_size_mb, created_at
         ))
         conn.commit()
+        bump_table_version(conn, "datasets_metadata")
 
         # return row count 
         return cursor.lastrowid
@@ -73,6 +83,54 @@ def get_all_datasets(conn):
         print(f"Error retrieving datasets: {e}")
         return pd.DataFrame()
     
+# Columns the filter widgets can filter on
+DATASET_FILTER_COLUMNS = ("category", "source", "record_count", "file_size_mb", "last_updated")
+# Columns the record views can sort by (each backed by an index)
+DATASET_SORT_KEYS = ("id", "dataset_name", "last_updated")
+
+# 🌟 Retrieve one page of datasets
+def get_datasets_page(conn, page_size=50, cursor=None, sort_key="id", descending=False,
+                      filters=None):
+    """
+    Get one page of datasets using keyset pagination.
+
+    Args:
+        conn: Database connection
+        page_size: Rows per page
+        cursor: next_cursor from the previous page (None for the first page)
+        sort_key: One of DATASET_SORT_KEYS
+        descending: Sort direction
+        filters: Optional filters (see db.build_filter)
+
+    Returns:
+        tuple: (pandas.DataFrame, next_cursor or None)
+    """
+    if sort_key not in DATASET_SORT_KEYS:
+        raise ValueError(f"Cannot sort datasets by '{sort_key}'")
+    where, params = build_filter(filters, DATASET_FILTER_COLUMNS)
+    return fetch_page(conn, "datasets_metadata", sort_key, page_size, cursor, descending, where, params)
+
+# 🌟 Count datasets
+def count_datasets(conn, filters=None):
+    """Return the number of datasets (matching filters, if given)."""
+    where, params = build_filter(filters, DATASET_FILTER_COLUMNS)
+    return count_rows(conn, "datasets_metadata", where, params)
+
+# 🌟 Filter datasets in SQL
+def filter_datasets(conn, filters):
+    """
+    Get the datasets matching the filters, evaluated by SQLite.
+
+    Args:
+        conn: Database connection
+        filters: dict of column -> list (IN), {"min", "max"} range or
+                 {"start", "end"} date window; see db.build_filter
+
+    Returns:
+        pandas.DataFrame: Matching datasets
+    """
+    return filter_rows(conn, "datasets_metadata", filters, DATASET_FILTER_COLUMNS)
+
 # 🌟 Update the record count
 def update_dataset(conn, dataset_name, new_count):
     """
@@ -85,6 +143,8 @@ def update_dataset(conn, dataset_name, new_count):
             (new_count, dataset_name)
         )
         conn.commit()
+        if cursor.rowcount:  # only a real change invalidates cached reads
+            bump_table_version(conn, "datasets_metadata")
 
         print(f"🔄 Dataset '{dataset_name}' record count updated to {new_count}.")
         return cursor.rowcount
@@ -106,6 +166,8 @@ def delete_dataset(conn, dataset_name):
             (dataset_name,)
         )
         conn.commit()
+        if cursor.rowcount:  # only a real change invalidates cached reads
+            bump_table_version(conn, "datasets_metadata")
 
         print(f"🗑️ Dataset '{dataset_name}' deleted successfully.")
         return cursor.rowcount
@@ -114,6 +176,87 @@ def delete_dataset(conn, dataset_name):
         print(f"❌ Error deleting dataset '{dataset_name}': {e}")
         return 0
 
+# 🌟 Add many datasets in one transaction
+def insert_datasets_many(conn, datasets):
+    """
+    Insert many datasets with one executemany inside one transaction.
+
+    Args:
+        conn: Database connection
+        datasets: Iterable of tuples in insert_dataset() argument order
+                  (dataset_name, source, category, last_updated, record_count,
+                  file_size_mb[, created_at]) or dicts with those keys
+
+    Returns:
+        list: New id per input row; None for rows whose (dataset_name,
+        source, last_updated) already exists or repeats in the batch,
+        or that leave source/last_updated empty. All None if a row was
+        invalid or the batch was rolled back.
+    """
+    datasets = list(datasets)
+    try:
+        rows = as_row_tuples(datasets, DATASET_COLUMNS)
+        with write_transaction(conn):
+            ids = insert_many(conn, "datasets_metadata", DATASET_COLUMNS, rows,
+                              NATURAL_KEYS["datasets_metadata"])
+    except (sqlite3.Error, ValueError) as e:
+        print(f"❌ Batch insert of {len(datasets)} datasets failed: {e}")
+        return [None] * len(datasets)
+
+    inserted = sum(new_id is not None for new_id in ids)
+    if inserted:
+        bump_table_version(conn, "datasets_metadata")
+    print(f"✅ Inserted {inserted} of {len(rows)} datasets.")
+    return ids
+
+
+# 🌟 Update the record count of many datasets
+def update_datasets_many(conn, updates):
+    """
+    Update the record_count of many datasets in one transaction.
+
+    Args:
+        conn: Database connection
+        updates: Iterable of (dataset_name, new_count) pairs
+
+    Returns:
+        list: Rows updated (0 or 1) per pair; all 0 on failure
+    """
+    updates = list(updates)
+    try:
+        with write_transaction(conn):
+            outcomes = update_many(conn, "datasets_metadata", "record_count", "dataset_name", updates)
+    except sqlite3.Error as e:
+        print(f"❌ Failed updating record counts for {len(updates)} datasets: {e}")
+        return [0] * len(updates)
+
+    if any(outcomes):
+        bump_table_version(conn, "datasets_metadata")
+    print(f"🔄 Updated record counts of {sum(outcomes)} of {len(updates)} datasets.")
+    return outcomes
+
+
+# 🌟 Delete many datasets
+def delete_datasets_many(conn, dataset_names):
+    """
+    Delete many dataset entries in one transaction.
+
+    Returns:
+        list: Rows deleted (0 or 1) per name; all 0 on failure
+    """
+    dataset_names = list(dataset_names)
+    try:
+        with write_transaction(conn):
+            outcomes = delete_many(conn, "datasets_metadata", "dataset_name", dataset_names)
+    except sqlite3.Error as e:
+        print(f"❌ Error deleting {len(dataset_names)} datasets: {e}")
+        return [0] * len(dataset_names)
+
+    if any(outcomes):
+        bump_table_version(conn, "datasets_metadata")
+    print(f"🗑️ Deleted {sum(outcomes)} of {len(dataset_names)} datasets.")
+    return outcomes
+
 # 📊 Get 3 most recently updated datasets
 def get_top_recent_updates(conn):
     """
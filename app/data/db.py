@@ -1,15 +1,27 @@
 """
 db.py - Provides functions for database functions, e.g.:
     • Connecting to the SQLite database
+    • Sharing pooled connections between pages and services
+    • Batch inserts, updates and deletes in one transaction
     • Loading CSV data into database tables
 """
 
 # -------------------------------
 # Import required libraries
 # -------------------------------
+import atexit
+import base64
+import hashlib
+import json
+import os
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 import pandas as pd
+from app.data.querylog import InstrumentedConnection
+from app.data.chatwriter import queue_message, flush_chat_writes
 
 # -------------------------------
 # Define paths
@@ -17,6 +29,48 @@ import pandas as pd
 DATA_DIR = Path("DATA")
 DB_PATH = DATA_DIR / "intelligence_platform.db"
 
+# -------------------------------
+# Connection pool settings
+# -------------------------------
+POOL_MAX_SIZE = 8   # Maximum open connections per database file
+POOL_TIMEOUT = 10   # Seconds to wait for a free connection
+CSV_CHUNK_SIZE = 50000  # Rows per chunk/transaction when loading CSV files
+BATCH_LOOKUP_SIZE = 500  # Keys per IN (...) lookup in batch writes
+
+# -------------------------------
+# Chat history windows
+# -------------------------------
+CHAT_WINDOW_SIZE = 50   # Messages per tail window / "Load older" page
+CHARS_PER_TOKEN = 4     # Rough token estimate for English text (no tokenizer needed)
+
+# -------------------------------
+# Natural keys for incremental CSV sync (table -> unique key columns)
+# -------------------------------
+NATURAL_KEYS = {
+    "it_tickets": ("ticket_id",),
+    # Dataset names repeat across sources and snapshots
+    "datasets_metadata": ("dataset_name", "source", "last_updated"),
+    "cyber_incidents": ("content_hash",),
+}
+
+# Columns that identify an incident; hashed into cyber_incidents.content_hash
+INCIDENT_HASH_COLUMNS = ("date", "incident_type", "description", "reported_by")
+
+# Tables whose writes bump table_versions (see schema migration 7)
+VERSIONED_TABLES = ("cyber_incidents", "it_tickets", "datasets_metadata", "chat_history")
+
+# -------------------------------
+# Connection profile (PRAGMAs applied to every pooled connection)
+# -------------------------------
+CONNECTION_PROFILE = {
+    "journal_mode": "WAL",     # Readers keep reading while a writer commits
+    "synchronous": "NORMAL",   # Safe with WAL, fsync only at checkpoints
+    "cache_size": -20000,      # Page cache size in KiB (negative value) ~20 MB
+    "mmap_size": 268435456,    # Memory-map up to 256 MB of the file
+    "temp_store": "MEMORY",    # Sorts and temp tables stay in memory
+    "busy_timeout": 5000,      # Milliseconds to wait on a locked database
+}
+
 # ------------------------------------
 # Connect & close the SQLite database
 # ------------------------------------
@@ -33,17 +87,870 @@ def connect_database(db_path=DB_PATH):
     """
     # Handle database connection errors using try-except
     try:
-        return sqlite3.connect(str(db_path))
+        return sqlite3.connect(str(db_path), factory=InstrumentedConnection)
     
     # Handle SQLite errors during database connection
     except sqlite3.Error as e:
          print(f"Error occurred! database not connected {e}")
          return None
 
-def load_all_csv_data(conn, csv_path, table_name):
+def apply_connection_profile(conn, profile=None):
+    """
+    Apply a PRAGMA profile to an open connection.
+
+    Args:
+        conn: Database connection
+        profile: dict of PRAGMA name -> value (defaults to CONNECTION_PROFILE)
+
+    Returns:
+        dict: Value reported by SQLite for each PRAGMA after applying it
+    """
+    if profile is None:
+        profile = CONNECTION_PROFILE
+
+    applied = {}
+    for pragma, value in profile.items():
+        try:
+            row = conn.execute(f"PRAGMA {pragma} = {value}").fetchone()
+            if row is None:
+                row = conn.execute(f"PRAGMA {pragma}").fetchone()
+            applied[pragma] = row[0] if row else None
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not apply PRAGMA {pragma}={value}: {e}")
+    return applied
+
+def explain_query_plan(conn, sql, params=()):
+    """
+    Return the EXPLAIN QUERY PLAN detail lines for a statement.
+
+    Args:
+        conn: Database connection
+        sql: SQL statement to explain
+        params: Parameters for the statement
+
+    Returns:
+        list[str]: One line per plan step, e.g. "SEARCH t USING INDEX ..."
+    """
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return [row[3] for row in rows]
+
+
+def find_full_scans(conn, plan):
+    """
+    Return the plan steps that read a whole table without any index.
+
+    Scans of a covering index or of subqueries/CTEs are not reported.
+    """
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return [
+        step for step in plan
+        if step.startswith("SCAN ") and "USING" not in step
+        and step.split()[1] in tables
+    ]
+
+def get_table_versions(conn, tables=VERSIONED_TABLES):
+    """
+    Return the current change counter of each table in one query.
+
+    The counters live in table_versions and are bumped by triggers, so
+    writes from any process or connection are seen. A cache can compare
+    this vector with the one it stored to know whether to re-query.
+
+    Args:
+        conn: Database connection
+        tables: Table names to look up
+
+    Returns:
+        dict: {table_name: version}; empty if table_versions is missing
+    """
+    tables = tuple(tables)
+    placeholders = ", ".join("?" for _ in tables)
+    try:
+        rows = conn.execute(
+            f"SELECT table_name, version FROM table_versions WHERE table_name IN ({placeholders})",
+            tables
+        ).fetchall()
+    except sqlite3.Error:
+        return {}
+    return dict(rows)
+
+# ------------------------------------
+# Keyset pagination
+# ------------------------------------
+def encode_cursor(values):
+    """Encode the sort values of the last row on a page as an opaque token."""
+    raw = json.dumps(list(values), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(token):
+    """Decode a token from encode_cursor(); None/empty means the first page."""
+    if not token:
+        return None
+    return json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+
+
+def _keyset_segments(sort_key, last_value, last_id, descending):
+    """
+    Return the (condition, params) ranges that follow (last_value, last_id).
+
+    Rows are ordered by (sort_key, id). The non-NULL continuation uses a
+    row-value comparison, which SQLite turns into an index seek. NULL sort
+    values (first when ascending, last when descending) are read as a
+    separate range instead of OR-ing them in, which would force a scan.
+    """
+    if sort_key == "id":
+        return [("id < ?" if descending else "id > ?", [last_id])]
+
+    if descending:
+        if last_value is None:
+            return [(f"{sort_key} IS NULL AND id < ?", [last_id])]
+        return [(f"({sort_key}, id) < (?, ?)", [last_value, last_id]),
+                (f"{sort_key} IS NULL", [])]
+
+    if last_value is None:
+        return [(f"{sort_key} IS NULL AND id > ?", [last_id]),
+                (f"{sort_key} IS NOT NULL", [])]
+    return [(f"({sort_key}, id) > (?, ?)", [last_value, last_id])]
+
+
+def fetch_page(conn, table_name, sort_key="id", page_size=50, cursor=None,
+               descending=False, where=None, params=()):
+    """
+    Fetch one page of a table using keyset (seek) pagination.
+
+    Instead of OFFSET, the next page starts after the (sort_key, id) of the
+    last row returned, so every page costs the same index seek however deep
+    the user scrolls. Callers must validate table_name and sort_key.
+
+    Args:
+        conn: Database connection
+        table_name: Table to read
+        sort_key: Column to order by (id breaks ties)
+        page_size: Rows per page
+        cursor: Token returned as next_cursor by the previous page
+        descending: Sort direction
+        where: Optional extra SQL condition (with ? placeholders)
+        params: Parameters for where
+
+    Returns:
+        tuple: (DataFrame of the page, next_cursor or None on the last page)
+    """
+    position = decode_cursor(cursor)
+    if position is None:
+        segments = [(None, [])]
+    else:
+        segments = _keyset_segments(sort_key, position[0], position[1], descending)
+
+    direction = "DESC" if descending else "ASC"
+    order_by = f"id {direction}" if sort_key == "id" else f"{sort_key} {direction}, id {direction}"
+
+    # Read one extra row to know whether another page exists
+    wanted = page_size + 1
+    frames = []
+    try:
+        for condition, condition_values in segments:
+            conditions = [c for c in (where and f"({where})", condition) if c]
+            sql = f"SELECT * FROM {table_name}"
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            sql += f" ORDER BY {order_by} LIMIT ?"
+
+            frame = pd.read_sql_query(sql, conn, params=[*params, *condition_values, wanted])
+            frames.append(frame)
+            wanted -= len(frame)
+            if wanted <= 0:
+                break
+    except Exception as e:
+        print(f"⚠️ Error fetching page from '{table_name}': {e}")
+        return pd.DataFrame(), None
+
+    frames = [frame for frame in frames if not frame.empty] or frames[:1]
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if len(df) <= page_size:
+        return df, None
+
+    df = df.iloc[:page_size]
+    last = df.iloc[-1]
+    last_value = last[sort_key]
+    if pd.isna(last_value):
+        last_value = None
+    elif hasattr(last_value, "item"):
+        last_value = last_value.item()  # numpy scalar -> plain Python value
+    return df, encode_cursor([last_value, int(last["id"])])
+
+
+# ------------------------------------
+# SQL filters
+# ------------------------------------
+def build_filter(filters, allowed_columns):
+    """
+    Turn filter widget values into a parameterised WHERE clause.
+
+    Each entry of filters maps a column to one of:
+        list / tuple / set        -> column IN (...)   (empty matches nothing)
+        {"min": a, "max": b}      -> a <= column <= b  (either bound optional)
+        {"start": d1, "end": d2}  -> date window, both days inclusive
+        any other value           -> column = value
+    None values are skipped. Conditions are plain comparisons on the
+    column so SQLite can answer them from an index.
+
+    Args:
+        filters: dict of column -> filter value
+        allowed_columns: Columns callers may filter on (guards the SQL)
+
+    Returns:
+        tuple: (where_sql or None, list of params)
+    """
+    conditions, params = [], []
+    for column, value in (filters or {}).items():
+        if column not in allowed_columns:
+            raise ValueError(f"Cannot filter on column '{column}'")
+        if value is None:
+            continue
+
+        if isinstance(value, (list, tuple, set)):
+            values = list(value)
+            if not values:
+                conditions.append("0")  # nothing selected -> no rows
+                continue
+            conditions.append(f"{column} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+
+        elif isinstance(value, dict) and ("start" in value or "end" in value):
+            if value.get("start") is not None:
+                conditions.append(f"{column} >= ?")
+                params.append(str(value["start"]))
+            if value.get("end") is not None:
+                # Before the next day, so times on the end day still match
+                conditions.append(f"{column} < date(?, '+1 day')")
+                params.append(str(value["end"]))
+
+        elif isinstance(value, dict):
+            if value.get("min") is not None:
+                conditions.append(f"{column} >= ?")
+                params.append(value["min"])
+            if value.get("max") is not None:
+                conditions.append(f"{column} <= ?")
+                params.append(value["max"])
+
+        else:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+
+    if not conditions:
+        return None, []
+    return " AND ".join(conditions), params
+
+
+def filter_rows(conn, table_name, filters, allowed_columns):
+    """
+    Return only the rows of a table that match the given filters.
+
+    See build_filter() for the filter format.
+
+    Returns:
+        pandas.DataFrame: Matching rows (empty on error)
+    """
+    where, params = build_filter(filters, allowed_columns)
+    sql = f"SELECT * FROM {table_name}"
+    if where:
+        sql += f" WHERE {where}"
+    try:
+        return pd.read_sql_query(sql, conn, params=params)
+    except Exception as e:
+        print(f"⚠️ Error filtering '{table_name}': {e}")
+        return pd.DataFrame()
+
+
+# ------------------------------------
+# Full-text search
+# ------------------------------------
+def fts_query(text):
+    """
+    Turn free text from a search box into a safe FTS5 MATCH expression.
+
+    Every word is quoted (so characters like - : " or words like AND/NOT
+    are searched for literally) and all words must match. The last word
+    is a prefix so results appear while the user is still typing.
+
+    Returns:
+        str or None: MATCH expression (None if there is nothing to search)
+    """
+    words = [w.replace('"', '""') for w in str(text or "").split()]
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def count_rows(conn, table_name, where=None, params=()):
+    """
+    Count the rows of a table (optionally filtered) for "page X of Y".
+
+    Returns:
+        int: Row count (0 on error)
+    """
+    sql = f"SELECT COUNT(*) FROM {table_name}"
+    if where:
+        sql += f" WHERE {where}"
+    try:
+        return conn.execute(sql, params).fetchone()[0]
+    except sqlite3.Error as e:
+        print(f"⚠️ Error counting rows in '{table_name}': {e}")
+        return 0
+
+# ------------------------------------
+# Batch writes
+# ------------------------------------
+@contextmanager
+def write_transaction(conn):
+    """
+    Run a block of writes as one transaction taken with the write lock.
+
+    Begins IMMEDIATE, commits on success and rolls back on any error. If
+    the caller already has a transaction open, the block runs inside a
+    savepoint instead, so an error undoes only this block's writes and
+    the caller decides when to commit.
+    """
+    own_transaction = not conn.in_transaction
+    conn.execute("BEGIN IMMEDIATE" if own_transaction else "SAVEPOINT write_transaction")
+    try:
+        yield conn
+    except BaseException:
+        if own_transaction:
+            conn.rollback()
+        else:
+            conn.execute("ROLLBACK TO write_transaction")
+            conn.execute("RELEASE write_transaction")
+        raise
+    conn.execute("COMMIT" if own_transaction else "RELEASE write_transaction")
+
+
+def as_row_tuples(rows, columns):
+    """
+    Normalise batch input rows to tuples in column order.
+
+    Rows may be dicts keyed by column or sequences in column order; missing
+    trailing values / keys become None, like the optional arguments of the
+    single-row insert functions.
+
+    Raises:
+        ValueError: If a sequence row has more values than columns
+    """
+    normalised = []
+    for row in rows:
+        if isinstance(row, dict):
+            normalised.append(tuple(row.get(c) for c in columns))
+        else:
+            row = tuple(row)
+            if len(row) > len(columns):
+                raise ValueError(f"Expected at most {len(columns)} values, got {len(row)}")
+            normalised.append(row + (None,) * (len(columns) - len(row)))
+    return normalised
+
+
+def _row_keys(columns, rows, key_column):
+    """
+    Return the key of each row tuple.
+
+    key_column is a column name or a tuple of column names (composite key,
+    returned as tuples). A composite key with a NULL part has no key, as
+    NULLs never match in a UNIQUE index.
+    """
+    if isinstance(key_column, str):
+        key_index = columns.index(key_column)
+        return [row[key_index] for row in rows]
+    indexes = [columns.index(c) for c in key_column]
+    return [
+        None if any(row[i] is None for i in indexes) else tuple(row[i] for i in indexes)
+        for row in rows
+    ]
+
+
+def lookup_keys(conn, table_name, key_column, keys, value_column="id"):
+    """
+    Look up many keys with chunked IN (...) queries.
+
+    key_column may be a tuple of columns; keys are then tuples and are
+    matched as row values.
+
+    Returns:
+        dict: key -> value_column for the keys that exist
+    """
+    found = {}
+    keys = list(dict.fromkeys(k for k in keys if k is not None))
+    composite = not isinstance(key_column, str)
+    for start in range(0, len(keys), BATCH_LOOKUP_SIZE):
+        chunk = keys[start:start + BATCH_LOOKUP_SIZE]
+        if not composite:
+            placeholders = ", ".join("?" for _ in chunk)
+            found.update(conn.execute(
+                f"SELECT {key_column}, {value_column} FROM {table_name} "
+                f"WHERE {key_column} IN ({placeholders})", chunk
+            ).fetchall())
+            continue
+
+        # IN (SELECT ... FROM (VALUES ...)) is searched on the index;
+        # a bare IN (VALUES ...) of row values scans the table
+        key_sql = ", ".join(key_column)
+        value_sql = ", ".join(f"column{i}" for i in range(1, len(key_column) + 1))
+        row_placeholder = "(" + ", ".join("?" for _ in key_column) + ")"
+        rows = conn.execute(
+            f"SELECT {key_sql}, {value_column} FROM {table_name} "
+            f"WHERE ({key_sql}) IN (SELECT {value_sql} FROM "
+            f"(VALUES {', '.join(row_placeholder for _ in chunk)}))",
+            [value for key in chunk for value in key]
+        ).fetchall()
+        found.update((row[:-1], row[-1]) for row in rows)
+    return found
+
+
+def insert_many(conn, table_name, columns, rows, key_column):
+    """
+    Insert rows with one executemany, skipping keys that already exist.
+
+    Must run inside write_transaction() so the existence check and the
+    insert see the same data. Errors are raised to the caller.
+
+    Args:
+        conn: Database connection
+        table_name: Table to insert into
+        columns: Column names, in the order of each row tuple
+        rows: Row tuples (see as_row_tuples)
+        key_column: Unique column identifying a row, or a tuple of
+                    columns for a composite key
+
+    Returns:
+        list: New id per input row, None for rows without a key, whose
+        key already existed or appeared earlier in the batch
+    """
+    keys = _row_keys(columns, rows, key_column)
+    existing = lookup_keys(conn, table_name, key_column, keys)
+
+    first_row = {}  # key -> index of the row that inserts it
+    for i, key in enumerate(keys):
+        if key is not None and key not in existing and key not in first_row:
+            first_row[key] = i
+
+    if first_row:
+        placeholders = ", ".join("?" for _ in columns)
+        conn.executemany(
+            f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})",
+            (rows[i] for i in first_row.values())
+        )
+    new_ids = lookup_keys(conn, table_name, key_column, first_row)
+    return [new_ids.get(key) if first_row.get(key) == i else None for i, key in enumerate(keys)]
+
+
+def update_many(conn, table_name, column, key_column, updates):
+    """
+    Set one column on many rows with a single executemany.
+
+    Must run inside write_transaction(). Errors are raised to the caller.
+
+    Args:
+        updates: (key, new_value) pairs
+
+    Returns:
+        list: Rows updated (0 or 1) per input pair
+    """
+    updates = list(updates)
+    existing = lookup_keys(conn, table_name, key_column, (k for k, _ in updates))
+    conn.executemany(
+        f"UPDATE {table_name} SET {column} = ? WHERE {key_column} = ?",
+        ((value, key) for key, value in updates if key in existing)
+    )
+    return [int(key in existing) for key, _ in updates]
+
+
+def delete_many(conn, table_name, key_column, keys):
+    """
+    Delete many rows with a single executemany.
+
+    Must run inside write_transaction(). Errors are raised to the caller.
+
+    Returns:
+        list: Rows deleted (0 or 1) per input key; a key repeated in the
+        batch counts once
+    """
+    keys = list(keys)
+    existing = lookup_keys(conn, table_name, key_column, keys)
+    conn.executemany(f"DELETE FROM {table_name} WHERE {key_column} = ?",
+                     ((key,) for key in existing))
+
+    deleted = set()
+    outcomes = []
+    for key in keys:
+        outcomes.append(int(key in existing and key not in deleted))
+        deleted.add(key)
+    return outcomes
+
+# ------------------------------------
+# Pooled connections
+# ------------------------------------
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections for a single database file.
+
+    Each thread checks out at most one connection; nested checkouts on the
+    same thread reuse it. Idle connections are health-checked before being
+    handed out, and connections held by threads that have finished (e.g. an
+    old Streamlit script run) are reclaimed automatically.
+    """
+
+    def __init__(self, db_path, max_size=POOL_MAX_SIZE, timeout=POOL_TIMEOUT, profile=None):
+        self.db_path = str(db_path)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.profile = CONNECTION_PROFILE if profile is None else profile
+        self._idle = []      # connections ready to be checked out
+        self._owners = {}    # thread -> [connection, nesting depth]
+        self._open = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "created": 0, "checkouts": 0, "waits": 0, "timeouts": 0,
+            "reclaimed": 0, "discarded": 0,
+        }
+
+    def _new_connection(self):
+        """Open a new connection (usable across threads) and apply the profile."""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               factory=InstrumentedConnection)
+        apply_connection_profile(conn, self.profile)
+        self._open += 1
+        self._stats["created"] += 1
+        return conn
+
+    def _is_healthy(self, conn):
+        """Return True if the connection can still run a query."""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        """Close a broken connection and free its slot."""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        self._open -= 1
+        self._stats["discarded"] += 1
+
+    def _put_back(self, conn):
+        """Return a connection to the idle list, rolling back open work."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.append(conn)
+        except sqlite3.Error:
+            self._discard(conn)
+        self._cond.notify()
+
+    def _reclaim_dead_threads(self):
+        """Take back connections owned by threads that are no longer alive."""
+        for thread in [t for t in self._owners if not t.is_alive()]:
+            conn, _ = self._owners.pop(thread)
+            self._stats["reclaimed"] += 1
+            self._put_back(conn)
+
+    def acquire(self):
+        """
+        Check out a connection for the current thread.
+
+        Returns:
+            sqlite3.Connection: Connection owned by the calling thread
+
+        Raises:
+            sqlite3.OperationalError: If no connection frees up within the timeout
+        """
+        thread = threading.current_thread()
+        with self._cond:
+            owned = self._owners.get(thread)
+            if owned:
+                owned[1] += 1
+                return owned[0]
+
+            deadline = time.monotonic() + self.timeout
+            while True:
+                self._reclaim_dead_threads()
+
+                conn = None
+                while self._idle and conn is None:
+                    candidate = self._idle.pop()
+                    if self._is_healthy(candidate):
+                        conn = candidate
+                    else:
+                        self._discard(candidate)
+
+                if conn is None and self._open < self.max_size:
+                    conn = self._new_connection()
+
+                if conn is not None:
+                    self._owners[thread] = [conn, 1]
+                    self._stats["checkouts"] += 1
+                    return conn
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise sqlite3.OperationalError(
+                        f"connection pool for '{self.db_path}' exhausted ({self.max_size} in use)"
+                    )
+                self._stats["waits"] += 1
+                self._cond.wait(remaining)
+
+    def release(self):
+        """Release the current thread's connection back to the pool."""
+        thread = threading.current_thread()
+        with self._cond:
+            owned = self._owners.get(thread)
+            if not owned:
+                return
+            owned[1] -= 1
+            if owned[1] == 0:
+                del self._owners[thread]
+                self._put_back(owned[0])
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks out and releases a connection."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release()
+
+    def stats(self):
+        """Return a snapshot of pool usage for monitoring."""
+        with self._cond:
+            self._reclaim_dead_threads()
+            return {
+                "db_path": self.db_path,
+                "max_size": self.max_size,
+                "journal_mode": self.profile.get("journal_mode", "DELETE"),
+                "open": self._open,
+                "in_use": len(self._owners),
+                "idle": len(self._idle),
+                **self._stats,
+            }
+
+    def close_all(self):
+        """Close idle connections; connections still checked out are left open."""
+        with self._cond:
+            while self._idle:
+                self._discard(self._idle.pop())
+
+
+# One pool per database file, shared by the whole process
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=DB_PATH, profile=None):
+    """
+    Get (or create) the connection pool for a database file.
+
+    Args:
+        db_path: Path to the database file
+        profile: PRAGMA profile for new connections, used only when the
+                 pool is first created (defaults to CONNECTION_PROFILE)
+
+    Returns:
+        ConnectionPool: Pool shared by every caller using the same file
+    """
+    key = str(Path(db_path).resolve())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(key, profile=profile)
+            _pools[key] = pool
+        return pool
+
+
+def acquire_connection(db_path=DB_PATH):
+    """
+    Check out a pooled connection for the current thread.
+
+    Streamlit pages can call this once per script run; the connection is
+    returned to the pool when the run's thread finishes.
+
+    Returns:
+        sqlite3.Connection: Pooled connection, or None on failure
+    """
+    try:
+        return get_pool(db_path).acquire()
+    except sqlite3.Error as e:
+        print(f"Error occurred! database not connected {e}")
+        return None
+
+
+def release_connection(db_path=DB_PATH):
+    """Release the current thread's pooled connection."""
+    get_pool(db_path).release()
+
+
+@contextmanager
+def pooled_connection(db_path=DB_PATH):
+    """
+    Context manager around a pooled connection.
+
+    Yields:
+        sqlite3.Connection: Pooled connection, or None on failure
+    """
+    conn = acquire_connection(db_path)
+    try:
+        yield conn
+    finally:
+        if conn is not None:
+            release_connection(db_path)
+
+
+def pool_stats():
+    """Return usage statistics for every connection pool in this process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
+
+
+@atexit.register
+def close_all_pools():
+    """Close idle pooled connections (runs automatically at exit)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
+
+
+def _strip_text_columns(chunk):
+    """
+    Strip surrounding whitespace from the text columns of a chunk.
+
+    Works column-wise on object/string columns only; values that are not
+    strings (numbers, NaN) are left as they were.
+    """
+    for column in chunk.select_dtypes(include=["object", "string"]).columns:
+        original = chunk[column]
+        stripped = original.str.strip()
+        chunk[column] = stripped.where(stripped.notna(), original)
+    return chunk
+
+
+def content_hash(*values):
+    """
+    Return a stable SHA-1 hex digest of the given values (None -> empty).
+
+    Used as the natural key of cyber_incidents, which has no business id.
+    """
+    text = "\x1f".join("" if v is None else str(v) for v in values)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _prepare_chunk(chunk, table_name):
+    """Drop the CSV 'id', strip text and add derived key columns."""
+    # Drop 'id' so the table's AUTOINCREMENT assigns it
+    if "id" in chunk.columns:
+        chunk = chunk.drop(columns=["id"])
+
+    chunk = _strip_text_columns(chunk)
+
+    if table_name == "cyber_incidents":
+        key_parts = chunk[list(INCIDENT_HASH_COLUMNS)].astype(object)
+        key_parts = key_parts.where(key_parts.notna(), None)
+        chunk["content_hash"] = [
+            content_hash(*row) for row in key_parts.itertuples(index=False, name=None)
+        ]
+    return chunk
+
+
+def _chunk_rows(chunk):
+    """Yield chunk rows as tuples with NaN -> NULL and plain Python values."""
+    return chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+
+
+def _build_insert_sql(table_name, columns):
+    """
+    Build the INSERT used for CSV loads.
+
+    Tables listed in NATURAL_KEYS get an upsert that only rewrites a row
+    when one of its values actually changed.
+    """
+    placeholders = ", ".join("?" for _ in columns)
+    insert_sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    key = NATURAL_KEYS.get(table_name)
+    if key is None:
+        return insert_sql
+
+    updates = [c for c in columns if c not in key]
+    return (
+        f"{insert_sql} ON CONFLICT({', '.join(key)}) DO UPDATE SET "
+        + ", ".join(f"{c} = excluded.{c}" for c in updates)
+        + " WHERE "
+        + " OR ".join(f"{c} IS NOT excluded.{c}" for c in updates)
+    )
+
+
+def load_csv_in_chunks(conn, csv_path, table_name, chunk_size=CSV_CHUNK_SIZE,
+                       progress_callback=None):
+    """
+    Stream a CSV file into a table without loading it all into memory.
+
+    Each chunk is cleaned and written with executemany inside its own
+    transaction, so memory use depends on chunk_size, not file size.
+    Rows of NATURAL_KEYS tables are upserted on their natural key.
+
+    Args:
+        conn: Database connection
+        csv_path: Path to the CSV file
+        table_name: Target table (CSV headers must match its columns)
+        chunk_size: Rows read, inserted and committed per chunk
+        progress_callback: Optional callable(table_name, rows_loaded)
+                           called after every committed chunk
+
+    Returns:
+        int: Number of CSV rows processed
+    """
+    return _stream_csv(conn, csv_path, table_name, chunk_size, progress_callback)[0]
+
+
+def _stream_csv(conn, csv_path, table_name, chunk_size, progress_callback):
+    """
+    Do the work of load_csv_in_chunks.
+
+    Returns:
+        tuple: (CSV rows processed, rows actually inserted or updated)
+    """
+    insert_sql = None
+    rows_loaded = 0
+    rows_changed = 0
+
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+        chunk = _prepare_chunk(chunk, table_name)
+
+        if insert_sql is None:
+            insert_sql = _build_insert_sql(table_name, list(chunk.columns))
+
+        with conn:
+            # rowcount leaves out rows written by triggers (total_changes doesn't)
+            rows_changed += conn.executemany(insert_sql, _chunk_rows(chunk)).rowcount
+
+        rows_loaded += len(chunk)
+        if progress_callback:
+            progress_callback(table_name, rows_loaded)
+
+    return rows_loaded, rows_changed
+
+
+def load_all_csv_data(conn, csv_path, table_name, chunk_size=CSV_CHUNK_SIZE,
+                      progress_callback=None):
     """
     Load a CSV into a table only if empty.
-    Drops 'id' for autoincrement and commits changes.
+    Streams the file in chunks (see load_csv_in_chunks) and drops 'id'
+    for autoincrement.
     """
     try:
         csv_path = Path(csv_path)
@@ -52,40 +959,124 @@ def load_all_csv_data(conn, csv_path, table_name):
             return 0
 
         cursor = conn.cursor()
-        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-        count = cursor.fetchone()[0]
-        if count > 0:
-            print(f"Table '{table_name}' already has data ({count} rows). Skipping CSV load.")
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {table_name})")
+        if cursor.fetchone()[0]:
+            print(f"Table '{table_name}' already has data. Skipping CSV load.")
             return 0
 
-        df = pd.read_csv(csv_path)
-
-        if "id" in df.columns:
-            df = df.drop(columns=["id"])
-
-        df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-
-        df.to_sql(name=table_name, con=conn, if_exists='append', index=False)
-        conn.commit()  # important!
+        rows_loaded = load_csv_in_chunks(conn, csv_path, table_name,
+                                         chunk_size, progress_callback)
 
         # Reset AUTOINCREMENT only if table was empty
         cursor.execute(f"DELETE FROM sqlite_sequence WHERE name='{table_name}'")
         conn.commit()
 
-        print(f"✅ Successfully loaded '{table_name}' ({len(df)} rows)")
-        return len(df)
+        print(f"✅ Successfully loaded '{table_name}' ({rows_loaded} rows)")
+        return rows_loaded
 
     except Exception as e:
         print(f"⚠️ Error loading '{table_name}' from '{csv_path}': {e}")
         return 0
 
+# -------------------------------
+# Incremental CSV sync
+# -------------------------------
+def file_fingerprint(path, with_hash=True):
+    """
+    Return (size, mtime_ns, sha256) for a file.
+    The SHA-256 is streamed in 1 MB blocks and skipped if with_hash is False.
+    """
+    stat = os.stat(path)
+    digest = None
+    if with_hash:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(block)
+        digest = sha.hexdigest()
+    return stat.st_size, stat.st_mtime_ns, digest
+
+
+def _record_fingerprint(conn, table_name, source_path, size, mtime_ns, sha256):
+    """Remember the fingerprint of the file last synced into a table."""
+    with conn:
+        conn.execute("""
+            INSERT INTO ingest_fingerprints (table_name, source_path, size, mtime_ns, sha256, synced_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(table_name, source_path) DO UPDATE SET
+                size = excluded.size, mtime_ns = excluded.mtime_ns,
+                sha256 = excluded.sha256, synced_at = excluded.synced_at
+        """, (table_name, source_path, size, mtime_ns, sha256))
+
+
+def sync_csv_data(conn, csv_path, table_name, chunk_size=CSV_CHUNK_SIZE,
+                  progress_callback=None):
+    """
+    Incrementally sync a CSV into a table using its natural key.
+
+    New rows are inserted and rows whose values changed are updated with
+    INSERT ... ON CONFLICT DO UPDATE; identical rows are not rewritten.
+    The file's size/mtime/SHA-256 are recorded so an unchanged file is
+    skipped from a single fingerprint lookup.
+
+    Args:
+        conn: Database connection
+        csv_path: Path to the CSV file
+        table_name: One of NATURAL_KEYS
+        chunk_size: Rows per chunk/transaction
+        progress_callback: Optional callable(table_name, rows_processed)
+
+    Returns:
+        int: Number of CSV rows inserted or updated (rows the rollup,
+             full-text search and table version triggers write are not counted)
+    """
+    try:
+        csv_path = Path(csv_path)
+        if not csv_path.exists():
+            print(f"'{csv_path}' not found")
+            return 0
+
+        if table_name not in NATURAL_KEYS:
+            print(f"⚠️ No natural key defined for '{table_name}'. Skipping sync.")
+            return 0
+        source_path = str(csv_path.resolve())
+
+        # O(1) check: same size and mtime as the last sync -> nothing to do
+        size, mtime_ns, _ = file_fingerprint(csv_path, with_hash=False)
+        previous = conn.execute(
+            "SELECT size, mtime_ns, sha256 FROM ingest_fingerprints "
+            "WHERE table_name = ? AND source_path = ?",
+            (table_name, source_path)
+        ).fetchone()
+        if previous and previous[0] == size and previous[1] == mtime_ns:
+            return 0
+
+        # Touched but identical content -> just refresh the fingerprint
+        size, mtime_ns, sha256 = file_fingerprint(csv_path)
+        if previous and previous[2] == sha256:
+            _record_fingerprint(conn, table_name, source_path, size, mtime_ns, sha256)
+            return 0
+
+        _, changed = _stream_csv(conn, csv_path, table_name, chunk_size, progress_callback)
+        _record_fingerprint(conn, table_name, source_path, size, mtime_ns, sha256)
+
+        print(f"🔄 Synced '{table_name}' from '{csv_path.name}' ({changed} rows inserted/updated)")
+        return changed
+
+    except Exception as e:
+        print(f"⚠️ Error syncing '{table_name}' from '{csv_path}': {e}")
+        return 0
+
 # -------------------------------
 # Save a chat message
 # -------------------------------
 def save_message(conn, username, domain, role, content):
     """
     Save a chat message directly using username.
+
+    Waits for queued messages first so they keep their order.
     """
+    flush_chat_writes()
     try:
         cursor = conn.cursor()
         cursor.execute("""
@@ -96,6 +1087,20 @@ def save_message(conn, username, domain, role, content):
     except sqlite3.Error as e:
         print(f"⚠️ Error saving message: {e}")
 
+
+def save_message_async(conn, username, domain, role, content):
+    """
+    Save a chat message through the write-behind queue (see chatwriter.py).
+
+    Returns without waiting for the disk. In-memory databases cannot be
+    shared with the writer thread, so they are written directly.
+    """
+    db_path = getattr(conn, "db_path", ":memory:")
+    if db_path == ":memory:" or db_path.startswith("file::memory:"):
+        save_message(conn, username, domain, role, content)
+        return
+    queue_message(db_path, username, domain, role, content)
+
 # -------------------------------
 # Load chat messages
 # -------------------------------
@@ -104,6 +1109,7 @@ def load_messages(conn, username, domain):
     Load chat messages for a given username and domain.
     Returns list of dicts [{"role": ..., "content": ...}, ...]
     """
+    flush_chat_writes()  # include messages still in the write-behind queue
     try:
         cursor = conn.cursor()
         cursor.execute("""
@@ -115,4 +1121,87 @@ def load_messages(conn, username, domain):
         return [{"role": r[0], "content": r[1]} for r in rows]
     except sqlite3.Error as e:
         print(f"⚠️ Error loading messages: {e}")
-        return []
\ No newline at end of file
+        return []
+
+# -------------------------------
+# Load a window of chat messages
+# -------------------------------
+def estimate_tokens(text):
+    """Estimate the tokens of a text as one per CHARS_PER_TOKEN characters."""
+    return -(-len(text or "") // CHARS_PER_TOKEN)
+
+
+def load_recent_messages(conn, username, domain, limit=CHAT_WINDOW_SIZE, before_id=None,
+                         max_tokens=None):
+    """
+    Load the newest messages of a chat (a tail window), oldest first.
+
+    Rows are read newest-first along idx_chat_history_user_domain_id and
+    reading stops as soon as the window is full, so the cost depends on
+    the window, not on the length of the conversation.
+
+    Args:
+        conn: Database connection
+        username: Owner of the chat
+        domain: Chat domain
+        limit: Most messages to return (None = no limit)
+        before_id: Only messages older than this id ("Load older")
+        max_tokens: Stop before the estimated tokens exceed this budget;
+                    the newest message is always returned
+
+    Returns:
+        tuple: (list of {"id", "role", "content"}, True if older messages exist)
+    """
+    flush_chat_writes()  # include messages still in the write-behind queue
+    sql = "SELECT id, role, content FROM chat_history WHERE user_id = ? AND domain = ?"
+    params = [username, domain]
+    if before_id is not None:
+        sql += " AND id < ?"
+        params.append(before_id)
+    sql += " ORDER BY id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit + 1)  # one extra row tells whether older messages exist
+
+    window, tokens, has_older = [], 0, False
+    try:
+        cursor = conn.execute(sql, params)
+        for message_id, role, content in cursor:
+            cost = estimate_tokens(content)
+            full = limit is not None and len(window) >= limit
+            if full or (max_tokens is not None and window and tokens + cost > max_tokens):
+                has_older = True
+                break
+            window.append({"id": message_id, "role": role, "content": content})
+            tokens += cost
+        cursor.close()
+    except sqlite3.Error as e:
+        print(f"⚠️ Error loading messages: {e}")
+        return [], False
+
+    window.reverse()
+    return window, has_older
+
+# -------------------------------
+# Clear chat messages
+# -------------------------------
+def clear_messages(conn, username, domain):
+    """
+    Delete the chat history of a username and domain.
+
+    Queued messages are written first, so none of them reappears after
+    the delete.
+
+    Returns:
+        int: Number of messages deleted
+    """
+    flush_chat_writes()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM chat_history WHERE user_id = ? AND domain = ?",
+                       (username, domain))
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        print(f"⚠️ Error clearing messages: {e}")
+        return 0
@@ -0,0 +1,377 @@
+"""
+generator.py - Synthetic data for scale testing the platform.
+
+Includes:
+- generate_rows(): seeded row stream for one table
+- write_database(): bulk insert straight into the database
+- write_csv(): stream CSV files that load_all_csv_data() can load
+
+Values follow the distributions of the files in DATA (incident types,
+severities, ticket subjects, assignees, dataset categories ...), so the
+generated tables behave like the real ones, only bigger. Every table gets
+its own random stream derived from the seed, so the same seed always
+produces the same rows whatever the other tables' sizes are.
+"""
+
+# Import required modules
+import csv
+import random
+import sqlite3
+from datetime import date, timedelta
+from pathlib import Path
+
+from app.data.db import content_hash, CSV_CHUNK_SIZE
+from app.data.spikes import rebuild_spike_state
+
+# ----------------- SETTINGS -----------------
+DEFAULT_SEED = 42
+START_DATE = date(2023, 1, 1)
+END_DATE = date(2025, 12, 31)
+
+# Rows per table when no size is given
+DEFAULT_COUNTS = {
+    "users": 1_000,
+    "cyber_incidents": 100_000,
+    "it_tickets": 50_000,
+    "datasets_metadata": 20_000,
+    "chat_history": 200_000,
+}
+
+# Tables in load order; chat_history refers to the generated users
+GENERATED_TABLES = ("users", "cyber_incidents", "it_tickets", "datasets_metadata", "chat_history")
+
+# Column order of the generated rows (and of the CSV headers)
+TABLE_COLUMNS = {
+    "users": ("username", "password_hash", "role"),
+    "cyber_incidents": ("date", "incident_type", "severity", "status", "description",
+                        "reported_by", "created_at"),
+    "it_tickets": ("ticket_id", "priority", "status", "category", "subject", "description",
+                   "created_date", "resolved_date", "assigned_to", "created_at"),
+    "datasets_metadata": ("dataset_name", "category", "source", "last_updated",
+                          "record_count", "file_size_mb"),
+    "chat_history": ("user_id", "domain", "role", "content", "timestamp"),
+}
+
+# Every generated user logs in with this password (bcrypt hash precomputed,
+# hashing millions of passwords would take hours)
+GENERATED_PASSWORD = "Generated123!"
+GENERATED_PASSWORD_HASH = "$2b$12$Nd/rVqfK1qTgJ33ve5A6XePFtnB/jfhqScGEO3AT2q2ZUwNuGxVB."
+USER_ROLES = {"user": 80, "analyst": 15, "admin": 5}
+
+# ----------------- INCIDENT PROFILES -----------------
+# type -> (share of incidents, severity weights, status weights, descriptions)
+INCIDENT_PROFILES = {
+    "Phishing": (48, {"High": 80, "Critical": 20}, {"Open": 98, "Investigating": 2}, [
+        "Spear-phishing targeting executives",
+        "Credential harvesting emails detected",
+        "Phishing emails impersonating IT support",
+        "Fake login portal reported",
+        "Phishing emails with malicious PDFs",
+        "Multiple phishing attempts blocked",
+    ]),
+    "Malware": (18, {"Medium": 98, "High": 2}, {"Resolved": 100}, [
+        "Trojan detected and removed",
+        "Spyware removed from workstation",
+        "Rogue script detected and deleted",
+        "Trojan downloader removed",
+    ]),
+    "DDoS": (17, {"Medium": 97, "High": 3}, {"Closed": 100}, [
+        "Traffic surge mitigated",
+        "Botnet traffic mitigated",
+        "Volumetric attack on web gateway absorbed",
+    ]),
+    "Ransomware": (16, {"Critical": 75, "High": 25}, {"Investigating": 100}, [
+        "Unauthorized encryption attempt detected",
+        "Ransomware detected on finance machine",
+        "Suspicious file encryption activity detected",
+        "Ransomware signatures found on server",
+    ]),
+    "Insider Threat": (1, {"High": 100}, {"Investigating": 100}, [
+        "Unusual data export by privileged account",
+        "Access to restricted share outside working hours",
+    ]),
+}
+REPORTERS = ["alice", "bob", "charlie", "diana", "emma", "frank"]
+
+# ----------------- TICKET PROFILES -----------------
+TICKET_SUBJECTS = {
+    "Hardware": ["Monitor flicker", "Keyboard not working", "Mouse unresponsive",
+                 "Laptop overheating", "HDD failure", "Screen cracked"],
+    "Software": ["Application crash", "Install antivirus", "Database deadlock",
+                 "CRM login issues", "Email bounce issues"],
+    "Network": ["VPN dropouts", "Router outage", "Firewall outage", "Switch failure",
+                "Firewall misconfiguration", "DNS resolution failure", "Wi-Fi instability"],
+}
+TICKET_PRIORITIES = {"Low": 20, "Medium": 45, "High": 30, "Critical": 5}
+TICKET_STATUSES = {"Open": 15, "In Progress": 25, "Resolved": 45, "Closed": 15}
+ASSIGNEES = ["Alice", "Bob", "Charlie", "David", "Eve"]
+MAX_RESOLUTION_DAYS = 14
+
+# ----------------- DATASET PROFILES -----------------
+DATASET_CATEGORIES = ["Operations", "HR", "R&D", "Sales", "Marketing", "IT", "Cyber", "Finance"]
+DATASET_SOURCES = ["Internal System", "Survey Tool", "API", "IoT Sensors",
+                   "External Feed", "Public Dataset"]
+DATASET_KINDS = ["Logs", "Sensor Data", "Feed", "Records", "Transactions",
+                 "Survey Data", "Analytics"]
+
+# ----------------- CHAT PROFILES -----------------
+CHAT_PROMPTS = {
+    "Cybersecurity": ["How do I spot a phishing email?",
+                      "What should we do after a ransomware alert?",
+                      "Summarise the open critical incidents."],
+    "IT Operations": ["Why does the VPN keep dropping?",
+                      "Which tickets are waiting the longest?",
+                      "How can we cut resolution time for network issues?"],
+    "Data Science": ["Which datasets were updated this quarter?",
+                     "How should we clean the sensor data?",
+                     "Which category has the largest datasets?"],
+}
+CHAT_REPLIES = [
+    "Here is a short overview based on the current data.",
+    "Start with the highest severity items and work down.",
+    "Check the recent trend first, then drill into the outliers.",
+    "I would group these by category before deciding.",
+]
+MAX_CONVERSATION_MESSAGES = 20
+
+
+# ----------------- HELPERS -----------------
+def _weighted(rng, weights):
+    """Return a picker that draws keys of a {value: weight} dict."""
+    values, cum, total = list(weights), [], 0
+    for weight in weights.values():
+        total += weight
+        cum.append(total)
+    return lambda: rng.choices(values, cum_weights=cum)[0]
+
+
+def _random_day(rng, start=START_DATE, end=END_DATE):
+    return start + timedelta(days=rng.randrange((end - start).days + 1))
+
+
+def _clock(rng):
+    """Random HH:MM:SS during working hours."""
+    return f"{rng.randrange(7, 20):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}"
+
+
+def table_rng(seed, table_name):
+    """Return the random stream of one table for a seed."""
+    return random.Random(f"{seed}:{table_name}")
+
+
+# ----------------- ROW GENERATORS -----------------
+def _user_rows(rng, count):
+    role = _weighted(rng, USER_ROLES)
+    for n in range(1, count + 1):
+        yield (f"gen_user_{n:07d}", GENERATED_PASSWORD_HASH, role())
+
+
+def _incident_rows(rng, count):
+    incident_type = _weighted(rng, {t: p[0] for t, p in INCIDENT_PROFILES.items()})
+    pickers = {
+        t: (_weighted(rng, p[1]), _weighted(rng, p[2]), p[3])
+        for t, p in INCIDENT_PROFILES.items()
+    }
+    for n in range(1, count + 1):
+        kind = incident_type()
+        severity, status, descriptions = pickers[kind]
+        day = _random_day(rng).isoformat()
+        # The reference keeps (date, type, description, reporter) unique,
+        # otherwise the content_hash key would merge repeated incidents
+        yield (day, kind, severity(), status(),
+               f"{rng.choice(descriptions)} (ref INC{n:08d})",
+               rng.choice(REPORTERS), f"{day} {_clock(rng)}")
+
+
+def _ticket_rows(rng, count):
+    priority = _weighted(rng, TICKET_PRIORITIES)
+    status = _weighted(rng, TICKET_STATUSES)
+    categories = list(TICKET_SUBJECTS)
+    for n in range(1, count + 1):
+        category = rng.choice(categories)
+        subject = rng.choice(TICKET_SUBJECTS[category])
+        created = _random_day(rng)
+        state = status()
+        resolved = None
+        if state in ("Resolved", "Closed"):
+            resolved = (created + timedelta(days=rng.randrange(MAX_RESOLUTION_DAYS + 1))).isoformat()
+        yield (f"GT{n:08d}", priority(), state, category, subject,
+               f"{subject} reported by user.", created.isoformat(), resolved,
+               rng.choice(ASSIGNEES), f"{created.isoformat()} {_clock(rng)}")
+
+
+def _dataset_rows(rng, count):
+    for n in range(1, count + 1):
+        category = rng.choice(DATASET_CATEGORIES)
+        updated = _random_day(rng)
+        quarter = (updated.month - 1) // 3 + 1
+        records = int(rng.lognormvariate(12, 1.5))
+        size_mb = round(records * rng.uniform(0.0002, 0.002), 2)
+        yield (f"{category} {rng.choice(DATASET_KINDS)} {updated.year} Q{quarter} #{n:07d}",
+               category, rng.choice(DATASET_SOURCES), updated.isoformat(), records, size_mb)
+
+
+def _chat_rows(rng, count, user_ids):
+    """Whole conversations (user/assistant turns) until count messages."""
+    domains = list(CHAT_PROMPTS)
+    produced = 0
+    while produced < count:
+        user_id, domain = str(rng.choice(user_ids)), rng.choice(domains)
+        day, seconds = _random_day(rng), rng.randrange(8 * 3600, 18 * 3600)
+        turns = min(rng.randrange(2, MAX_CONVERSATION_MESSAGES + 1, 2), count - produced)
+        for turn in range(turns):
+            role = "user" if turn % 2 == 0 else "assistant"
+            content = (rng.choice(CHAT_PROMPTS[domain]) if role == "user"
+                       else rng.choice(CHAT_REPLIES))
+            seconds += rng.randrange(5, 120)
+            stamp = f"{day.isoformat()} {seconds // 3600 % 24:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+            yield (user_id, domain, role, content, stamp)
+        produced += turns
+
+
+def generate_rows(table_name, count, seed=DEFAULT_SEED, user_ids=None):
+    """
+    Yield count synthetic rows for a table, in TABLE_COLUMNS order.
+
+    Args:
+        table_name: One of GENERATED_TABLES
+        count: Number of rows
+        seed: Seed of the random streams
+        user_ids: users.id values chat messages belong to (chat_history only,
+                  defaults to 1..DEFAULT_COUNTS["users"])
+
+    Returns:
+        iterator of tuple
+    """
+    rng = table_rng(seed, table_name)
+    if table_name == "users":
+        return _user_rows(rng, count)
+    if table_name == "cyber_incidents":
+        return _incident_rows(rng, count)
+    if table_name == "it_tickets":
+        return _ticket_rows(rng, count)
+    if table_name == "datasets_metadata":
+        return _dataset_rows(rng, count)
+    if table_name == "chat_history":
+        return _chat_rows(rng, count, user_ids or range(1, DEFAULT_COUNTS["users"] + 1))
+    raise ValueError(f"No generator for table '{table_name}'")
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ----------------- WRITERS -----------------
+def write_database(conn, counts=None, seed=DEFAULT_SEED, chunk_size=CSV_CHUNK_SIZE,
+                   progress_callback=None):
+    """
+    Bulk insert generated rows, one transaction per chunk.
+
+    Rows that already exist (same username, ticket_id, dataset key or
+    incident hash) are skipped, so running the same seed twice only adds
+    chat messages again (chat_history has no natural key). Spike state
+    is rebuilt once after the incidents are in.
+
+    Args:
+        conn: Database connection (schema already migrated)
+        counts: {table_name: rows}; defaults to DEFAULT_COUNTS
+        seed: Seed of the random streams
+        chunk_size: Rows per executemany/transaction
+        progress_callback: Optional callable(table_name, rows_generated)
+
+    Returns:
+        dict: {table_name: rows inserted}
+    """
+    counts = DEFAULT_COUNTS if counts is None else counts
+    inserted = {}
+
+    for table_name in GENERATED_TABLES:
+        count = counts.get(table_name, 0)
+        if not count:
+            continue
+
+        columns = list(TABLE_COLUMNS[table_name])
+        user_ids = _generated_user_ids(conn) if table_name == "chat_history" else None
+        rows = generate_rows(table_name, count, seed, user_ids)
+        if table_name == "cyber_incidents":
+            columns.append("content_hash")
+            rows = (row + (content_hash(*row[:2], row[4], row[5]),) for row in rows)
+
+        insert_sql = (f"INSERT OR IGNORE INTO {table_name} ({', '.join(columns)}) "
+                      f"VALUES ({', '.join('?' for _ in columns)})")
+        try:
+            done = inserted[table_name] = 0
+            for batch in _batches(rows, chunk_size):
+                with conn:
+                    inserted[table_name] += conn.executemany(insert_sql, batch).rowcount
+                done += len(batch)
+                if progress_callback:
+                    progress_callback(table_name, done)
+        except sqlite3.Error as e:
+            print(f"⚠️ Error generating '{table_name}': {e}")
+            continue
+
+        if table_name == "cyber_incidents":
+            rebuild_spike_state(conn)
+
+    return inserted
+
+
+def _generated_user_ids(conn):
+    """users.id of the generated accounts (chat messages are spread over them)."""
+    try:
+        rows = conn.execute("SELECT id FROM users WHERE username LIKE 'gen\\_user\\_%' ESCAPE '\\'").fetchall()
+    except sqlite3.Error:
+        return None
+    return [r[0] for r in rows] or None
+
+
+def write_csv(out_dir, counts=None, seed=DEFAULT_SEED, progress_callback=None):
+    """
+    Stream generated rows to <out_dir>/<table_name>.csv.
+
+    The files have the same headers as the CSVs in DATA, so they can be
+    loaded with load_all_csv_data() (content_hash is added on load).
+    Chat messages refer to user ids 1..counts["users"], i.e. the ids the
+    users get when loaded into an empty table.
+
+    Args:
+        out_dir: Output directory (created if missing)
+        counts: {table_name: rows}; defaults to DEFAULT_COUNTS
+        seed: Seed of the random streams
+        progress_callback: Optional callable(table_name, rows_written)
+
+    Returns:
+        dict: {table_name: Path of the written file}
+    """
+    counts = DEFAULT_COUNTS if counts is None else counts
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    user_ids = range(1, (counts.get("users") or DEFAULT_COUNTS["users"]) + 1)
+    written = {}
+
+    for table_name in GENERATED_TABLES:
+        count = counts.get(table_name, 0)
+        if not count:
+            continue
+
+        path = out_dir / f"{table_name}.csv"
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(TABLE_COLUMNS[table_name])
+            done = 0
+            for batch in _batches(generate_rows(table_name, count, seed, user_ids), CSV_CHUNK_SIZE):
+                writer.writerows(batch)
+                done += len(batch)
+                if progress_callback:
+                    progress_callback(table_name, done)
+        written[table_name] = path
+
+    return written
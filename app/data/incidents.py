@@ -11,6 +11,19 @@ Includes:
 # Import required modules
 import pandas as pd
 import sqlite3
+from app.data.db import (
+    content_hash, fetch_page, count_rows, build_filter, filter_rows, fts_query,
+    write_transaction, as_row_tuples, lookup_keys, insert_many, update_many, delete_many
+)
+from app.data.cache import bump_table_version
+from app.data.spikes import update_spike_state, rebuild_spike_state, flag_spikes
+
+# Argument order of insert_incident(), used for batch rows
+INCIDENT_COLUMNS = ("date", "incident_type", "severity", "status", "description", "reported_by")
+
+# Monthly series are short, so they react faster and need less history
+MONTHLY_SPIKE_ALPHA = 0.3
+MONTHLY_SPIKE_MIN_HISTORY = 3
 
 # ----------------- CRUD FUNCTIONS -----------------
 
@@ -37,13 +50,18 @@ def insert_incident(conn, date, incident_type, severity, status, description, re
         # TODO: Get cursor
         cursor = conn.cursor()
         # TODO: Write INSERT SQL with parameterized query
+        # No content_hash: that key only deduplicates CSV sync, and a real
+        # incident may repeat the date, type, description and reporter
         insert_sql = """
         INSERT INTO cyber_incidents (date, incident_type, severity, status, description, reported_by)
         VALUES (?, ?, ?, ?, ?, ?)
         """
+
         # TODO: Execute and commit  
         cursor.execute(insert_sql, (date, incident_type, severity, status, description, reported_by))
         conn.commit()
+        bump_table_version(conn, "cyber_incidents")
+        update_spike_state(conn, incident_type, date)
         # TODO: Return cursor.lastrowid
         return cursor.lastrowid
     except sqlite3.Error as e:
@@ -69,6 +87,97 @@ def get_all_incidents(conn):
         print(f"Error retrieving incidents: {e}")
         return pd.DataFrame()
     
+# Columns the filter widgets can filter on
+INCIDENT_FILTER_COLUMNS = ("incident_type", "severity", "status", "date", "reported_by")
+# Columns the record views can sort by (each backed by an index)
+INCIDENT_SORT_KEYS = ("id", "date")
+
+# 🌟 Retrieve one page of incidents
+def get_incidents_page(conn, page_size=50, cursor=None, sort_key="id", descending=False,
+                       filters=None):
+    """
+    Get one page of incidents using keyset pagination.
+
+    Args:
+        conn: Database connection
+        page_size: Rows per page
+        cursor: next_cursor from the previous page (None for the first page)
+        sort_key: One of INCIDENT_SORT_KEYS
+        descending: Sort direction
+        filters: Optional filters (see db.build_filter)
+
+    Returns:
+        tuple: (pandas.DataFrame, next_cursor or None)
+    """
+    if sort_key not in INCIDENT_SORT_KEYS:
+        raise ValueError(f"Cannot sort incidents by '{sort_key}'")
+    where, params = build_filter(filters, INCIDENT_FILTER_COLUMNS)
+    return fetch_page(conn, "cyber_incidents", sort_key, page_size, cursor, descending, where, params)
+
+# 🌟 Count incidents
+def count_incidents(conn, filters=None):
+    """Return the number of incidents (matching filters, if given)."""
+    where, params = build_filter(filters, INCIDENT_FILTER_COLUMNS)
+    return count_rows(conn, "cyber_incidents", where, params)
+
+# 🌟 Filter incidents in SQL
+def filter_incidents(conn, filters):
+    """
+    Get the incidents matching the filters, evaluated by SQLite.
+
+    Args:
+        conn: Database connection
+        filters: dict of column -> list (IN), {"min", "max"} range or
+                 {"start", "end"} date window; see db.build_filter
+
+    Returns:
+        pandas.DataFrame: Matching incidents
+    """
+    return filter_rows(conn, "cyber_incidents", filters, INCIDENT_FILTER_COLUMNS)
+
+# 🔎 Full-text search over incident descriptions
+def search_incidents(conn, text, page=1, page_size=20, highlight=("**", "**")):
+    """
+    Search incident descriptions with the incidents_fts index.
+
+    Results are ranked by bm25 (best first) and returned one page at a
+    time, with a snippet of the description around the matched words.
+
+    Args:
+        conn: Database connection
+        text: Words typed by the user (all must match, last one as prefix)
+        page: Page number, starting at 1
+        page_size: Results per page
+        highlight: (before, after) markers placed around matched words
+
+    Returns:
+        tuple: (pandas.DataFrame of the page, total number of matches)
+    """
+    match = fts_query(text)
+    if match is None:
+        return pd.DataFrame(), 0
+
+    query = """
+    SELECT i.id, i.date, i.incident_type, i.severity, i.status, i.reported_by,
+           snippet(incidents_fts, 0, ?, ?, '…', 16) AS snippet,
+           bm25(incidents_fts) AS rank
+    FROM incidents_fts
+    JOIN cyber_incidents AS i ON i.id = incidents_fts.rowid
+    WHERE incidents_fts MATCH ?
+    ORDER BY rank, i.id
+    LIMIT ? OFFSET ?
+    """
+    try:
+        total = conn.execute(
+            "SELECT COUNT(*) FROM incidents_fts WHERE incidents_fts MATCH ?", (match,)
+        ).fetchone()[0]
+        df = pd.read_sql_query(query, conn, params=(*highlight, match, page_size,
+                                                    (max(page, 1) - 1) * page_size))
+        return df, total
+    except Exception as e:
+        print(f"Error searching incidents: {e}")
+        return pd.DataFrame(), 0
+
 # 🌟 Update the status of an incident
 def update_incident_status(conn, incident_id, new_status):
     """
@@ -86,6 +195,8 @@ def update_incident_status(conn, incident_id, new_status):
             (new_status, incident_id)
         )
         conn.commit()
+        if cursor.rowcount:  # only a real change invalidates cached reads
+            bump_table_version(conn, "cyber_incidents")
         print(f"✅ Successfully updated incident {incident_id} to '{new_status}'")
 
         # TODO: Return cursor.rowcount
@@ -106,12 +217,19 @@ def delete_incident(conn, incident_id):
     try:
         # Get cursor
         cursor = conn.cursor()
+        row = cursor.execute(
+            "SELECT incident_type FROM cyber_incidents WHERE id = ?", (incident_id,)
+        ).fetchone()
         # TODO: Execute and commit
         cursor.execute(
             "DELETE FROM cyber_incidents WHERE id = ?",
             (incident_id,)
         )
         conn.commit()
+        if cursor.rowcount:  # only a real change invalidates cached reads
+            bump_table_version(conn, "cyber_incidents")
+            if row:
+                rebuild_spike_state(conn, [row[0]])
         # TODO: Return cursor.rowcount
         return cursor.rowcount
     
@@ -119,6 +237,90 @@ def delete_incident(conn, incident_id):
         print(f"Error! Incident {incident_id} deletion failed: {e}")
         return 0
     
+# ----------------- BATCH FUNCTIONS -----------------
+
+# 🌟 Add many incidents in one transaction
+def insert_incidents_many(conn, incidents):
+    """
+    Insert many incidents with one executemany inside one transaction.
+
+    Args:
+        conn: Database connection
+        incidents: Iterable of tuples in insert_incident() argument order
+                   (date, incident_type, severity, status, description[, reported_by])
+                   or dicts with those keys
+
+    Returns:
+        list: New incident id per input row; None for rows that already
+        exist (same content_hash) or repeat an earlier row of the batch.
+        All None if a row was invalid or the batch was rolled back.
+    """
+    incidents = list(incidents)
+    try:
+        rows = [
+            row + (content_hash(row[0], row[1], row[4], row[5]),)
+            for row in as_row_tuples(incidents, INCIDENT_COLUMNS)
+        ]
+        with write_transaction(conn):
+            ids = insert_many(conn, "cyber_incidents", INCIDENT_COLUMNS + ("content_hash",),
+                              rows, "content_hash")
+    except (sqlite3.Error, ValueError) as e:
+        print(f"❌ Batch insert of {len(incidents)} incidents failed: {e}")
+        return [None] * len(incidents)
+
+    inserted = [row for row, new_id in zip(rows, ids) if new_id is not None]
+    if inserted:
+        bump_table_version(conn, "cyber_incidents")
+        rebuild_spike_state(conn, sorted({row[1] for row in inserted}))
+    print(f"✅ Inserted {len(inserted)} of {len(rows)} incidents.")
+    return ids
+
+# 🌟 Update the status of many incidents
+def update_incident_status_many(conn, incident_ids, new_status):
+    """
+    Set the same status on many incidents in one transaction.
+
+    Returns:
+        list: Rows updated (0 or 1) per incident id; all 0 on failure
+    """
+    incident_ids = list(incident_ids)
+    try:
+        with write_transaction(conn):
+            outcomes = update_many(conn, "cyber_incidents", "status", "id",
+                                   ((i, new_status) for i in incident_ids))
+    except sqlite3.Error as e:
+        print(f"❌ Batch status update of {len(incident_ids)} incidents failed: {e}")
+        return [0] * len(incident_ids)
+
+    if any(outcomes):
+        bump_table_version(conn, "cyber_incidents")
+    print(f"✅ Updated {sum(outcomes)} of {len(incident_ids)} incidents to '{new_status}'")
+    return outcomes
+
+# 🌟 Delete many incidents
+def delete_incidents_many(conn, incident_ids):
+    """
+    Delete many incidents in one transaction.
+
+    Returns:
+        list: Rows deleted (0 or 1) per incident id; all 0 on failure
+    """
+    incident_ids = list(incident_ids)
+    try:
+        with write_transaction(conn):
+            types = set(lookup_keys(conn, "cyber_incidents", "id", incident_ids,
+                                    "incident_type").values())
+            outcomes = delete_many(conn, "cyber_incidents", "id", incident_ids)
+    except sqlite3.Error as e:
+        print(f"❌ Batch delete of {len(incident_ids)} incidents failed: {e}")
+        return [0] * len(incident_ids)
+
+    if any(outcomes):
+        bump_table_version(conn, "cyber_incidents")
+        rebuild_spike_state(conn, sorted(t for t in types if t))
+    print(f"🗑️ Deleted {sum(outcomes)} of {len(incident_ids)} incidents.")
+    return outcomes
+    
 # 📊 Count incidents by type
 def get_incidents_by_type_count(conn):
     """
@@ -182,6 +384,61 @@ def get_incident_trend(conn):
     return df
 
 
+# 📈 Monthly incident counts per type (from the rollup table)
+def get_monthly_incident_counts(conn, exclude_statuses=()):
+    """
+    Count incidents per month and type from incident_rollup_monthly.
+
+    The rollup is kept current by triggers, so this reads a few rows per
+    month instead of grouping the whole incidents table.
+
+    Args:
+        conn: Database connection
+        exclude_statuses: Statuses to leave out (e.g. ("Resolved",))
+
+    Returns:
+        pandas.DataFrame: month (YYYY-MM), incident_type, count
+    """
+    query = """
+    SELECT month, incident_type, SUM(row_count) AS count
+    FROM incident_rollup_monthly
+    WHERE month != '' AND incident_type != ''
+    """
+    params = list(exclude_statuses)
+    if params:
+        query += f" AND status NOT IN ({', '.join('?' for _ in params)})"
+    query += " GROUP BY month, incident_type ORDER BY month, incident_type"
+    return pd.read_sql_query(query, conn, params=params)
+
+# 📈 Daily incident counts (from the rollup table)
+def get_daily_incident_counts(conn, start=None, end=None):
+    """
+    Count incidents per day, type, severity and status from incident_rollup_daily.
+
+    Args:
+        conn: Database connection
+        start: First day to include (YYYY-MM-DD, optional)
+        end: Last day to include (YYYY-MM-DD, optional)
+
+    Returns:
+        pandas.DataFrame: day, incident_type, severity, status, count
+    """
+    query = """
+    SELECT day, incident_type, severity, status, row_count AS count
+    FROM incident_rollup_daily
+    WHERE day != ''
+    """
+    params = []
+    if start:
+        query += " AND day >= ?"
+        params.append(str(start))
+    if end:
+        query += " AND day <= ?"
+        params.append(str(end))
+    query += " ORDER BY day"
+    return pd.read_sql_query(query, conn, params=params)
+
+
 # 🚨 Identify unresolved incidents by type
 def unresolved_incidents_by_type(conn):
     """
@@ -202,37 +459,86 @@ def unresolved_incidents_by_type(conn):
 def get_threat_spike(conn, incident_type="Phishing"):
     """
     Find monthly spikes for a threat type
+
+    A month is a spike when it is well above the EWMA of the months before
+    it (see spikes.flag_spikes). Months without incidents count as 0.
     """
     query = """
-    SELECT strftime('%Y-%m', date) AS month, COUNT(*) AS count
-    FROM cyber_incidents
-    WHERE incident_type = ?
+    SELECT month, SUM(row_count) AS count
+    FROM incident_rollup_monthly
+    WHERE incident_type = ? AND month != ''
     GROUP BY month
     ORDER BY month
     """
     
     df = pd.read_sql_query(query, conn, params=(incident_type,))
-    
-    # Simple spike detection: count > 10
-    df['spike'] = df['count'] > 10
+    if df.empty:
+        df['spike'] = pd.Series(dtype=bool)
+        return df
+
+    # Fill the quiet months so the moving average sees them
+    months = pd.period_range(df['month'].iloc[0], df['month'].iloc[-1], freq='M').strftime('%Y-%m')
+    df = df.set_index('month').reindex(months, fill_value=0).rename_axis('month').reset_index()
+
+    df['spike'] = flag_spikes(df['count'], MONTHLY_SPIKE_ALPHA, MONTHLY_SPIKE_MIN_HISTORY)
     
     return df
 
-def get_resolution_bottleneck(conn):
+# Statuses that count towards the unresolved backlog
+BACKLOG_STATUSES = ("Open", "Investigating")
+
+def get_resolution_bottleneck(conn, percentiles=False):
     """
     Find which incident type has most unresolved cases or longest open duration.
-    """
-    df = get_all_incidents(conn)
 
-    # Convert date
-    df['date'] = pd.to_datetime(df['date'])
+    Ages are computed in SQLite with julianday() and only the backlog rows
+    are read (via idx_incidents_status_type_date), so the cost follows
+    the number of open incidents rather than the whole history.
 
-    # Calculate 'age' for unresolved incidents
-    df['open_days'] = (pd.Timestamp.now() - df['date']).dt.days
-    unresolved = df[df['status'].isin(['Open', 'Investigating'])]
+    Args:
+        conn: Database connection
+        percentiles: Also return open_count and the p50/p90 open age
 
-    # Average unresolved days per incident type
-    result = unresolved.groupby('incident_type', as_index=False)['open_days'].mean()
-    result = result.sort_values('open_days', ascending=False)
-    return result
+    Returns:
+        pandas.DataFrame: incident_type, open_days (average) [, open_count,
+                          p50_open_days, p90_open_days], longest first
+    """
+    placeholders = ", ".join("?" for _ in BACKLOG_STATUSES)
+    ages = f"""
+        SELECT incident_type,
+               CAST(julianday('now', 'localtime') - julianday(date) AS INTEGER) AS open_days
+        FROM cyber_incidents
+        WHERE status IN ({placeholders}) AND date IS NOT NULL
+    """
 
+    if not percentiles:
+        query = f"""
+        SELECT incident_type, AVG(open_days) AS open_days
+        FROM ({ages})
+        GROUP BY incident_type
+        ORDER BY open_days DESC
+        """
+    else:
+        # Nearest-rank percentiles: first age whose rank reaches p * n
+        query = f"""
+        WITH ranked AS (
+            SELECT incident_type, open_days,
+                   ROW_NUMBER() OVER (PARTITION BY incident_type ORDER BY open_days) AS rn,
+                   COUNT(open_days) OVER (PARTITION BY incident_type) AS n
+            FROM ({ages})
+        )
+        SELECT incident_type,
+               AVG(open_days) AS open_days,
+               COUNT(*) AS open_count,
+               MIN(CASE WHEN rn >= 0.5 * n THEN open_days END) AS p50_open_days,
+               MIN(CASE WHEN rn >= 0.9 * n THEN open_days END) AS p90_open_days
+        FROM ranked
+        GROUP BY incident_type
+        ORDER BY open_days DESC
+        """
+
+    try:
+        return pd.read_sql_query(query, conn, params=BACKLOG_STATUSES)
+    except Exception as e:
+        print(f"Error computing resolution bottleneck: {e}")
+        return pd.DataFrame()
@@ -0,0 +1,503 @@
+"""
+querylog.py - Time every query issued through app/data.
+
+Includes:
+- InstrumentedConnection / InstrumentedCursor: sqlite3 subclasses that
+  connect_database() and the connection pool use as connection factory
+- recent_queries() / query_stats(): in-memory ring buffer of recent statements
+- get_slow_queries() / get_slow_query_offenders(): the slow_query_log table
+
+Each statement is recorded with its fingerprint (literals replaced by ?,
+IN lists collapsed), the shape of its parameters, the rows it returned or
+changed and the time spent in execute and fetch. Statements slower than
+the threshold are also written to slow_query_log (schema migration 14).
+That write goes through a background thread with its own autocommit
+connection, so it never joins the caller's transaction and never waits
+on a lock the caller itself holds.
+"""
+
+# Import required modules
+import atexit
+import functools
+import itertools
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+import pandas as pd
+
+# ----------------- SETTINGS -----------------
+QUERY_LOG_SIZE = 1000      # Statements kept in the in-memory ring buffer
+SLOW_QUERY_MS = 100.0      # Statements at least this slow go to slow_query_log
+SLOW_LOG_MAX_ROWS = 10000  # Oldest slow_query_log rows are trimmed beyond this
+SLOW_QUEUE_SIZE = 10000    # Slow entries waiting for the writer thread
+MAX_SQL_LENGTH = 2000      # Longer statements are truncated in the log
+
+_settings = {"enabled": True, "slow_ms": SLOW_QUERY_MS}
+_recent = deque(maxlen=QUERY_LOG_SIZE)
+_counters = {"recorded": 0, "slow": 0, "dropped": 0, "write_errors": 0}
+_lock = threading.Lock()
+
+
+def set_slow_query_threshold(ms):
+    """Change the slow query threshold (milliseconds) for this process."""
+    _settings["slow_ms"] = float(ms)
+
+
+def enable_query_log(enabled=True):
+    """Turn recording on or off for this process (statements still run)."""
+    _settings["enabled"] = bool(enabled)
+
+
+# ----------------- FINGERPRINTS -----------------
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """
+    Normalise a statement so calls that differ only in values group together.
+
+    String and number literals become ?, whitespace is collapsed and
+    placeholder lists of any length become (?, ...).
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _SPACE.sub(" ", sql).strip()
+    return _IN_LIST.sub("(?, ...)", sql)
+
+
+def param_types(params):
+    """Capture the types of the parameters (formatted later by params_shape)."""
+    if not params:
+        return ()
+    if isinstance(params, dict):
+        return {k: type(v) for k, v in params.items()}
+    try:
+        return tuple(map(type, params))
+    except TypeError:
+        return type(params)
+
+
+def params_shape(types):
+    """Describe captured parameter types, e.g. '(str, int)' or '{name: str}'."""
+    if isinstance(types, str):
+        return types
+    if isinstance(types, type):
+        return types.__name__
+    if isinstance(types, dict):
+        return "{" + ", ".join(f"{k}: {t.__name__}" for k, t in types.items()) + "}"
+    return "(" + ", ".join(t.__name__ for t in types) + ")"
+
+
+# ----------------- INSTRUMENTED SQLITE CLASSES -----------------
+# Index of each field in the per-statement entry list
+_SQL, _TYPES, _ROWS, _SECONDS, _ERROR = range(5)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor that times execute plus fetch and records the statement once its
+    rows are consumed (or the cursor is closed, re-used or garbage collected).
+
+    Only the raw values are captured here; fingerprints and parameter
+    shapes are formatted when the log is read, to keep the per-query cost low.
+    """
+
+    _entry = None
+
+    def _finish(self, queue_slow=True):
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            _record(entry, self.connection.db_path, queue_slow)
+
+    def _timed(self, call, *args):
+        """Run call(*args), adding its time to the current entry."""
+        entry = self._entry
+        if entry is None:
+            return call(*args)
+        start = time.perf_counter()
+        try:
+            return call(*args)
+        except sqlite3.Error as e:
+            entry[_ERROR] = str(e)
+            raise
+        finally:
+            entry[_SECONDS] += time.perf_counter() - start
+
+    def _run(self, call, sql, types, *args):
+        """Start an entry for sql and run the execute-style call."""
+        if self._entry is not None:
+            self._finish()
+        if not _settings["enabled"]:
+            return call(sql, *args)
+        entry = self._entry = [sql, types, 0, 0.0, None]
+        start = time.perf_counter()
+        try:
+            call(sql, *args)
+        except sqlite3.Error as e:
+            entry[_SECONDS] = time.perf_counter() - start
+            entry[_ERROR] = str(e)
+            self._finish()
+            raise
+        entry[_SECONDS] = time.perf_counter() - start
+        # Statements without a result set (DML/DDL) are complete right away
+        if self.description is None:
+            self._entry[_ROWS] = self.rowcount
+            self._finish()
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, param_types(parameters), parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        counted = [0, ()]
+
+        def count_rows(rows):
+            for row in rows:
+                if not counted[0]:
+                    counted[1] = param_types(row)
+                counted[0] += 1
+                yield row
+
+        return self._run(super().executemany, sql, counted, count_rows(seq_of_parameters))
+
+    def executescript(self, sql_script):
+        return self._run(super().executescript, sql_script, "script")
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if self._entry is not None:
+            if row is None:
+                self._finish()
+            else:
+                self._entry[_ROWS] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed(super().fetchmany, size)
+        if self._entry is not None:
+            self._entry[_ROWS] += len(rows)
+            if len(rows) < size:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        if self._entry is not None:
+            self._entry[_ROWS] += len(rows)
+            self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            row = self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+        if self._entry is not None:
+            self._entry[_ROWS] += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # conn.execute(...).fetchone() cursors are finished here, so slow
+        # ones are still queued. During interpreter shutdown keep the entry
+        # in the ring buffer only (_queue_slow also drops it after exit)
+        try:
+            self._finish(queue_slow=not sys.is_finalizing())
+        except Exception:
+            pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    Connection whose cursors (including conn.execute shortcuts and
+    pd.read_sql_query) are InstrumentedCursor.
+
+    Pass it as sqlite3.connect(..., factory=InstrumentedConnection).
+    """
+
+    def __init__(self, database, *args, **kwargs):
+        super().__init__(database, *args, **kwargs)
+        self.db_path = str(database)
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute* create a plain cursor internally
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+# ----------------- RECORDING -----------------
+_recorded = itertools.count(1)
+
+
+def _record(entry, db_path, queue_slow=True):
+    """Add a finished statement to the ring buffer and queue it if slow."""
+    entry.append(time.time())
+    entry.append(db_path)
+    _recent.append(entry)  # deque.append is atomic, no lock on the hot path
+    _counters["recorded"] = next(_recorded)
+
+    if entry[_SECONDS] * 1000 >= _settings["slow_ms"]:
+        with _lock:
+            _counters["slow"] += 1
+        if queue_slow and db_path != ":memory:" and not db_path.startswith("file::memory:"):
+            _queue_slow(_describe(entry))
+
+
+def _describe(entry):
+    """Turn a raw entry into the dict returned by recent_queries()."""
+    sql, types, rows, seconds, error, at, db_path = entry
+    if isinstance(types, list):  # executemany: [row count, types of the first row]
+        types = f"{types[0]} x {params_shape(types[1])}"
+    return {
+        "at": at,
+        "sql": sql if len(sql) <= MAX_SQL_LENGTH else sql[:MAX_SQL_LENGTH] + " ...",
+        "fingerprint": fingerprint(sql),
+        "params": params_shape(types),
+        "rows": rows,
+        "ms": round(seconds * 1000, 3),
+        "error": error,
+        "db": db_path,
+    }
+
+
+def recent_queries(limit=None):
+    """
+    Return the most recent statements, newest first.
+
+    Returns:
+        list[dict]: at, sql, fingerprint, params, rows, ms, error, db
+    """
+    entries = list(_recent)
+    entries.reverse()
+    return [_describe(entry) for entry in (entries[:limit] if limit else entries)]
+
+
+def query_stats():
+    """
+    Aggregate the ring buffer by fingerprint, most total time first.
+
+    Returns:
+        list[dict]: fingerprint, calls, total_ms, avg_ms, max_ms, rows, errors
+    """
+    groups = {}
+    for entry in recent_queries():
+        g = groups.setdefault(entry["fingerprint"], {
+            "fingerprint": entry["fingerprint"], "calls": 0, "total_ms": 0.0,
+            "max_ms": 0.0, "rows": 0, "errors": 0,
+        })
+        g["calls"] += 1
+        g["total_ms"] += entry["ms"]
+        g["max_ms"] = max(g["max_ms"], entry["ms"])
+        g["rows"] += max(entry["rows"] or 0, 0)
+        g["errors"] += entry["error"] is not None
+    for g in groups.values():
+        g["total_ms"] = round(g["total_ms"], 3)
+        g["avg_ms"] = round(g["total_ms"] / g["calls"], 3)
+    return sorted(groups.values(), key=lambda g: g["total_ms"], reverse=True)
+
+
+def query_log_stats():
+    """Return counters of the query log (recorded, slow, dropped, ...)."""
+    with _lock:
+        return {
+            **_counters,
+            "buffered": len(_recent),
+            "pending_writes": _slow_queue.qsize(),
+            "slow_ms": _settings["slow_ms"],
+            "enabled": _settings["enabled"],
+        }
+
+
+def reset_query_log():
+    """Empty the ring buffer and reset the counters."""
+    global _recorded
+    with _lock:
+        _recent.clear()
+        _recorded = itertools.count(1)
+        for key in _counters:
+            _counters[key] = 0
+
+
+# ----------------- SLOW QUERY WRITER -----------------
+_slow_queue = queue.Queue(maxsize=SLOW_QUEUE_SIZE)
+_writer = None
+_writer_lock = threading.Lock()
+_writer_stopped = False  # Set at exit; no writer thread is started after that
+
+INSERT_SLOW_SQL = """
+    INSERT INTO slow_query_log (logged_at, fingerprint, sql, params_shape, row_count,
+                                duration_ms, error)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _queue_slow(entry):
+    global _writer
+    with _writer_lock:
+        if _writer_stopped:
+            with _lock:
+                _counters["dropped"] += 1
+            return
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_write_slow_queries, name="slow-query-log", daemon=True)
+            _writer.start()
+    try:
+        _slow_queue.put_nowait(entry)
+    except queue.Full:
+        with _lock:
+            _counters["dropped"] += 1
+
+
+def _write_slow_queries():
+    """Writer thread: insert queued slow statements in small batches."""
+    connections = {}  # db_path -> plain (uninstrumented) autocommit connection
+    while True:
+        batch = [_slow_queue.get()]
+        while len(batch) < 500:
+            try:
+                batch.append(_slow_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        stop = None in batch
+        by_db = {}
+        for entry in batch:
+            if entry is not None:
+                by_db.setdefault(entry["db"], []).append(entry)
+
+        for db_path, entries in by_db.items():
+            conn = connections.get(db_path)
+            try:
+                if conn is None:
+                    conn = connections[db_path] = sqlite3.connect(
+                        db_path, timeout=30, isolation_level=None)
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(INSERT_SLOW_SQL, [
+                    (time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(e["at"])), e["fingerprint"],
+                     e["sql"], e["params"], e["rows"], e["ms"], e["error"])
+                    for e in entries
+                ])
+                conn.execute(
+                    "DELETE FROM slow_query_log WHERE id <= (SELECT MAX(id) FROM slow_query_log) - ?",
+                    (SLOW_LOG_MAX_ROWS,))
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                # Usually a database without migration 14; the entries stay in the ring buffer
+                with _lock:
+                    _counters["write_errors"] += len(entries)
+                if conn is not None and conn.in_transaction:
+                    conn.execute("ROLLBACK")
+
+        for _ in batch:
+            _slow_queue.task_done()
+        if stop:
+            break
+
+    for conn in connections.values():
+        conn.close()
+
+
+def flush_slow_query_log(timeout=5.0):
+    """
+    Wait until queued slow statements are written.
+
+    Returns:
+        bool: True if the queue drained within the timeout
+    """
+    deadline = time.monotonic() + timeout
+    while _slow_queue.unfinished_tasks:
+        if time.monotonic() >= deadline or _writer is None or not _writer.is_alive():
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@atexit.register
+def _stop_writer():
+    """Write what is still queued, then stop the writer thread."""
+    global _writer_stopped
+    with _writer_lock:
+        _writer_stopped = True
+    if _writer is not None and _writer.is_alive():
+        try:
+            _slow_queue.put(None, timeout=1)
+        except queue.Full:
+            return
+        _writer.join(timeout=5)
+
+
+# ----------------- SLOW QUERY LOG READS -----------------
+def get_slow_queries(conn, limit=100):
+    """
+    Return the most recent rows of slow_query_log.
+
+    Returns:
+        pd.DataFrame: newest first (empty if the table is missing)
+    """
+    try:
+        return pd.read_sql_query("""
+            SELECT logged_at, duration_ms, row_count, params_shape, sql, error
+            FROM slow_query_log
+            ORDER BY id DESC
+            LIMIT ?
+        """, conn, params=(limit,))
+    except Exception as e:
+        print(f"⚠️ Error reading slow query log: {e}")
+        return pd.DataFrame()
+
+
+def get_slow_query_offenders(conn, limit=20):
+    """
+    Group slow_query_log by fingerprint, most total time first.
+
+    Returns:
+        pd.DataFrame: fingerprint, calls, total_ms, avg_ms, max_ms, avg_rows, last_seen
+    """
+    try:
+        return pd.read_sql_query("""
+            SELECT fingerprint,
+                   COUNT(*) AS calls,
+                   ROUND(SUM(duration_ms), 1) AS total_ms,
+                   ROUND(AVG(duration_ms), 1) AS avg_ms,
+                   ROUND(MAX(duration_ms), 1) AS max_ms,
+                   ROUND(AVG(row_count), 1) AS avg_rows,
+                   MAX(logged_at) AS last_seen
+            FROM slow_query_log
+            GROUP BY fingerprint
+            ORDER BY SUM(duration_ms) DESC
+            LIMIT ?
+        """, conn, params=(limit,))
+    except Exception as e:
+        print(f"⚠️ Error reading slow query log: {e}")
+        return pd.DataFrame()
+
+
+def clear_slow_query_log(conn):
+    """Delete every row of slow_query_log. Returns the number removed."""
+    try:
+        with conn:
+            return conn.execute("DELETE FROM slow_query_log").rowcount
+    except sqlite3.Error as e:
+        print(f"⚠️ Error clearing slow query log: {e}")
+        return 0
@@ -5,13 +5,26 @@ Tables included:
   • cyber_incidents
   • datasets_metadata
   • it_tickets
+  • chat_history
+  • ingest_fingerprints (last CSV file synced into each table)
+  • account_locks / login_attempts (login lockout and rate limiting)
+  • sessions (login session tokens)
+  • table_versions (change counter per data table, bumped by triggers)
+  • incident_rollup_daily / incident_rollup_monthly / ticket_rollup_daily
+    (pre-aggregated counts, maintained by triggers)
+  • spike_state (EWMA of daily incident counts per type, see spikes.py)
+  • incidents_fts / tickets_fts (FTS5 indexes over incident and ticket text)
+  • slow_query_log (statements slower than the threshold, see querylog.py)
+  • schema_version (tracks which migrations have been applied)
 """
 
 # -----------------
 # Import modules
 # -----------------
 import sqlite3 # required for error handling
-from app.data.db import connect_database
+import threading
+from app.data.db import connect_database, content_hash, INCIDENT_HASH_COLUMNS, VERSIONED_TABLES
+from app.data.spikes import rebuild_spike_state
 
 # -------------------------------------------------------
 # create_users_table() function to create 'users' table
@@ -32,7 +45,7 @@ def create_users_table(conn):
     create_table_sql = """
     CREATE TABLE IF NOT EXISTS users (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT NOT NULL UNIQUE,
+        username TEXT NOT NULL UNIQUE COLLATE NOCASE,
         password_hash TEXT NOT NULL,
         role TEXT DEFAULT 'user',
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -259,4 +272,591 @@ def create_all_tables(conn):
     create_chat_history_table(conn)
 
 
+# ------------------------------------
+# Schema versioning & migrations
+# ------------------------------------
+
+def migration_001_base_tables(conn):
+    """Version 1: the original five tables."""
+    create_all_tables(conn)
+
+
+def migration_002_natural_keys(conn):
+    """
+    Version 2: natural keys for incremental CSV sync.
+      • cyber_incidents.content_hash (backfilled, unique)
+      • ingest_fingerprints table
+    The datasets_metadata key is added by version 17.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(cyber_incidents)")]
+    with conn:
+        if "content_hash" not in columns:
+            conn.execute("ALTER TABLE cyber_incidents ADD COLUMN content_hash TEXT")
+
+        # Backfill hashes; exact duplicates keep the hash on their first row only
+        conn.create_function("content_hash", len(INCIDENT_HASH_COLUMNS), content_hash)
+        conn.execute(f"""
+            UPDATE cyber_incidents
+            SET content_hash = content_hash({", ".join(INCIDENT_HASH_COLUMNS)})
+            WHERE content_hash IS NULL
+        """)
+        conn.execute("""
+            UPDATE cyber_incidents SET content_hash = NULL
+            WHERE id NOT IN (SELECT MIN(id) FROM cyber_incidents GROUP BY content_hash)
+        """)
+        conn.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_incidents_content_hash
+            ON cyber_incidents (content_hash)
+        """)
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ingest_fingerprints (
+                table_name TEXT NOT NULL,
+                source_path TEXT NOT NULL,
+                size INTEGER,
+                mtime_ns INTEGER,
+                sha256 TEXT,
+                synced_at TIMESTAMP,
+                PRIMARY KEY (table_name, source_path)
+            )
+        """)
+
+
+# Secondary indexes for the analytical queries in incidents.py / tickets.py
+# (index name, table, columns)
+ANALYTICS_INDEXES = [
+    ("idx_incidents_type_status", "cyber_incidents", "incident_type, status"),
+    ("idx_incidents_severity_status", "cyber_incidents", "severity, status"),
+    ("idx_incidents_date", "cyber_incidents", "date"),
+    ("idx_tickets_status_assigned", "it_tickets", "status, assigned_to"),
+    ("idx_tickets_resolved_date", "it_tickets", "resolved_date"),
+]
+
+
+def migration_003_analytics_indexes(conn):
+    """Version 3: secondary indexes so analytics queries avoid full table scans."""
+    with conn:
+        for name, table, columns in ANALYTICS_INDEXES:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+    # Refresh planner statistics where SQLite thinks it is worthwhile
+    conn.execute("PRAGMA optimize")
+
+
+def migration_004_users_nocase(conn):
+    """
+    Version 4: make users.username case-insensitive (COLLATE NOCASE).
+
+    Case-insensitive logins can then seek the UNIQUE index instead of
+    scanning with LOWER(). SQLite cannot change a column's collation, so
+    the table is rebuilt; if two names differ only by case the oldest
+    account is kept.
+    """
+    table_sql = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'users'"
+    ).fetchone()[0]
+    if "NOCASE" in table_sql.upper():
+        return
+
+    before = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    try:
+        conn.execute("BEGIN")
+        conn.execute("DROP TABLE IF EXISTS users_nocase")
+        conn.execute("""
+            CREATE TABLE users_nocase (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT NOT NULL UNIQUE COLLATE NOCASE,
+                password_hash TEXT NOT NULL,
+                role TEXT DEFAULT 'user',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("""
+            INSERT OR IGNORE INTO users_nocase (id, username, password_hash, role, created_at)
+            SELECT id, username, password_hash, role, created_at FROM users ORDER BY id
+        """)
+        conn.execute("DROP TABLE users")
+        conn.execute("ALTER TABLE users_nocase RENAME TO users")
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+    after = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    if after < before:
+        print(f"⚠️ Dropped {before - after} users whose names only differed by case")
+
+
+def migration_005_login_lockout(conn):
+    """Version 5: persistent account lockout and login rate-limit tables."""
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS account_locks (
+                username TEXT PRIMARY KEY COLLATE NOCASE,
+                failed_count INTEGER NOT NULL DEFAULT 0,
+                locked_until REAL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS login_attempts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                scope TEXT NOT NULL,
+                subject TEXT NOT NULL COLLATE NOCASE,
+                attempted_at REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_login_attempts_subject
+            ON login_attempts (scope, subject, attempted_at)
+        """)
+
+
+def migration_006_sessions(conn):
+    """Version 6: login sessions keyed by token hash, with an expiry index."""
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                token_hash TEXT PRIMARY KEY,
+                username TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_seen REAL
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_sessions_expires_at
+            ON sessions (expires_at)
+        """)
+
+
+def migration_007_table_versions(conn):
+    """
+    Version 7: per-table change counters maintained by triggers.
+
+    Every INSERT/UPDATE/DELETE on a VERSIONED_TABLES table bumps its row
+    in table_versions, so any process can tell whether the table changed
+    since it last read it with one primary-key lookup.
+    """
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS table_versions (
+                table_name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        """)
+        for table_name in VERSIONED_TABLES:
+            conn.execute(
+                "INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)",
+                (table_name,)
+            )
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_{table_name}_version_{event.lower()}
+                    AFTER {event} ON {table_name}
+                    BEGIN
+                        UPDATE table_versions SET version = version + 1
+                        WHERE table_name = '{table_name}';
+                    END
+                """)
+
+
+# Indexes behind the sort keys of the paginated record views
+PAGINATION_INDEXES = [
+    ("idx_tickets_created_date", "it_tickets", "created_date"),
+    ("idx_datasets_last_updated", "datasets_metadata", "last_updated"),
+]
+
+
+def migration_008_pagination_indexes(conn):
+    """Version 8: indexes so every keyset page is an index seek."""
+    with conn:
+        for name, table, columns in PAGINATION_INDEXES:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+# Indexes for the SQL filters behind the Analytics filter widgets
+FILTER_INDEXES = [
+    ("idx_tickets_priority_status", "it_tickets", "priority, status"),
+    ("idx_datasets_category_records", "datasets_metadata", "category, record_count"),
+]
+
+
+def migration_009_filter_indexes(conn):
+    """Version 9: indexes for the pushed-down filter queries."""
+    with conn:
+        for name, table, columns in FILTER_INDEXES:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+def migration_010_backlog_index(conn):
+    """Version 10: covering index for backlog queries (status -> type -> date)."""
+    with conn:
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_incidents_status_type_date
+            ON cyber_incidents (status, incident_type, date)
+        """)
+
+
+# Pre-aggregated counts kept in step with their source table by triggers
+# rollup table -> (source table, bucket column, strftime format, date column, dimensions)
+ROLLUP_TABLES = {
+    "incident_rollup_daily": ("cyber_incidents", "day", "%Y-%m-%d", "date",
+                              ("incident_type", "severity", "status")),
+    "incident_rollup_monthly": ("cyber_incidents", "month", "%Y-%m", "date",
+                                ("incident_type", "severity", "status")),
+    "ticket_rollup_daily": ("it_tickets", "day", "%Y-%m-%d", "created_date",
+                            ("priority", "status", "assigned_to")),
+}
+
+
+def _rollup_keys(spec, row):
+    """Key expressions of a rollup for a row alias (NULL -> '' so keys stay unique)."""
+    _, _, fmt, date_column, dimensions = spec
+    keys = [f"COALESCE(strftime('{fmt}', {row}.{date_column}), '')"]
+    keys += [f"COALESCE({row}.{column}, '')" for column in dimensions]
+    return keys
+
+
+def _rollup_trigger_sql(rollup, spec):
+    """Return the INSERT/DELETE/UPDATE trigger statements for one rollup."""
+    source, bucket, _, date_column, dimensions = spec
+    columns = [bucket, *dimensions]
+    column_list = ", ".join(columns)
+
+    def add(row):
+        return (f"INSERT INTO {rollup} ({column_list}, row_count) "
+                f"VALUES ({', '.join(_rollup_keys(spec, row))}, 1) "
+                f"ON CONFLICT({column_list}) DO UPDATE SET row_count = row_count + 1;")
+
+    def remove(row):
+        match = " AND ".join(f"{c} = {k}" for c, k in zip(columns, _rollup_keys(spec, row)))
+        return (f"UPDATE {rollup} SET row_count = row_count - 1 WHERE {match}; "
+                f"DELETE FROM {rollup} WHERE {match} AND row_count <= 0;")
+
+    watched = [date_column, *dimensions]
+    changed = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in watched)
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_{rollup}_insert AFTER INSERT ON {source} "
+        f"BEGIN {add('NEW')} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{rollup}_delete AFTER DELETE ON {source} "
+        f"BEGIN {remove('OLD')} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{rollup}_update AFTER UPDATE OF {', '.join(watched)} "
+        f"ON {source} WHEN {changed} BEGIN {remove('OLD')} {add('NEW')} END",
+    ]
+
+
+def migration_011_rollups(conn):
+    """
+    Version 11: daily/monthly incident and daily ticket rollup tables.
+
+    Each rollup holds a row_count per (time bucket, dimensions). Triggers
+    keep them current on every insert/update/delete, and the existing
+    rows are counted once here, in the same transaction.
+    """
+    with conn:
+        for rollup, spec in ROLLUP_TABLES.items():
+            source, bucket, _, _, dimensions = spec
+            columns = [bucket, *dimensions]
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {rollup} (
+                    {", ".join(f"{c} TEXT NOT NULL" for c in columns)},
+                    row_count INTEGER NOT NULL,
+                    PRIMARY KEY ({", ".join(columns)})
+                ) WITHOUT ROWID
+            """)
+
+            # Backfill from the source table
+            keys = _rollup_keys(spec, source)
+            conn.execute(f"DELETE FROM {rollup}")
+            conn.execute(f"""
+                INSERT INTO {rollup} ({", ".join(columns)}, row_count)
+                SELECT {", ".join(keys)}, COUNT(*)
+                FROM {source}
+                GROUP BY {", ".join(keys)}
+            """)
+
+            for statement in _rollup_trigger_sql(rollup, spec):
+                conn.execute(statement)
+
+
+def migration_012_spike_state(conn):
+    """Version 12: per-type spike detector state, seeded from the daily rollup."""
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS spike_state (
+                incident_type TEXT PRIMARY KEY,
+                current_day TEXT NOT NULL,
+                current_count INTEGER NOT NULL,
+                mean REAL NOT NULL,
+                var REAL NOT NULL,
+                days_seen INTEGER NOT NULL,
+                z_score REAL NOT NULL,
+                is_spike INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP
+            )
+        """)
+        # Only flagged types are indexed, so "current spikes" reads just those
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_spike_state_flagged
+            ON spike_state (z_score) WHERE is_spike = 1
+        """)
+        # Per-type monthly series for get_threat_spike
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_incident_rollup_monthly_type
+            ON incident_rollup_monthly (incident_type, month)
+        """)
+    rebuild_spike_state(conn)
+
+
+# External-content FTS5 indexes: fts table -> (source table, indexed columns)
+FTS_TABLES = {
+    "incidents_fts": ("cyber_incidents", ("description",)),
+    "tickets_fts": ("it_tickets", ("subject", "description")),
+}
+
+
+def migration_013_full_text_search(conn):
+    """
+    Version 13: FTS5 search over incident descriptions and ticket text.
+
+    The FTS tables store only the index (content lives in the source
+    table) and are kept in sync by triggers. Skipped with a warning if
+    this SQLite build has no FTS5.
+    """
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+    except sqlite3.OperationalError:
+        print("⚠️ SQLite was built without FTS5; full-text search is disabled")
+        return
+
+    with conn:
+        for fts, (source, columns) in FTS_TABLES.items():
+            column_list = ", ".join(columns)
+            new_values = ", ".join(f"new.{c}" for c in columns)
+            old_values = ", ".join(f"old.{c}" for c in columns)
+
+            conn.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                    {column_list},
+                    content='{source}', content_rowid='id',
+                    tokenize='porter unicode61'
+                )
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert AFTER INSERT ON {source} BEGIN
+                    INSERT INTO {fts} (rowid, {column_list}) VALUES (new.id, {new_values});
+                END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete AFTER DELETE ON {source} BEGIN
+                    INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+                END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{fts}_update AFTER UPDATE OF {column_list} ON {source} BEGIN
+                    INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+                    INSERT INTO {fts} (rowid, {column_list}) VALUES (new.id, {new_values});
+                END
+            """)
+            # Index the rows that already exist
+            conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def migration_014_slow_query_log(conn):
+    """Version 14: slow_query_log, written by the query instrumentation."""
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS slow_query_log (
+                id INTEGER PRIMARY KEY,
+                logged_at TIMESTAMP NOT NULL,
+                fingerprint TEXT NOT NULL,
+                sql TEXT,
+                params_shape TEXT,
+                row_count INTEGER,
+                duration_ms REAL NOT NULL,
+                error TEXT
+            )
+        """)
+        # Top offenders are grouped by fingerprint
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_slow_query_log_fingerprint
+            ON slow_query_log (fingerprint, duration_ms)
+        """)
+
+
+def migration_015_chat_window_index(conn):
+    """Version 15: chat history is read newest-first per user and domain."""
+    with conn:
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_chat_history_user_domain_id
+            ON chat_history (user_id, domain, id)
+        """)
+
+
+def migration_016_login_attempts_time_index(conn):
+    """Version 16: expired login attempts are purged by time across all subjects."""
+    with conn:
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_login_attempts_time
+            ON login_attempts (attempted_at)
+        """)
+
+
+def migration_017_dataset_natural_key(conn):
+    """
+    Version 17: datasets are keyed on (dataset_name, source, last_updated).
+
+    Replaces the unique dataset_name index of earlier builds; names repeat
+    across sources and snapshots. Rows are never deleted here: if the key
+    already has duplicates the index is left out (and incremental sync of
+    datasets fails) until they are resolved by hand.
+    """
+    with conn:
+        conn.execute("DROP INDEX IF EXISTS idx_datasets_name")
+        duplicates = conn.execute("""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM datasets_metadata
+                GROUP BY dataset_name, source, last_updated
+                HAVING COUNT(*) > 1
+            )
+        """).fetchone()[0]
+        if not duplicates:
+            conn.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_datasets_natural_key
+                ON datasets_metadata (dataset_name, source, last_updated)
+            """)
+
+    if duplicates:
+        print(f"⚠️ {duplicates} dataset keys (name, source, last_updated) are duplicated; "
+              "the unique index was not created. Resolve them and recreate "
+              "idx_datasets_natural_key to enable dataset sync.")
+
+
+# Ordered list of (version, description, function).
+# Append new migrations at the end; never renumber or edit applied ones.
+MIGRATIONS = [
+    (1, "Create base tables", migration_001_base_tables),
+    (2, "Natural keys for incremental CSV sync", migration_002_natural_keys),
+    (3, "Analytics indexes", migration_003_analytics_indexes),
+    (4, "Case-insensitive usernames", migration_004_users_nocase),
+    (5, "Account lockout and login rate limiting", migration_005_login_lockout),
+    (6, "Session store", migration_006_sessions),
+    (7, "Per-table change counters", migration_007_table_versions),
+    (8, "Pagination sort indexes", migration_008_pagination_indexes),
+    (9, "Filter indexes", migration_009_filter_indexes),
+    (10, "Backlog covering index", migration_010_backlog_index),
+    (11, "Incident and ticket rollups", migration_011_rollups),
+    (12, "Spike detector state", migration_012_spike_state),
+    (13, "Full-text search", migration_013_full_text_search),
+    (14, "Slow query log", migration_014_slow_query_log),
+    (15, "Chat history window index", migration_015_chat_window_index),
+    (16, "Login attempts purge index", migration_016_login_attempts_time_index),
+    (17, "Dataset natural key", migration_017_dataset_natural_key),
+]
+
+# Databases already migrated by this process (keyed by file path)
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+
+def create_schema_version_table(conn):
+    """
+    Create the schema_version table if it doesn't exist.
+
+    Args:
+        conn: Database connection object
+    """
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+
+def get_schema_version(conn):
+    """
+    Return the highest applied migration version (0 for a new database).
+    """
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+        return row[0] or 0
+    except sqlite3.OperationalError:
+        return 0
+
+
+def apply_migrations(conn):
+    """
+    Apply every migration newer than the database's schema version.
+
+    Migrations are idempotent, so two processes racing on a fresh
+    database simply both succeed. A failing migration stops the run at the
+    version before it; check schema_is_current() to tell the two apart.
+
+    Args:
+        conn: Database connection object
+
+    Returns:
+        int: Number of migrations applied
+    """
+    create_schema_version_table(conn)
+    current = get_schema_version(conn)
+    applied = 0
+
+    for version, description, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            migrate(conn)
+            with conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO schema_version (version, description) VALUES (?, ?)",
+                    (version, description)
+                )
+            applied += 1
+            print(f"🛠️ Applied migration {version}: {description}")
+        except sqlite3.Error as e:
+            print(f"❌ Migration {version} failed: {e}")
+            break
+
+    return applied
+
+
+def schema_is_current(conn):
+    """Return True if every migration in MIGRATIONS has been applied."""
+    return get_schema_version(conn) >= MIGRATIONS[-1][0]
+
+
+def ensure_schema(conn):
+    """
+    Bring the database up to date once per process.
+
+    Streamlit pages call this on every rerun; after the first successful
+    call for a database file it returns immediately without touching the
+    database. If a migration failed, the next call tries again.
+
+    Args:
+        conn: Database connection object
+
+    Returns:
+        bool: True if migrations were checked on this call
+    """
+    key = conn.execute("PRAGMA database_list").fetchone()[2]
+    if key and key in _schema_ready:
+        return False
+
+    with _schema_lock:
+        if key and key in _schema_ready:
+            return False
+        apply_migrations(conn)
+        if not schema_is_current(conn):
+            print(f"⚠️ Database schema is at version {get_schema_version(conn)} of "
+                  f"{MIGRATIONS[-1][0]}; migrations will be retried on the next call.")
+        elif key:
+            _schema_ready.add(key)
+    return True
+
+
 # --- End of schema.py ---
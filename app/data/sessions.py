@@ -0,0 +1,155 @@
+"""
+sessions.py - Helper functions for login sessions stored in the database.
+ - Create, validate (with sliding renewal) and revoke session tokens
+ - Bulk purge of expired sessions
+Only a SHA-256 hash of each token is stored. Recently validated tokens are
+kept in a small in-memory LRU cache so most checks never touch SQLite.
+"""
+
+# Import required modules
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+# -------------------------------
+# Session settings
+# -------------------------------
+SESSION_TTL = 8 * 60 * 60      # Seconds of inactivity before a session expires
+SESSION_CACHE_SIZE = 1024      # Tokens kept in the in-memory LRU cache
+SESSION_CACHE_TRUST = 30       # Seconds a cached entry is trusted before re-checking
+
+# token_hash -> (username, expires_at, cached_at)
+_session_cache = OrderedDict()
+_session_cache_lock = threading.Lock()
+
+
+def hash_token(token):
+    """Return the SHA-256 hex digest stored in place of the raw token."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _cache_put(token_hash, username, expires_at, now):
+    with _session_cache_lock:
+        _session_cache[token_hash] = (username, expires_at, now)
+        _session_cache.move_to_end(token_hash)
+        while len(_session_cache) > SESSION_CACHE_SIZE:
+            _session_cache.popitem(last=False)
+
+
+def _cache_drop(token_hash):
+    with _session_cache_lock:
+        _session_cache.pop(token_hash, None)
+
+
+# 🌟 Create a new session
+def create_session(conn, username, ttl=SESSION_TTL):
+    """
+    Create a session for a user and return its token.
+
+    Args:
+        conn: Database connection
+        username: Logged-in user
+        ttl: Seconds until the session expires without activity
+
+    Returns:
+        str: Random token (only its hash is stored) or None on failure
+    """
+    token = secrets.token_hex(16)
+    token_hash = hash_token(token)
+    now = time.time()
+    try:
+        with conn:
+            conn.execute("""
+                INSERT INTO sessions (token_hash, username, created_at, expires_at, last_seen)
+                VALUES (?, ?, ?, ?, ?)
+            """, (token_hash, username, now, now + ttl, now))
+        _cache_put(token_hash, username, now + ttl, now)
+        purge_expired_sessions(conn, now)
+        return token
+    except Exception as e:
+        print(f"❌ Error creating session for '{username}': {e}")
+        return None
+
+
+# 🌟 Validate a session token
+def validate_session(conn, token, ttl=SESSION_TTL):
+    """
+    Return the username for a valid token, or None.
+
+    Cached tokens are answered from memory. Tokens past half of their
+    lifetime are renewed (sliding expiry) with one indexed UPDATE.
+    """
+    if not token:
+        return None
+
+    token_hash = hash_token(token)
+    now = time.time()
+
+    with _session_cache_lock:
+        cached = _session_cache.get(token_hash)
+        if cached:
+            _session_cache.move_to_end(token_hash)
+    if cached:
+        username, expires_at, cached_at = cached
+        if expires_at <= now:
+            _cache_drop(token_hash)
+            return None
+        if now - cached_at < SESSION_CACHE_TRUST and expires_at - now > ttl / 2:
+            return username
+
+    try:
+        row = conn.execute(
+            "SELECT username, expires_at FROM sessions WHERE token_hash = ?", (token_hash,)
+        ).fetchone()
+        if row is None or row[1] <= now:
+            _cache_drop(token_hash)
+            return None
+
+        username, expires_at = row
+        if expires_at - now <= ttl / 2:
+            expires_at = now + ttl
+            with conn:
+                conn.execute(
+                    "UPDATE sessions SET expires_at = ?, last_seen = ? WHERE token_hash = ?",
+                    (expires_at, now, token_hash)
+                )
+        _cache_put(token_hash, username, expires_at, now)
+        return username
+
+    except Exception as e:
+        print(f"❌ Error validating session: {e}")
+        return None
+
+
+# 🗑️ Revoke a session (logout)
+def revoke_session(conn, token):
+    """Delete a session. Returns the number of rows removed."""
+    if not token:
+        return 0
+    token_hash = hash_token(token)
+    _cache_drop(token_hash)
+    try:
+        with conn:
+            return conn.execute("DELETE FROM sessions WHERE token_hash = ?", (token_hash,)).rowcount
+    except Exception as e:
+        print(f"❌ Error revoking session: {e}")
+        return 0
+
+
+# 🗑️ Remove expired sessions
+def purge_expired_sessions(conn, now=None):
+    """
+    Delete every expired session in one statement (uses the expires_at index).
+
+    Returns:
+        int: Number of sessions removed
+    """
+    now = time.time() if now is None else now
+    try:
+        with conn:
+            return conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,)).rowcount
+    except Exception as e:
+        print(f"❌ Error purging expired sessions: {e}")
+        return 0
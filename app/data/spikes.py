@@ -0,0 +1,263 @@
+"""
+spikes.py - Incremental threat-spike detection per incident type.
+
+Includes:
+- update_spike_state(): fold one new incident into its type's daily EWMA
+- rebuild_spike_state(): recompute the state from incident_rollup_daily
+- get_current_spikes(): every flagged type in one indexed read
+- flag_spikes(): the same rule applied to a count series (used for charts)
+
+Each incident type keeps an exponentially weighted mean and variance of
+its daily counts (days without incidents count as 0) plus the count of
+the day in progress. A day is a spike when its count is SPIKE_Z_THRESHOLD
+standard deviations above the mean of the days before it.
+"""
+
+# Import required modules
+import math
+import sqlite3
+from datetime import date
+
+# ----------------- SETTINGS -----------------
+SPIKE_ALPHA = 0.1           # EWMA weight of the newest day (~19-day span)
+SPIKE_Z_THRESHOLD = 4.0     # Standard deviations above the mean
+SPIKE_MIN_COUNT = 5         # Never flag days with fewer incidents than this
+SPIKE_MIN_HISTORY = 14      # Days of history needed before flagging
+SPIKE_MIN_STD = 0.5         # Floor on the deviation so quiet types don't flag 1 -> 2
+MAX_GAP_DAYS = 3650         # Stop decaying after this many empty days
+SPIKE_RECENT_DAYS = 7       # Spikes older than this are no longer "current" on the dashboard
+
+
+# ----------------- STATISTICS -----------------
+def _close_day(mean, var, count, alpha=SPIKE_ALPHA):
+    """Fold one finished day's count into the EWMA mean and variance."""
+    diff = count - mean
+    mean += alpha * diff
+    var = (1 - alpha) * (var + alpha * diff * diff)
+    return mean, var
+
+
+def _score(count, mean, var, days_seen, min_history=SPIKE_MIN_HISTORY):
+    """Return (z_score, is_spike) of the current day against the history."""
+    z = (count - mean) / max(math.sqrt(var), SPIKE_MIN_STD)
+    is_spike = (days_seen >= min_history and count >= SPIKE_MIN_COUNT
+                and z >= SPIKE_Z_THRESHOLD)
+    return z, is_spike
+
+
+def _advance(state, day):
+    """
+    Move a state dict forward to a later day, closing the days in between.
+
+    Empty days are folded in as zeros so quiet periods lower the mean.
+    """
+    current = date.fromisoformat(state["current_day"])
+    gap = (date.fromisoformat(day) - current).days
+
+    mean, var = _close_day(state["mean"], state["var"], state["current_count"])
+    for _ in range(min(gap - 1, MAX_GAP_DAYS)):
+        mean, var = _close_day(mean, var, 0)
+
+    state.update(mean=mean, var=var, days_seen=state["days_seen"] + gap,
+                 current_day=day, current_count=0)
+
+
+def _day_key(value):
+    """Normalise an incident date to YYYY-MM-DD (None if it isn't a date)."""
+    try:
+        return date.fromisoformat(str(value)[:10]).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+# ----------------- STATE TABLE -----------------
+def _load_state(conn, incident_type):
+    row = conn.execute("""
+        SELECT current_day, current_count, mean, var, days_seen
+        FROM spike_state WHERE incident_type = ?
+    """, (incident_type,)).fetchone()
+    if row is None:
+        return None
+    keys = ("current_day", "current_count", "mean", "var", "days_seen")
+    return dict(zip(keys, row))
+
+
+def _save_state(conn, incident_type, state):
+    z, is_spike = _score(state["current_count"], state["mean"], state["var"], state["days_seen"])
+    conn.execute("""
+        INSERT INTO spike_state (incident_type, current_day, current_count, mean, var,
+                                 days_seen, z_score, is_spike, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(incident_type) DO UPDATE SET
+            current_day = excluded.current_day, current_count = excluded.current_count,
+            mean = excluded.mean, var = excluded.var, days_seen = excluded.days_seen,
+            z_score = excluded.z_score, is_spike = excluded.is_spike,
+            updated_at = excluded.updated_at
+    """, (incident_type, state["current_day"], state["current_count"], state["mean"],
+          state["var"], state["days_seen"], z, int(is_spike)))
+
+
+def update_spike_state(conn, incident_type, incident_date):
+    """
+    Fold one newly inserted incident into its type's spike state.
+
+    O(1) for incidents on the current or a later day. A back-dated
+    incident changes history the EWMA has already absorbed, so that type
+    is rebuilt from the rollup instead.
+
+    Args:
+        conn: Database connection (the incident must already be committed)
+        incident_type: Type of the new incident
+        incident_date: Its date (YYYY-MM-DD)
+
+    Returns:
+        bool: True if the state was updated
+    """
+    day = _day_key(incident_date)
+    if not incident_type or day is None:
+        return False
+
+    own_transaction = not conn.in_transaction
+    try:
+        # Read-modify-write under the write lock so processes don't interleave
+        if own_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        state = _load_state(conn, incident_type)
+
+        if state is not None and day < state["current_day"]:
+            if own_transaction:
+                conn.rollback()
+            return rebuild_spike_state(conn, [incident_type]) > 0
+
+        if state is None:
+            state = {"current_day": day, "current_count": 0, "mean": 0.0, "var": 0.0, "days_seen": 0}
+        elif day > state["current_day"]:
+            _advance(state, day)
+
+        state["current_count"] += 1
+        _save_state(conn, incident_type, state)
+        if own_transaction:
+            conn.commit()
+        return True
+
+    except sqlite3.Error as e:
+        if own_transaction and conn.in_transaction:
+            conn.rollback()
+        print(f"⚠️ Error updating spike state for '{incident_type}': {e}")
+        return False
+
+
+def rebuild_spike_state(conn, incident_types=None):
+    """
+    Recompute spike state from incident_rollup_daily.
+
+    Used after bulk loads, deletes and back-dated inserts. Cost is one pass
+    over the days of each type, not over individual incidents.
+
+    Args:
+        conn: Database connection
+        incident_types: Types to rebuild (None = all)
+
+    Returns:
+        int: Number of types rebuilt
+    """
+    query = """
+        SELECT incident_type, day, SUM(row_count)
+        FROM incident_rollup_daily
+        WHERE day != '' AND incident_type != ''
+    """
+    params = list(incident_types or [])
+    if params:
+        query += f" AND incident_type IN ({', '.join('?' for _ in params)})"
+    query += " GROUP BY incident_type, day ORDER BY incident_type, day"
+
+    try:
+        states = {}
+        for incident_type, day, count in conn.execute(query, params):
+            day = _day_key(day)
+            if day is None:
+                continue
+            state = states.get(incident_type)
+            if state is None:
+                state = states[incident_type] = {"current_day": day, "current_count": 0,
+                                                 "mean": 0.0, "var": 0.0, "days_seen": 0}
+            elif day > state["current_day"]:
+                _advance(state, day)
+            state["current_count"] += count
+
+        with conn:
+            if incident_types is None:
+                conn.execute("DELETE FROM spike_state")
+            else:
+                conn.executemany("DELETE FROM spike_state WHERE incident_type = ?",
+                                 [(t,) for t in params])
+            for incident_type, state in states.items():
+                _save_state(conn, incident_type, state)
+        return len(states)
+
+    except sqlite3.Error as e:
+        print(f"⚠️ Error rebuilding spike state: {e}")
+        return 0
+
+
+# ----------------- READS -----------------
+def get_current_spikes(conn, since=None):
+    """
+    Return every incident type whose current day is a spike.
+
+    Served by the partial index on flagged rows, so the cost depends on
+    the number of spikes, not on the number of incidents or types.
+
+    A type's state only moves on when a new incident of that type arrives,
+    so a spike on its last active day stays flagged; pass since (e.g.
+    today - SPIKE_RECENT_DAYS) to show only recent ones.
+
+    Args:
+        conn: Database connection
+        since: Only spikes on or after this day (YYYY-MM-DD, optional)
+
+    Returns:
+        list[dict]: incident_type, day, count, expected, z_score; highest z first
+    """
+    query = """
+        SELECT incident_type, current_day, current_count, mean, z_score
+        FROM spike_state
+        WHERE is_spike = 1
+    """
+    params = []
+    if since:
+        query += " AND current_day >= ?"
+        params.append(str(since))
+    query += " ORDER BY z_score DESC"
+
+    try:
+        rows = conn.execute(query, params).fetchall()
+    except sqlite3.Error as e:
+        print(f"⚠️ Error reading spikes: {e}")
+        return []
+    return [
+        {"incident_type": r[0], "day": r[1], "count": r[2],
+         "expected": round(r[3], 2), "z_score": round(r[4], 2)}
+        for r in rows
+    ]
+
+
+def flag_spikes(counts, alpha=SPIKE_ALPHA, min_history=SPIKE_MIN_HISTORY):
+    """
+    Apply the spike rule to an ordered series of counts.
+
+    Each value is compared with the EWMA of the values before it.
+
+    Args:
+        counts: Iterable of counts (one per period, oldest first)
+        alpha: EWMA weight of the newest period
+        min_history: Periods needed before anything is flagged
+
+    Returns:
+        list[bool]: Spike flag per period
+    """
+    flags, mean, var = [], 0.0, 0.0
+    for seen, count in enumerate(counts):
+        flags.append(_score(count, mean, var, seen, min_history)[1])
+        mean, var = _close_day(mean, var, count, alpha)
+    return flags
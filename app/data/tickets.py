@@ -3,6 +3,15 @@
 # Import required modules
 import pandas as pd
 import sqlite3
+from app.data.db import (
+    fetch_page, count_rows, build_filter, filter_rows, fts_query,
+    write_transaction, as_row_tuples, insert_many, update_many, delete_many
+)
+from app.data.cache import bump_table_version
+
+# Argument order of insert_ticket(), used for batch rows
+TICKET_COLUMNS = ("ticket_id", "priority", "status", "category", "subject", "description",
+                  "created_date", "resolved_date", "assigned_to")
 
 
 def insert_ticket(conn, ticket_id, priority, status, category, subject, description,
@@ -39,6 +48,7 @@ def insert_ticket(conn, ticket_id, priority, status, category, subject, descript
         cursor.execute(insert_sql, (ticket_id, priority, status, category, subject,
                                     description, created_date, resolved_date, assigned_to))
         conn.commit()
+        bump_table_version(conn, "it_tickets")
 
         # Return cursor.lastrowid (return row)
         return cursor.lastrowid
@@ -71,6 +81,97 @@ def get_all_tickets(conn):
         print(f"Error retrieving tickets: {e}")
         return pd.DataFrame()
     
+# Columns the filter widgets can filter on
+TICKET_FILTER_COLUMNS = ("priority", "status", "category", "assigned_to", "created_date", "resolved_date")
+# Columns the record views can sort by (each backed by an index)
+TICKET_SORT_KEYS = ("id", "ticket_id", "created_date", "resolved_date")
+
+# 🌟 Retrieve one page of tickets
+def get_tickets_page(conn, page_size=50, cursor=None, sort_key="id", descending=False,
+                     filters=None):
+    """
+    Get one page of tickets using keyset pagination.
+
+    Args:
+        conn: Database connection
+        page_size: Rows per page
+        cursor: next_cursor from the previous page (None for the first page)
+        sort_key: One of TICKET_SORT_KEYS
+        descending: Sort direction
+        filters: Optional filters (see db.build_filter)
+
+    Returns:
+        tuple: (pandas.DataFrame, next_cursor or None)
+    """
+    if sort_key not in TICKET_SORT_KEYS:
+        raise ValueError(f"Cannot sort tickets by '{sort_key}'")
+    where, params = build_filter(filters, TICKET_FILTER_COLUMNS)
+    return fetch_page(conn, "it_tickets", sort_key, page_size, cursor, descending, where, params)
+
+# 🌟 Count tickets
+def count_tickets(conn, filters=None):
+    """Return the number of tickets (matching filters, if given)."""
+    where, params = build_filter(filters, TICKET_FILTER_COLUMNS)
+    return count_rows(conn, "it_tickets", where, params)
+
+# 🌟 Filter tickets in SQL
+def filter_tickets(conn, filters):
+    """
+    Get the tickets matching the filters, evaluated by SQLite.
+
+    Args:
+        conn: Database connection
+        filters: dict of column -> list (IN), {"min", "max"} range or
+                 {"start", "end"} date window; see db.build_filter
+
+    Returns:
+        pandas.DataFrame: Matching tickets
+    """
+    return filter_rows(conn, "it_tickets", filters, TICKET_FILTER_COLUMNS)
+
+# 🔎 Full-text search over ticket subjects and descriptions
+def search_tickets(conn, text, page=1, page_size=20, highlight=("**", "**")):
+    """
+    Search ticket subjects and descriptions with the tickets_fts index.
+
+    Results are ranked by bm25 with subject matches weighted double, and
+    returned one page at a time with a snippet around the matched words.
+
+    Args:
+        conn: Database connection
+        text: Words typed by the user (all must match, last one as prefix)
+        page: Page number, starting at 1
+        page_size: Results per page
+        highlight: (before, after) markers placed around matched words
+
+    Returns:
+        tuple: (pandas.DataFrame of the page, total number of matches)
+    """
+    match = fts_query(text)
+    if match is None:
+        return pd.DataFrame(), 0
+
+    query = """
+    SELECT t.ticket_id, t.subject, t.priority, t.status, t.assigned_to,
+           snippet(tickets_fts, -1, ?, ?, '…', 16) AS snippet,
+           bm25(tickets_fts, 2.0, 1.0) AS rank
+    FROM tickets_fts
+    JOIN it_tickets AS t ON t.id = tickets_fts.rowid
+    WHERE tickets_fts MATCH ?
+    ORDER BY rank, t.id
+    LIMIT ? OFFSET ?
+    """
+    try:
+        total = conn.execute(
+            "SELECT COUNT(*) FROM tickets_fts WHERE tickets_fts MATCH ?", (match,)
+        ).fetchone()[0]
+        df = pd.read_sql_query(query, conn, params=(*highlight, match, page_size,
+                                                    (max(page, 1) - 1) * page_size))
+        return df, total
+    except Exception as e:
+        print(f"Error searching tickets: {e}")
+        return pd.DataFrame(), 0
+
 def update_ticket(conn, ticket_id, new_status):
     """
     Update the status of a ticket.
@@ -89,6 +190,8 @@ def update_ticket(conn, ticket_id, new_status):
             (new_status, ticket_id)
         )
         conn.commit()
+        if cursor.rowcount:  # only a real change invalidates cached reads
+            bump_table_version(conn, "it_tickets")
 
         print(f"✅ Ticket '{ticket_id}' updated to status '{new_status}'")
   
@@ -115,6 +218,8 @@ def delete_ticket(conn, ticket_id):
             (ticket_id,)
         )
         conn.commit()
+        if cursor.rowcount:  # only a real change invalidates cached reads
+            bump_table_version(conn, "it_tickets")
 
         # return row count
         return cursor.rowcount
@@ -123,13 +228,98 @@ def delete_ticket(conn, ticket_id):
         print(f"❌ Error deleting ticket '{ticket_id}': {e}")
         return 0
 
+# ----------------- BATCH FUNCTIONS -----------------
+
+def insert_tickets_many(conn, tickets):
+    """
+    Insert many tickets with one executemany inside one transaction.
+
+    Args:
+        conn: Database connection
+        tickets: Iterable of tuples in insert_ticket() argument order
+                 (ticket_id, priority, status, category, subject, description, ...)
+                 or dicts with those keys
+
+    Returns:
+        list: New row id per input row; None for ticket ids that already
+        exist or repeat in the batch. All None if a row was invalid
+        or the batch was rolled back.
+    """
+    tickets = list(tickets)
+    try:
+        rows = as_row_tuples(tickets, TICKET_COLUMNS)
+        with write_transaction(conn):
+            ids = insert_many(conn, "it_tickets", TICKET_COLUMNS, rows, "ticket_id")
+    except (sqlite3.Error, ValueError) as e:
+        print(f"❌ Batch insert of {len(tickets)} tickets failed: {e}")
+        return [None] * len(tickets)
+
+    inserted = sum(new_id is not None for new_id in ids)
+    if inserted:
+        bump_table_version(conn, "it_tickets")
+    if inserted < len(rows):
+        print(f"⚠️ {len(rows) - inserted} tickets already exist or have no ticket id. Skipping...")
+    print(f"✅ Inserted {inserted} of {len(rows)} tickets.")
+    return ids
+
+
+def update_tickets_many(conn, ticket_ids, new_status):
+    """
+    Set the same status on many tickets in one transaction.
+
+    Returns:
+        list: Rows updated (0 or 1) per ticket id; all 0 on failure
+    """
+    ticket_ids = list(ticket_ids)
+    try:
+        with write_transaction(conn):
+            outcomes = update_many(conn, "it_tickets", "status", "ticket_id",
+                                   ((t, new_status) for t in ticket_ids))
+    except sqlite3.Error as e:
+        print(f"❌ Failed to update {len(ticket_ids)} tickets: {e}")
+        return [0] * len(ticket_ids)
+
+    if any(outcomes):
+        bump_table_version(conn, "it_tickets")
+    print(f"✅ {sum(outcomes)} of {len(ticket_ids)} tickets updated to status '{new_status}'")
+    return outcomes
+
+
+def delete_tickets_many(conn, ticket_ids):
+    """
+    Delete many tickets in one transaction.
+
+    Returns:
+        list: Rows deleted (0 or 1) per ticket id; all 0 on failure
+    """
+    ticket_ids = list(ticket_ids)
+    try:
+        with write_transaction(conn):
+            outcomes = delete_many(conn, "it_tickets", "ticket_id", ticket_ids)
+    except sqlite3.Error as e:
+        print(f"❌ Error deleting {len(ticket_ids)} tickets: {e}")
+        return [0] * len(ticket_ids)
+
+    if any(outcomes):
+        bump_table_version(conn, "it_tickets")
+    return outcomes
+
 def get_ticket_trend(conn):
     """
     Return daily count of tickets created (for line chart visualization)
+
+    Reads the trigger-maintained ticket_rollup_daily table instead of
+    grouping every ticket.
+    """
+    query = """
+    SELECT day AS created_date, SUM(row_count) AS "Tickets Created"
+    FROM ticket_rollup_daily
+    WHERE day != ''
+    GROUP BY day
+    ORDER BY day
     """
-    df = get_all_tickets(conn)
-    df['created_date'] = pd.to_datetime(df['created_date'], errors='coerce')
-    trend_df = df.groupby(df['created_date'].dt.date).size().reset_index(name='Tickets Created')
+    trend_df = pd.read_sql_query(query, conn)
+    trend_df['created_date'] = pd.to_datetime(trend_df['created_date']).dt.date
     return trend_df
 
 
@@ -7,12 +7,14 @@ users.py - Provide helper functions for managing user in daabase
 
 # Get user's data based on username
 def get_user_by_username(conn, username):
-    """Retrieve user by username."""
+    """Retrieve user by username (case-insensitive via COLLATE NOCASE)."""
     
     # Handle SQLite errors during database connection
     try:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE LOWER(username) = LOWER(?)", (username,))
+        # username is declared COLLATE NOCASE, so '=' ignores case and
+        # can seek the UNIQUE index (LOWER() would force a full scan)
+        cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
         user = cursor.fetchone()
         return user
     
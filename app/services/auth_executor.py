@@ -0,0 +1,153 @@
+"""
+auth_executor.py - Run bcrypt hashing and verification on a process pool.
+
+bcrypt is deliberately slow (~250 ms per call at cost 12) and holds the
+CPU the whole time. Running it on worker processes keeps Streamlit script
+threads responsive and lets concurrent logins use every core.
+ - submit_* functions return concurrent.futures.Future objects
+ - *_async functions can be awaited from asyncio code
+ - hash_password / verify_password block until the result is ready
+"""
+
+# -------------------------------
+# Import required modules
+# -------------------------------
+import asyncio
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+
+# -------------------------------
+# Executor settings
+# -------------------------------
+AUTH_WORKERS = os.cpu_count() or 1        # One bcrypt worker per core
+AUTH_QUEUE_LIMIT = AUTH_WORKERS * 4       # Jobs allowed to be queued or running
+AUTH_SUBMIT_TIMEOUT = 5                   # Seconds to wait for a free queue slot
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(AUTH_QUEUE_LIMIT)
+
+
+# -------------------------------
+# Worker functions (run in child processes)
+# -------------------------------
+def _hash_password(plain_text_password):
+    """Hash a password with a fresh salt and return it as a UTF-8 string."""
+    hashed = bcrypt.hashpw(plain_text_password.encode("utf-8"), bcrypt.gensalt())
+    return hashed.decode("utf-8")
+
+
+def _verify_password(plain_text_password, hashed_password):
+    """Return True if the password matches the stored hash."""
+    try:
+        return bcrypt.checkpw(plain_text_password.encode("utf-8"),
+                              hashed_password.encode("utf-8"))
+    except ValueError:
+        # Stored value is not a valid bcrypt hash
+        return False
+
+
+# -------------------------------
+# Executor management
+# -------------------------------
+def get_auth_executor():
+    """
+    Return the process pool, creating it on first use.
+
+    Workers are spawned rather than forked: the server process already
+    runs threads (writer threads, pool locks) that a fork would copy in
+    an arbitrary state.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=AUTH_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def _discard_executor(executor):
+    """Forget a broken pool so the next job starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+
+
+@atexit.register
+def shutdown_auth_executor():
+    """Stop the worker processes (runs automatically at exit)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _submit(func, *args):
+    """
+    Submit a job, applying back-pressure when the queue is full.
+
+    Raises:
+        TimeoutError: If no queue slot frees up within AUTH_SUBMIT_TIMEOUT
+    """
+    if not _slots.acquire(timeout=AUTH_SUBMIT_TIMEOUT):
+        raise TimeoutError("Authentication queue is full. Please try again shortly.")
+    try:
+        executor = get_auth_executor()
+        try:
+            future = executor.submit(func, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed); replace the pool once and retry
+            _discard_executor(executor)
+            executor = get_auth_executor()
+            future = executor.submit(func, *args)
+    except Exception:
+        _slots.release()
+        raise
+
+    def _done(done_future):
+        _slots.release()
+        if not done_future.cancelled() and isinstance(done_future.exception(), BrokenProcessPool):
+            _discard_executor(executor)
+
+    future.add_done_callback(_done)
+    return future
+
+
+# -------------------------------
+# Public API
+# -------------------------------
+def submit_hash_password(plain_text_password):
+    """Queue a password hash. Returns a Future resolving to the hash string."""
+    return _submit(_hash_password, plain_text_password)
+
+
+def submit_verify_password(plain_text_password, hashed_password):
+    """Queue a password check. Returns a Future resolving to True/False."""
+    return _submit(_verify_password, plain_text_password, hashed_password)
+
+
+async def hash_password_async(plain_text_password):
+    """Await a password hash without blocking the event loop."""
+    return await asyncio.wrap_future(submit_hash_password(plain_text_password))
+
+
+async def verify_password_async(plain_text_password, hashed_password):
+    """Await a password check without blocking the event loop."""
+    return await asyncio.wrap_future(submit_verify_password(plain_text_password, hashed_password))
+
+
+def hash_password(plain_text_password):
+    """Hash a password on the worker pool and wait for the result."""
+    return submit_hash_password(plain_text_password).result()
+
+
+def verify_password(plain_text_password, hashed_password):
+    """Verify a password on the worker pool and wait for the result."""
+    return submit_verify_password(plain_text_password, hashed_password).result()
@@ -0,0 +1,103 @@
+"""
+chat_context.py - Build the message list sent to the chat model.
+ - Keeps the system prompt and as many of the newest turns as fit a token budget
+ - Replaces the turns that do not fit with a short summary message
+Token counts are estimates (see db.estimate_tokens), so the budget should
+leave some headroom below the model's real context limit.
+"""
+
+# -------------------------------
+# Import required modules
+# -------------------------------
+from app.data.db import estimate_tokens
+
+# -------------------------------
+# Context budget
+# -------------------------------
+CONTEXT_TOKEN_BUDGET = 8000   # Estimated tokens for system prompt + history + summary
+SUMMARY_TOKEN_BUDGET = 300    # Estimated tokens for the summary of older turns
+SUMMARY_SNIPPET_CHARS = 160   # Characters kept of each summarised user message
+
+
+# -------------------------------
+# Summary of dropped turns
+# -------------------------------
+def summarise_turns(messages, max_tokens=SUMMARY_TOKEN_BUDGET, more_history=False):
+    """
+    Summarise older turns without calling the model.
+
+    Lists the start of the most recent user questions among the dropped
+    turns, newest first, until max_tokens is used.
+
+    Args:
+        messages: Dropped messages, oldest first
+        max_tokens: Budget for the summary text
+        more_history: True if even older messages were never loaded
+
+    Returns:
+        str: Summary text ("" if there is nothing to summarise)
+    """
+    if not messages and not more_history:
+        return ""
+
+    header = f"Summary of {len(messages)} earlier messages not included in full"
+    if more_history:
+        header += " (older history omitted)"
+    lines = [header + ". Earlier user questions, newest first:"]
+    tokens = estimate_tokens(lines[0])
+
+    for message in reversed(messages):
+        if message["role"] != "user":
+            continue
+        text = " ".join(message["content"].split())
+        if len(text) > SUMMARY_SNIPPET_CHARS:
+            text = text[:SUMMARY_SNIPPET_CHARS].rstrip() + "…"
+        line = f"- {text}"
+        cost = estimate_tokens(line) + 1
+        if tokens + cost > max_tokens:
+            break
+        lines.append(line)
+        tokens += cost
+    return "\n".join(lines)
+
+
+# -------------------------------
+# Context builder
+# -------------------------------
+def build_chat_context(system_prompt, messages, max_tokens=CONTEXT_TOKEN_BUDGET,
+                       summary_tokens=SUMMARY_TOKEN_BUDGET, more_history=False):
+    """
+    Fit a conversation into a token budget.
+
+    The system prompt and the newest message are always kept. Older turns
+    are added newest-first while they fit; the rest are replaced by one
+    system message from summarise_turns().
+
+    Args:
+        system_prompt: Domain system prompt (None/"" for none)
+        messages: Conversation without the system prompt, oldest first;
+                  dicts with "role" and "content" (other keys are dropped)
+        max_tokens: Total estimated token budget
+        summary_tokens: Part of the budget reserved for the summary
+        more_history: True if older messages exist that were not loaded
+
+    Returns:
+        list: Messages ({"role", "content"}) to send to the model
+    """
+    context = [{"role": "system", "content": system_prompt}] if system_prompt else []
+    budget = max_tokens - estimate_tokens(system_prompt)
+
+    kept, used = [], 0
+    for message in reversed(messages):
+        cost = estimate_tokens(message["content"])
+        if kept and used + cost > budget - summary_tokens:
+            break
+        kept.append({"role": message["role"], "content": message["content"]})
+        used += cost
+    kept.reverse()
+
+    dropped = messages[:len(messages) - len(kept)]
+    summary = summarise_turns(dropped, summary_tokens, more_history)
+    if summary:
+        context.append({"role": "system", "content": summary})
+    return context + kept
@@ -0,0 +1,150 @@
+"""
+lockout.py - Account lockout and login rate limiting stored in SQLite.
+ - Failed-attempt counters and lock-until timestamps per username
+ - Sliding-window rate limits per username and per client
+State lives in the database, so it survives restarts and is shared by
+every app process using the same file. Nothing here ever sleeps.
+"""
+
+# -------------------------------
+# Import required modules
+# -------------------------------
+import time
+from app.data.db import write_transaction
+
+# -------------------------------
+# Lockout & rate-limit policy
+# -------------------------------
+MAX_ATTEMPTS = 3            # Failed logins before the account is locked
+ACCOUNT_LOCK_TIME = 300     # Lock duration in seconds (5 minutes)
+RATE_LIMIT_WINDOW = 60      # Sliding window length in seconds
+USER_RATE_LIMIT = 10        # Login attempts per username per window
+CLIENT_RATE_LIMIT = 30      # Login attempts per client per window
+
+
+# -------------------------------
+# Lock status
+# -------------------------------
+def get_lock_remaining(conn, username, now=None):
+    """
+    Return how many seconds the account stays locked (0 if not locked).
+    """
+    now = time.time() if now is None else now
+    row = conn.execute(
+        "SELECT locked_until FROM account_locks WHERE username = ?", (username,)
+    ).fetchone()
+    if row is None or row[0] is None or row[0] <= now:
+        return 0
+    return int(row[0] - now) + 1
+
+
+def record_failed_attempt(conn, username, now=None):
+    """
+    Count a failed login and lock the account once MAX_ATTEMPTS is reached.
+
+    Both steps are single atomic statements, so concurrent processes
+    failing at the same time are all counted.
+
+    Returns:
+        tuple: (attempts_used: int, lock_seconds: int) — lock_seconds is 0
+               unless this attempt locked the account
+    """
+    now = time.time() if now is None else now
+    with conn:
+        conn.execute("""
+            INSERT INTO account_locks (username, failed_count, locked_until)
+            VALUES (?, 1, NULL)
+            ON CONFLICT(username) DO UPDATE SET failed_count = failed_count + 1
+        """, (username,))
+        locked = conn.execute("""
+            UPDATE account_locks SET failed_count = 0, locked_until = ?
+            WHERE username = ? AND failed_count >= ?
+        """, (now + ACCOUNT_LOCK_TIME, username, MAX_ATTEMPTS)).rowcount
+
+    if locked:
+        return MAX_ATTEMPTS, ACCOUNT_LOCK_TIME
+    row = conn.execute(
+        "SELECT failed_count FROM account_locks WHERE username = ?", (username,)
+    ).fetchone()
+    return row[0], 0
+
+
+def reset_failed_attempts(conn, username):
+    """Clear the failed-attempt counter and any lock after a successful login."""
+    with conn:
+        conn.execute("DELETE FROM account_locks WHERE username = ?", (username,))
+
+
+# -------------------------------
+# Sliding-window rate limiting
+# -------------------------------
+def record_login_attempt(conn, scope, subject, now=None):
+    """
+    Record a login attempt for a 'user' or 'client' subject and drop every
+    entry (of any subject) that has slid out of the window, so subjects
+    that never come back do not pile up.
+    """
+    now = time.time() if now is None else now
+    with write_transaction(conn):
+        conn.execute(
+            "DELETE FROM login_attempts WHERE attempted_at <= ?",
+            (now - RATE_LIMIT_WINDOW,)
+        )
+        conn.execute(
+            "INSERT INTO login_attempts (scope, subject, attempted_at) VALUES (?, ?, ?)",
+            (scope, subject, now)
+        )
+
+
+def is_rate_limited(conn, scope, subject, limit, now=None):
+    """Return True if the subject made `limit` or more attempts in the window."""
+    now = time.time() if now is None else now
+    count = conn.execute("""
+        SELECT COUNT(*) FROM login_attempts
+        WHERE scope = ? AND subject = ? AND attempted_at > ?
+    """, (scope, subject, now - RATE_LIMIT_WINDOW)).fetchone()[0]
+    return count >= limit
+
+
+def check_login_allowed(conn, username, client_id=None):
+    """
+    Decide whether a login attempt may proceed, and record it.
+
+    The checks and the insert run in one BEGIN IMMEDIATE transaction, so
+    processes sharing the database cannot both pass the last free slot.
+
+    Args:
+        conn: Database connection
+        username: Account being logged into
+        client_id: Optional identifier of the caller; use something that
+                   outlives a browser session (e.g. the client IP)
+
+    Returns:
+        tuple: (allowed: bool, message: str)
+    """
+    now = time.time()
+
+    with write_transaction(conn):
+        remaining = get_lock_remaining(conn, username, now)
+        if remaining:
+            minutes, seconds = divmod(remaining, 60)
+            return False, f"🚫 Account is locked. Try again in {minutes}m {seconds}s."
+
+        if is_rate_limited(conn, "user", username, USER_RATE_LIMIT, now):
+            return False, "⏳ Too many login attempts for this account. Please wait a minute."
+        if client_id and is_rate_limited(conn, "client", client_id, CLIENT_RATE_LIMIT, now):
+            return False, "⏳ Too many login attempts from this client. Please wait a minute."
+
+        record_login_attempt(conn, "user", username, now)
+        if client_id:
+            record_login_attempt(conn, "client", client_id, now)
+    return True, ""
+
+
+def failed_login_message(attempts_used, lock_seconds):
+    """Build the user-facing message for a failed password check."""
+    if lock_seconds:
+        return f"🚫 Too many failed attempts. Account locked for {lock_seconds // 60} minutes."
+    remaining_attempts = MAX_ATTEMPTS - attempts_used
+    return (f"❌ Incorrect password. Attempts used: {attempts_used}. "
+            f"Attempts remaining: {remaining_attempts}")
@@ -8,12 +8,17 @@ user_service.py incoporates functions from auth.py (week 7) and the migration fu
 # -------------------------------
 # Import required modules
 # -------------------------------
-import bcrypt
 import sqlite3
 from pathlib import Path
-from app.data.db import connect_database
+from app.data.db import pooled_connection
+from app.data.schema import ensure_schema
 from app.data.users import get_user_by_username, insert_user
-import secrets # For challenge 4 (Week 7)
+from app.data import sessions as session_store  # Challenge 4: SQLite session store
+from app.services.auth_executor import submit_hash_password, verify_password
+from app.services.lockout import (
+    check_login_allowed, record_failed_attempt,
+    reset_failed_attempts, failed_login_message
+)
 
 # -------------------------------
 # Define paths for migration function
@@ -22,7 +27,6 @@ DATA_DIR = Path("DATA")
 DB_PATH = DATA_DIR / "intelligence_platform.db"
 
 # Initialize required constants & file
-SESSION_FILE = DATA_DIR / "sessions.txt"  # store session tokens (Challenge 4)
 AVAILABLE_ROLES = ["user", "admin", "analyst"] # Define avalible roles
 
 
@@ -40,22 +44,22 @@ def register_user(username: str, password: str, role: str = None) -> tuple:
         tuple: (success: bool, message: str)
     
     """
-    # Connect database
-    conn = connect_database()
+    # Borrow a pooled database connection
+    with pooled_connection() as conn:
 
-    # Validate connection
-    if not conn:
-        return False, "❌ Error! Database connection failed."
+        # Validate connection
+        if not conn:
+            return False, "❌ Error! Database connection failed."
 
-    # Validate if user already exists
-    if get_user_by_username(conn, username):
-        return False, f"Username '{username}' already exists."
+        # Validate if user already exists
+        if get_user_by_username(conn, username):
+            return False, f"Username '{username}' already exists."
 
-    # Hash the password
-    password_bytes = password.encode("utf-8")
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
-    password_hash = hashed.decode("utf-8")
+    # Hash the password on the bcrypt worker pool (runs while the role is validated)
+    try:
+        hash_future = submit_hash_password(password)
+    except TimeoutError as e:
+        return False, f"⏳ {e}"
 
     # --- Role validation (Challenge 2)
     if role is None or role.lower() not in AVAILABLE_ROLES:
@@ -77,12 +81,13 @@ def register_user(username: str, password: str, role: str = None) -> tuple:
 
     # Insert the new user into the database
     try:
-        if insert_user(conn, username, password_hash, role):
-            conn.commit()
-            conn.close()
-            return True, f"User '{username}' - {role} registered successfully as '{role}'!"
-        else:
-            return False, "❌ User not inserted in the database"
+        password_hash = hash_future.result()
+        with pooled_connection() as conn:
+            if conn and insert_user(conn, username, password_hash, role):
+                conn.commit()
+                return True, f"User '{username}' - {role} registered successfully as '{role}'!"
+            else:
+                return False, "❌ User not inserted in the database"
     
     # Error handling to prevent crashes
     except Exception as e:
@@ -90,50 +95,59 @@ def register_user(username: str, password: str, role: str = None) -> tuple:
     
 
 # ==== login_user() function (Week 7 Challenge 3) ===
-def login_user(username, password):
+def login_user(username, password, client_id=None):
     """
     Authenticate a user against the database  
     Args:
         username: User's login name
         password: Plain text password to verify
+        client_id: Optional caller identifier used for per-client rate limiting
         
     Returns:
         tuple: (success: bool, message: str)
     """
-    conn = connect_database()
+    # Get user from database via 'users.py' (pooled connection)
+    with pooled_connection() as conn:
+        if not conn:
+            return False, "❌ Error! Database connection failed."
+        ensure_schema(conn)
+
+        # Challenge 3: lockout & rate limiting (stored in SQLite, never sleeps)
+        allowed, message = check_login_allowed(conn, username, client_id)
+        if not allowed:
+            return False, message
 
-    try:
-        # Get user from database via 'users.py'
         user = get_user_by_username(conn, username)
-    
-        # Validate If user not exists
-        if not user:
-            return False, "Username not found."
-    
-        # Verify password (user[2] is password_hash column)
-        stored_hash = user[2]
-        password_bytes = password.encode('utf-8')
-        hash_bytes = stored_hash.encode('utf-8')
 
-        # Verify password using bcrypt
-        if bcrypt.checkpw(password_bytes, hash_bytes):
+    # Validate If user not exists
+    if not user:
+        return False, "Username not found."
+
+    # Verify password (user[2] is password_hash column)
+    stored_hash = user[2]
+
+    # Verify password using bcrypt on the worker pool
+    try:
+        password_ok = verify_password(password, stored_hash)
+    except TimeoutError as e:
+        return False, f"⏳ {e}"
+
+    with pooled_connection() as conn:
+        if password_ok:
+            reset_failed_attempts(conn, username)
             return True, f"Welcome, {username}!"
         else:
-            return False, "Incorrect password."
-        
-    finally:
-        conn.close()
+            attempts_used, lock_seconds = record_failed_attempt(conn, username)
+            return False, failed_login_message(attempts_used, lock_seconds)
     
 # == Challenge 4: Session Management (from week 7) ==
 def create_session(username):
     """Create a session token for the logged-in user."""
 
-    # Generate a secure random token
-    token = secrets.token_hex(16)
-
-    # Store token with timestamp
-    with open(SESSION_FILE, 'a') as f:
-        f.write(f"{username},{token}\n")
+    # Generate a secure random token and store its hash with an expiry
+    with pooled_connection() as conn:
+        ensure_schema(conn)
+        token = session_store.create_session(conn, username)
 
     # Display session token
     print(f"🛡️ Session token created: {token}")
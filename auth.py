@@ -11,19 +11,21 @@ import os
 from pathlib import Path
 import string # Challenge 1: Password strength
 import re # For Input Validation
-import time # Challenge 3: Account lockout
 import secrets # Challenge 4: Session management
 
+# Challenge 3: lockout state is kept in SQLite (persists across restarts)
+from app.data.db import pooled_connection
+from app.data.schema import ensure_schema
+from app.services.lockout import (
+    ACCOUNT_LOCK_TIME, check_login_allowed,
+    record_failed_attempt, reset_failed_attempts, failed_login_message
+)
+
 # ---------  Step 6. Define Constants & Files
 # Define paths
 DATA_DIR = Path("DATA")       
 USER_DATA_FILE = DATA_DIR / "users.txt"
 SESSION_FILE = DATA_DIR / "sessions.txt" # For Challenge 4
-MAX_ATTEMPTS = 3 # Maximum login attempts
-ACCOUNT_LOCK_TIME = 300  # 5 minutes lockout time (seconds)
-
-#  ---------Dictionary to track failed attempts
-failed_attempts = {} # Challenge 3
 
 # --------- Step 4 - Implement the Password Hashing Function
 def hash_password(plain_text_password: str) -> str:
@@ -207,13 +209,12 @@ def login_user(username, password):
     if not os.path.exists(USER_DATA_FILE):
         return "⚠️ No users registered yet."
     
-    # Initialize failed attempts for the user if not present
-    if username not in failed_attempts:
-        failed_attempts[username] = 0
-    
-    # Check if account is locked
-    if failed_attempts[username] >= MAX_ATTEMPTS:
-        return f"🚫 Account is locked. Please wait {ACCOUNT_LOCK_TIME // 60} minutes before trying again."
+    # Check if account is locked or rate limited (answered without waiting)
+    with pooled_connection() as conn:
+        ensure_schema(conn)
+        allowed, message = check_login_allowed(conn, username)
+    if not allowed:
+        return message
     
     # Read the user data file
     try:
@@ -231,15 +232,11 @@ def login_user(username, password):
 
                     # Verify the password
                     if verify_password(password, hash):
-                        failed_attempts[username] = 0  # Reset on successful login
+                        with pooled_connection() as conn:
+                            reset_failed_attempts(conn, username)  # Reset on successful login
                         return True
                   
-                    failed_attempts[username] += 1
-                    remaining_attempts = MAX_ATTEMPTS - failed_attempts[username]
-                    if remaining_attempts > 0:
-                        return f"❌ Incorrect password. Attempts used: {failed_attempts[username]}. Attempts remaining: {remaining_attempts}"
-                    else:
-                        add_failed_attempt(username)
+                    return add_failed_attempt(username)
         
 
         # Username not found after checking all lines
@@ -391,33 +388,21 @@ def check_password_strength(password):
     
 # == Challenge 3: Account Lockout ==
 def add_failed_attempt(username):
-    """Implement a system that locks accounts after 3 failed login attempts:"""
-
-    print("🚫 Too many failed attempts. Account locked for 5 minutes.")
-
-    # Countdown timer for lockout
-    remaining_time = ACCOUNT_LOCK_TIME
+    """
+    Record a failed login; the account locks after 3 failed attempts.
 
-    # Display countdown
-    while remaining_time > 0:
-        # Calculate minutes and seconds
-        minutes = remaining_time // 60
-        seconds = remaining_time % 60
+    The lock is a 'locked until' timestamp in SQLite, so nothing sleeps
+    and the lock survives restarts.
 
-        # Display remaining_time time
-        print(f"\r🔒 Try again in {minutes}m {seconds}s", end="")
-
-        # Wait for 1 second
-        time.sleep(1)
-
-        # Decrement remaining time
-        remaining_time -= 1
-
-    # Unlock message
-    print("\n🔓 Account unlocked. You can try logging in again.")
-    failed_attempts[username] = 0  # Reset after lockout
-
-    return True # Account unlocked
+    Returns:
+        str: Message describing the attempts left or the lock
+    """
+    with pooled_connection() as conn:
+        attempts_used, lock_seconds = record_failed_attempt(conn, username)
+
+    if lock_seconds:
+        print(f"🚫 Too many failed attempts. Account locked for {ACCOUNT_LOCK_TIME // 60} minutes.")
+    return failed_login_message(attempts_used, lock_seconds)
 
 
 # == Challenge 4: Session Management ==
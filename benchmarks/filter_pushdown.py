@@ -0,0 +1,128 @@
+"""
+filter_pushdown.py - Benchmark SQL filters against pandas boolean masks.
+
+Builds incident tables of increasing size and times the Analytics
+severity/status/date filter three ways:
+  • pandas mask on a DataFrame already in memory (cached page)
+  • full table read + pandas mask (uncached page)
+  • filter_incidents(), i.e. the filter evaluated by SQLite on indexes
+
+Usage (from the project root):
+    python -m benchmarks.filter_pushdown --sizes 10000 100000 1000000
+"""
+
+# ---------------
+# Import modules
+# ---------------
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from app.data.db import connect_database
+from app.data.schema import apply_migrations
+from app.data.incidents import filter_incidents, count_incidents
+
+INCIDENT_TYPES = ["Phishing", "Malware", "DDoS", "Ransomware", "Insider Threat"]
+SEVERITIES = ["Low", "Medium", "High", "Critical"]
+STATUSES = ["Open", "Investigating", "Resolved", "Closed"]
+
+# Selective filter, like narrowing the Analytics widgets to the hot backlog
+FILTERS = {
+    "severity": ["Critical"],
+    "status": ["Open", "Investigating"],
+    "date": {"start": "2024-06-01", "end": "2024-06-30"},
+}
+
+
+def seed(conn, rows, seed_value=42):
+    """Insert rows synthetic incidents spread over two years."""
+    rng = random.Random(seed_value)
+    batch = []
+    for i in range(rows):
+        day = rng.randrange(730)
+        batch.append((
+            (pd.Timestamp("2023-01-01") + pd.Timedelta(days=day)).strftime("%Y-%m-%d"),
+            rng.choice(INCIDENT_TYPES), rng.choice(SEVERITIES), rng.choice(STATUSES),
+            f"synthetic incident {i}", "bench", f"bench-{i}",
+        ))
+        if len(batch) == 50000:
+            _insert(conn, batch)
+            batch = []
+    if batch:
+        _insert(conn, batch)
+    conn.execute("ANALYZE")
+
+
+def _insert(conn, batch):
+    with conn:
+        conn.executemany(
+            "INSERT INTO cyber_incidents (date, incident_type, severity, status, description, "
+            "reported_by, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            batch,
+        )
+
+
+def pandas_mask(df):
+    """The filter as 2_Analytics.py used to apply it."""
+    return df[
+        df["severity"].isin(FILTERS["severity"])
+        & df["status"].isin(FILTERS["status"])
+        & (df["date"] >= FILTERS["date"]["start"])
+        & (df["date"] <= FILTERS["date"]["end"])
+    ]
+
+
+def best_of(func, repeat):
+    """Return (best seconds, last result) over repeat runs."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_size(rows, repeat):
+    """Time the three filter paths on a table with the given number of rows."""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect_database(Path(tmp) / "bench.db")
+        apply_migrations(conn)
+        seed(conn, rows)
+
+        df = pd.read_sql_query("SELECT * FROM cyber_incidents", conn)
+        mask_time, mask_result = best_of(lambda: pandas_mask(df), repeat)
+        load_time, _ = best_of(
+            lambda: pandas_mask(pd.read_sql_query("SELECT * FROM cyber_incidents", conn)), repeat)
+        sql_time, sql_result = best_of(lambda: filter_incidents(conn, FILTERS), repeat)
+
+        assert len(mask_result) == len(sql_result) == count_incidents(conn, FILTERS)
+        conn.close()
+
+    return {
+        "rows": rows,
+        "matches": len(sql_result),
+        "mask_in_memory_ms": mask_time * 1000,
+        "read_and_mask_ms": load_time * 1000,
+        "sql_filter_ms": sql_time * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'matches':>8} {'mask (mem)':>12} {'read+mask':>12} {'SQL filter':>12}")
+    for rows in args.sizes:
+        r = run_size(rows, args.repeat)
+        print(f"{r['rows']:>10} {r['matches']:>8} {r['mask_in_memory_ms']:>10.1f}ms "
+              f"{r['read_and_mask_ms']:>10.1f}ms {r['sql_filter_ms']:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
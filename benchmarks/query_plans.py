@@ -0,0 +1,100 @@
+"""
+query_plans.py - Check that the analytics queries are served by indexes.
+
+Runs every function in CHECKED_QUERIES against a database built from the
+CSV files in DATA/, captures the SQL each one issues and prints its
+EXPLAIN QUERY PLAN. Exits with status 1 if any statement falls back to a
+full table SCAN, so it can be used as a regression check.
+
+Usage (from the project root):
+    python -m benchmarks.query_plans
+"""
+
+# ---------------
+# Import modules
+# ---------------
+import sys
+import tempfile
+from pathlib import Path
+
+from app.data.db import connect_database, sync_csv_data, explain_query_plan, find_full_scans
+from app.data.schema import apply_migrations
+from app.data import db, incidents, tickets
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "DATA"
+
+# (label, function called with the connection)
+CHECKED_QUERIES = [
+    ("get_incidents_by_type_count", incidents.get_incidents_by_type_count),
+    ("get_high_severity_by_status", incidents.get_high_severity_by_status),
+    ("unresolved_incidents_by_type", incidents.unresolved_incidents_by_type),
+    ("get_threat_spike", incidents.get_threat_spike),
+    ("get_resolution_bottleneck", incidents.get_resolution_bottleneck),
+    ("get_resolution_bottleneck (percentiles)",
+     lambda conn: incidents.get_resolution_bottleneck(conn, percentiles=True)),
+    ("get_unresolved_tickets", tickets.get_unresolved_tickets),
+    ("get_ticket_delays", tickets.get_ticket_delays),
+    ("load_messages", lambda conn: db.load_messages(conn, "alice", "Cybersecurity")),
+    ("load_recent_messages",
+     lambda conn: db.load_recent_messages(conn, "alice", "Cybersecurity", before_id=1000)),
+]
+
+
+def build_database(db_path):
+    """Create a database with the current schema and the sample CSV data."""
+    conn = connect_database(db_path)
+    apply_migrations(conn)
+    for table in ("cyber_incidents", "it_tickets", "datasets_metadata"):
+        sync_csv_data(conn, DATA_DIR / f"{table}.csv", table)
+    return conn
+
+
+def capture_statements(conn, func):
+    """Run func(conn) and return the SQL statements it executed."""
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        func(conn)
+    finally:
+        conn.set_trace_callback(None)
+    return [s for s in statements if s.lstrip().upper().startswith(("SELECT", "WITH"))]
+
+
+def check_query_plans(conn):
+    """
+    Print the plan of every checked statement.
+
+    Returns:
+        list: (label, statement, full scan steps) for each regression
+    """
+    failures = []
+    for label, func in CHECKED_QUERIES:
+        for sql in capture_statements(conn, func):
+            plan = explain_query_plan(conn, sql)
+            scans = find_full_scans(conn, plan)
+            print(f"{'❌' if scans else '✅'} {label}")
+            for step in plan:
+                print(f"      {step}")
+            if scans:
+                failures.append((label, " ".join(sql.split()), scans))
+    return failures
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_database(Path(tmp) / "plans.db")
+        print("=" * 60)
+        failures = check_query_plans(conn)
+        conn.close()
+
+    print("=" * 60)
+    if failures:
+        print(f"{len(failures)} statement(s) regressed to a full table scan:")
+        for label, sql, scans in failures:
+            print(f"  • {label}: {', '.join(scans)}\n    {sql}")
+        sys.exit(1)
+    print("All checked queries use an index.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+slow_query_log.py - Check that slow statements reach slow_query_log.
+
+Runs each function in CHECKED_CALLS against a migrated database with the
+slow query threshold set to 0 ms, so every statement counts as slow, and
+checks that the statement it issues was written to slow_query_log. Calls
+that read a single row with fetchone() are included: their cursor is only
+finished when it is garbage collected. Exits with status 1 if a statement
+is missing, so it can be used as a regression check.
+
+Usage (from the project root):
+    python -m benchmarks.slow_query_log
+"""
+
+# ---------------
+# Import modules
+# ---------------
+import sys
+import tempfile
+from pathlib import Path
+
+from app.data.db import connect_database, count_rows
+from app.data.schema import apply_migrations
+from app.data import querylog
+
+# (label, function called with the connection, fingerprint expected in the log)
+CHECKED_CALLS = [
+    ("count_rows (conn.execute().fetchone())",
+     lambda conn: count_rows(conn, "cyber_incidents"),
+     "SELECT COUNT(*) FROM cyber_incidents"),
+    ("first row of a multi-row result",
+     lambda conn: conn.cursor().execute(
+         "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name").fetchone(),
+     "SELECT name FROM sqlite_master WHERE type = ? ORDER BY name"),
+]
+
+
+def check_slow_query_log(conn):
+    """
+    Run every checked call and look for its statement in slow_query_log.
+
+    Returns:
+        list: Labels of the calls whose statement was not logged
+    """
+    failures = []
+    previous = querylog.query_log_stats()["slow_ms"]
+    querylog.set_slow_query_threshold(0)
+    try:
+        for label, func, expected in CHECKED_CALLS:
+            func(conn)
+            querylog.flush_slow_query_log()
+            logged = conn.execute(
+                "SELECT COUNT(*) FROM slow_query_log WHERE fingerprint LIKE ?",
+                (f"%{expected}%",)
+            ).fetchone()[0]
+            print(f"{'✅' if logged else '❌'} {label}")
+            if not logged:
+                failures.append(label)
+    finally:
+        querylog.set_slow_query_threshold(previous)
+    return failures
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect_database(Path(tmp) / "slow.db")
+        apply_migrations(conn)
+        print("=" * 60)
+        failures = check_slow_query_log(conn)
+        conn.close()
+
+    print("=" * 60)
+    if failures:
+        print(f"{len(failures)} slow statement(s) missing from slow_query_log:")
+        for label in failures:
+            print(f"  • {label}")
+        sys.exit(1)
+    print("All checked slow statements were logged.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+spike_detection.py - Benchmark the incremental spike detector on a synthetic feed.
+
+Replays several years of incidents day by day through insert_incident(),
+which updates the per-type EWMA state as each incident lands. Known
+bursts are injected into the feed; after each day get_current_spikes()
+is read once and the flagged (type, day) pairs are compared with the
+injected ones. Also times a full rebuild_spike_state() and the old
+approach of recomputing every type's series with get_threat_spike().
+
+Usage (from the project root):
+    python -m benchmarks.spike_detection --years 3 --bursts 20
+"""
+
+# ---------------
+# Import modules
+# ---------------
+import argparse
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from app.data.db import connect_database
+from app.data.schema import apply_migrations
+from app.data.incidents import insert_incident, get_threat_spike
+from app.data.spikes import get_current_spikes, rebuild_spike_state
+
+# Average incidents per day for each type
+BASE_RATES = {"Phishing": 3.0, "Malware": 2.0, "DDoS": 0.5, "Ransomware": 0.3, "Insider Threat": 0.1}
+BURST_SIZE = (8, 15)  # Extra incidents on a burst day
+
+
+def poisson(rng, rate):
+    """Draw a Poisson count (Knuth's method is fine for small rates)."""
+    limit, k, p = pow(2.718281828459045, -rate), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= limit:
+            return k
+        k += 1
+
+
+def build_feed(years, bursts, seed=7):
+    """Return ({day: {type: count}}, set of injected (type, day))."""
+    rng = random.Random(seed)
+    start = date(2022, 1, 1)
+    days = [start + timedelta(days=i) for i in range(365 * years)]
+    feed = {d: {t: poisson(rng, r) for t, r in BASE_RATES.items()} for d in days}
+
+    injected = set()
+    for _ in range(bursts):
+        day = rng.choice(days[30:])  # leave warm-up history
+        incident_type = rng.choice(list(BASE_RATES))
+        feed[day][incident_type] += rng.randint(*BURST_SIZE)
+        injected.add((incident_type, day.isoformat()))
+    return feed, injected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--bursts", type=int, default=20)
+    args = parser.parse_args()
+
+    feed, injected = build_feed(args.years, args.bursts)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect_database(Path(tmp) / "bench.db")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        apply_migrations(conn)
+
+        inserts, insert_time, read_time, reads = 0, 0.0, 0.0, 0
+        flagged = set()
+        for day, counts in feed.items():
+            start = time.perf_counter()
+            for incident_type, count in counts.items():
+                for _ in range(count):
+                    insert_incident(conn, day.isoformat(), incident_type, "Medium", "Open",
+                                    f"synthetic {incident_type} {inserts}", "bench")
+                    inserts += 1
+            insert_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            spikes = get_current_spikes(conn, since=day.isoformat())
+            read_time += time.perf_counter() - start
+            reads += 1
+            flagged.update((s["incident_type"], s["day"]) for s in spikes)
+
+        start = time.perf_counter()
+        rebuild_spike_state(conn)
+        rebuild_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for incident_type in BASE_RATES:
+            get_threat_spike(conn, incident_type)
+        series_time = time.perf_counter() - start
+        conn.close()
+
+    hits = len(flagged & injected)
+    print(f"Feed: {args.years} years, {inserts} incidents, {len(injected)} injected bursts")
+    print(f"insert_incident + spike update: {insert_time / inserts * 1e6:8.1f} µs per incident")
+    print(f"get_current_spikes():           {read_time / reads * 1e6:8.1f} µs per read")
+    print(f"rebuild_spike_state():          {rebuild_time * 1000:8.1f} ms for all types")
+    print(f"get_threat_spike() x {len(BASE_RATES)} types:    {series_time * 1000:8.1f} ms")
+    print(f"Detected {hits}/{len(injected)} bursts, {len(flagged - injected)} other days flagged")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,579 @@
+"""
+suite.py - Time every public data-layer and service function.
+
+For each size a database is seeded with app.data.generator (size
+incidents, size/2 tickets, size/5 datasets, size chat messages) and every
+case in CASES is timed. Cheap calls are looped until a batch takes about
+BATCH_SECONDS; calls that change the database get fresh arguments from a
+setup step that is not timed. Results (per-call min and median, in ms)
+are written as JSON. With --compare, the run is checked against an older
+results file and the script exits with status 1 if any case got slower
+than --threshold, so it can gate a change like query_plans does.
+
+The service functions use the default DATA/ paths, so each size runs
+inside its own temporary directory; the real database is never touched.
+
+Usage (from the project root):
+    python -m benchmarks.suite --sizes 1000 10000 100000
+    python -m benchmarks.suite --compare benchmarks/results/before.json --threshold 0.25
+    python -m benchmarks.suite --only incidents --sizes 10000
+"""
+
+# ---------------
+# Import modules
+# ---------------
+import argparse
+import contextlib
+import inspect
+import io
+import itertools
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from app.data import cache, chatwriter, datasets, db, incidents, querylog, sessions, spikes, tickets, users
+from app.data.db import connect_database, apply_connection_profile, close_all_pools
+from app.data.schema import apply_migrations
+from app.data.generator import (
+    GENERATED_PASSWORD,
+    GENERATED_PASSWORD_HASH,
+    generate_rows,
+    write_csv,
+    write_database,
+)
+from app.services import auth_executor, chat_context, lockout, user_service
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+BATCH_SECONDS = 0.05   # Loop cheap calls until one batch takes this long
+MAX_LOOPS = 10_000     # ... but never more calls than this per batch
+SEED = 42
+BATCH_ROWS = 100       # Rows per call in the *_many cases
+
+# Modules whose public functions must all have a case
+COVERED_MODULES = [incidents, tickets, datasets, users, db, sessions, spikes, cache, querylog,
+                   chatwriter, lockout, user_service, auth_executor, chat_context]
+
+# Plumbing the cases use themselves, or wrappers timed through another case
+NOT_BENCHMARKED = {
+    "connect_database", "apply_connection_profile", "explain_query_plan", "find_full_scans",
+    "get_pool", "acquire_connection", "release_connection", "pool_stats", "close_all_pools",
+    "cache_stats", "clear_cache", "get_auth_executor", "shutdown_auth_executor",
+    "submit_hash_password", "submit_verify_password", "hash_password_async", "verify_password_async",
+    "set_slow_query_threshold", "enable_query_log", "query_log_stats", "reset_query_log",
+    "flush_slow_query_log", "clear_slow_query_log",
+    "write_transaction", "as_row_tuples", "insert_many", "update_many", "delete_many",
+    "queue_message", "chat_writer_stats",
+}
+
+
+# ----------------- CONTEXT -----------------
+class Context:
+    """Seeded database and sample keys shared by the cases of one size."""
+
+    def __init__(self, root, size):
+        self.root = root
+        self.size = size
+        self.counts = {
+            "users": max(10, size // 100),
+            "cyber_incidents": size,
+            "it_tickets": size // 2,
+            "datasets_metadata": size // 5,
+            "chat_history": size,
+        }
+        self.db_path = root / "DATA" / "intelligence_platform.db"
+        self.template_path = root / "template.db"
+        self.csv_dir = root / "csv"
+        self.unique = itertools.count(1)
+        self.conn = None
+
+    def seed(self):
+        """Create the empty template, the seeded database and the CSV files."""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        template = connect_database(self.template_path)
+        apply_migrations(template)
+        template.close()
+
+        shutil.copy(self.template_path, self.db_path)
+        self.conn = connect_database(self.db_path)
+        apply_connection_profile(self.conn)
+        write_database(self.conn, self.counts, SEED)
+        self.conn.execute("ANALYZE")
+        write_csv(self.csv_dir, {"it_tickets": self.counts["it_tickets"]}, SEED)
+
+        self.incident_ids = self.column("SELECT id FROM cyber_incidents LIMIT 1000")
+        self.ticket_ids = self.column("SELECT ticket_id FROM it_tickets LIMIT 1000")
+        self.dataset_names = self.column("SELECT dataset_name FROM datasets_metadata LIMIT 1000")
+        self.usernames = self.column("SELECT username FROM users")
+        self.chat_user = self.conn.execute(
+            "SELECT user_id, domain FROM chat_history GROUP BY 1, 2 ORDER BY COUNT(*) DESC LIMIT 1"
+        ).fetchone()
+        # Cursors halfway through the tables, for the deep page cases
+        _, self.incident_cursor = incidents.get_incidents_page(self.conn, page_size=self.size // 2 or 1)
+        _, self.ticket_cursor = tickets.get_tickets_page(
+            self.conn, page_size=self.counts["it_tickets"] // 2 or 1, sort_key="created_date")
+        self.session_token = sessions.create_session(self.conn, self.usernames[0])
+
+    def column(self, sql):
+        return [row[0] for row in self.conn.execute(sql)]
+
+    def name(self, prefix):
+        """A value nobody used yet (for inserts with unique keys)."""
+        return f"{prefix}_{next(self.unique):08d}"
+
+    def pick(self, values):
+        return values[next(self.unique) % len(values)]
+
+    def fresh_database(self):
+        """Copy of the migrated but empty template (for CSV loads)."""
+        path = self.root / f"fresh_{next(self.unique)}.db"
+        shutil.copy(self.template_path, path)
+        return connect_database(path)
+
+
+# ----------------- CASES -----------------
+# name -> (function timed with the setup's arguments, setup(ctx) -> args, repeat)
+# A case without setup is called with (ctx,) by its lambda.
+CASES = {}
+
+
+def case(name, func, setup, repeat=None):
+    """Register a call func(*setup(ctx)); the first word of name is the function."""
+    CASES[name] = (func, setup, repeat)
+
+
+def simple(name, func):
+    """Register a read-only call func(ctx)."""
+    CASES[name] = (func, None, None)
+
+
+DATE_FILTERS = {"severity": ["Critical"], "status": ["Open", "Investigating"],
+                "date": {"start": "2024-06-01", "end": "2024-06-30"}}
+TICKET_FILTERS = {"priority": ["High"], "status": ["Open", "In Progress"]}
+DATASET_FILTERS = {"category": ["Cyber"], "record_count": {"min": 100000}}
+
+# --- incidents ---
+case("insert_incident", incidents.insert_incident,
+     lambda ctx: (ctx.conn, "2025-12-31", "Phishing", "High", "Open", ctx.name("bench incident"), "bench"))
+simple("get_all_incidents", lambda ctx: incidents.get_all_incidents(ctx.conn))
+simple("get_incidents_page (first)", lambda ctx: incidents.get_incidents_page(ctx.conn))
+simple("get_incidents_page (deep)",
+       lambda ctx: incidents.get_incidents_page(ctx.conn, cursor=ctx.incident_cursor))
+simple("count_incidents", lambda ctx: incidents.count_incidents(ctx.conn, DATE_FILTERS))
+simple("filter_incidents", lambda ctx: incidents.filter_incidents(ctx.conn, DATE_FILTERS))
+simple("search_incidents", lambda ctx: incidents.search_incidents(ctx.conn, "encryption detected"))
+case("update_incident_status", incidents.update_incident_status,
+     lambda ctx: (ctx.conn, ctx.pick(ctx.incident_ids), ctx.pick(["Open", "Resolved"])))
+case("delete_incident", incidents.delete_incident,
+     lambda ctx: (ctx.conn, incidents.insert_incident(ctx.conn, "2025-12-31", "Malware", "Medium",
+                                                     "Resolved", ctx.name("bench delete"), "bench")))
+
+
+def _incident_batch(ctx, prefix):
+    return [("2025-12-31", "Phishing", "High", "Open", ctx.name(prefix), "bench")
+            for _ in range(BATCH_ROWS)]
+
+
+def _new_incidents(ctx):
+    return ctx.conn, incidents.insert_incidents_many(ctx.conn, _incident_batch(ctx, "bench delete"))
+
+
+case(f"insert_incidents_many ({BATCH_ROWS} rows)", incidents.insert_incidents_many,
+     lambda ctx: (ctx.conn, _incident_batch(ctx, "bench batch")))
+case(f"update_incident_status_many ({BATCH_ROWS} rows)", incidents.update_incident_status_many,
+     lambda ctx: (ctx.conn, ctx.incident_ids[:BATCH_ROWS], ctx.pick(["Open", "Resolved"])))
+case(f"delete_incidents_many ({BATCH_ROWS} rows)", incidents.delete_incidents_many, _new_incidents)
+simple("get_incidents_by_type_count", lambda ctx: incidents.get_incidents_by_type_count(ctx.conn))
+simple("get_high_severity_by_status", lambda ctx: incidents.get_high_severity_by_status(ctx.conn))
+simple("get_incident_types_with_many_cases",
+       lambda ctx: incidents.get_incident_types_with_many_cases(ctx.conn))
+simple("get_incident_trend", lambda ctx: incidents.get_incident_trend(ctx.conn))
+simple("get_monthly_incident_counts", lambda ctx: incidents.get_monthly_incident_counts(ctx.conn))
+simple("get_daily_incident_counts",
+       lambda ctx: incidents.get_daily_incident_counts(ctx.conn, "2025-01-01", "2025-12-31"))
+simple("unresolved_incidents_by_type", lambda ctx: incidents.unresolved_incidents_by_type(ctx.conn))
+simple("get_threat_spike", lambda ctx: incidents.get_threat_spike(ctx.conn))
+simple("get_resolution_bottleneck", lambda ctx: incidents.get_resolution_bottleneck(ctx.conn))
+simple("get_resolution_bottleneck (percentiles)",
+       lambda ctx: incidents.get_resolution_bottleneck(ctx.conn, percentiles=True))
+
+# --- tickets ---
+case("insert_ticket", tickets.insert_ticket,
+     lambda ctx: (ctx.conn, ctx.name("BT"), "High", "Open", "Network", "VPN dropouts",
+                  "VPN dropouts reported by user.", "2025-12-31", None, "Alice"))
+simple("get_all_tickets", lambda ctx: tickets.get_all_tickets(ctx.conn))
+simple("get_tickets_page (first)", lambda ctx: tickets.get_tickets_page(ctx.conn))
+simple("get_tickets_page (deep)",
+       lambda ctx: tickets.get_tickets_page(ctx.conn, cursor=ctx.ticket_cursor, sort_key="created_date"))
+simple("count_tickets", lambda ctx: tickets.count_tickets(ctx.conn, TICKET_FILTERS))
+simple("filter_tickets", lambda ctx: tickets.filter_tickets(ctx.conn, TICKET_FILTERS))
+simple("search_tickets", lambda ctx: tickets.search_tickets(ctx.conn, "vpn"))
+case("update_ticket", tickets.update_ticket,
+     lambda ctx: (ctx.conn, ctx.pick(ctx.ticket_ids), ctx.pick(["Open", "Resolved"])))
+
+
+def _new_ticket(ctx):
+    ticket_id = ctx.name("BD")
+    tickets.insert_ticket(ctx.conn, ticket_id, "Low", "Open", "Hardware", "HDD failure",
+                          "HDD failure reported by user.", "2025-12-31", None, "Bob")
+    return ctx.conn, ticket_id
+
+
+case("delete_ticket", tickets.delete_ticket, _new_ticket)
+
+
+def _ticket_batch(ctx, prefix):
+    return [(ctx.name(prefix), "Low", "Open", "Hardware", "HDD failure", "HDD failure reported by user.",
+             "2025-12-31", None, "Bob") for _ in range(BATCH_ROWS)]
+
+
+def _new_tickets(ctx):
+    rows = _ticket_batch(ctx, "BMD")
+    tickets.insert_tickets_many(ctx.conn, rows)
+    return ctx.conn, [row[0] for row in rows]
+
+
+case(f"insert_tickets_many ({BATCH_ROWS} rows)", tickets.insert_tickets_many,
+     lambda ctx: (ctx.conn, _ticket_batch(ctx, "BMT")))
+case(f"update_tickets_many ({BATCH_ROWS} rows)", tickets.update_tickets_many,
+     lambda ctx: (ctx.conn, ctx.ticket_ids[:BATCH_ROWS], ctx.pick(["Open", "Resolved"])))
+case(f"delete_tickets_many ({BATCH_ROWS} rows)", tickets.delete_tickets_many, _new_tickets)
+simple("get_ticket_trend", lambda ctx: tickets.get_ticket_trend(ctx.conn))
+simple("get_unresolved_tickets", lambda ctx: tickets.get_unresolved_tickets(ctx.conn))
+simple("get_ticket_delays", lambda ctx: tickets.get_ticket_delays(ctx.conn))
+
+# --- datasets ---
+case("insert_dataset", datasets.insert_dataset,
+     lambda ctx: (ctx.conn, ctx.name("Bench Dataset"), "API", "IT", "2025-12-31", 1000, 1.5))
+simple("get_all_datasets", lambda ctx: datasets.get_all_datasets(ctx.conn))
+simple("get_datasets_page", lambda ctx: datasets.get_datasets_page(ctx.conn, sort_key="last_updated"))
+simple("count_datasets", lambda ctx: datasets.count_datasets(ctx.conn, DATASET_FILTERS))
+simple("filter_datasets", lambda ctx: datasets.filter_datasets(ctx.conn, DATASET_FILTERS))
+case("update_dataset", datasets.update_dataset,
+     lambda ctx: (ctx.conn, ctx.pick(ctx.dataset_names), next(ctx.unique)))
+
+
+def _new_dataset(ctx):
+    name = ctx.name("Bench Delete")
+    datasets.insert_dataset(ctx.conn, name, "API", "IT", "2025-12-31", 10, 0.1)
+    return ctx.conn, name
+
+
+case("delete_dataset", datasets.delete_dataset, _new_dataset)
+
+
+def _dataset_batch(ctx, prefix):
+    return [(ctx.name(prefix), "API", "IT", "2025-12-31", 10, 0.1) for _ in range(BATCH_ROWS)]
+
+
+def _new_datasets(ctx):
+    rows = _dataset_batch(ctx, "Bench Batch Delete")
+    datasets.insert_datasets_many(ctx.conn, rows)
+    return ctx.conn, [row[0] for row in rows]
+
+
+case(f"insert_datasets_many ({BATCH_ROWS} rows)", datasets.insert_datasets_many,
+     lambda ctx: (ctx.conn, _dataset_batch(ctx, "Bench Batch")))
+case(f"update_datasets_many ({BATCH_ROWS} rows)", datasets.update_datasets_many,
+     lambda ctx: (ctx.conn, [(name, next(ctx.unique)) for name in ctx.dataset_names[:BATCH_ROWS]]))
+case(f"delete_datasets_many ({BATCH_ROWS} rows)", datasets.delete_datasets_many, _new_datasets)
+simple("get_top_recent_updates", lambda ctx: datasets.get_top_recent_updates(ctx.conn))
+simple("display_resource_usage", lambda ctx: datasets.display_resource_usage(ctx.conn))
+simple("list_datasets_by_source", lambda ctx: datasets.list_datasets_by_source(ctx.conn))
+
+# --- users ---
+simple("get_user_by_username", lambda ctx: users.get_user_by_username(ctx.conn, ctx.usernames[-1]))
+case("insert_user", users.insert_user,
+     lambda ctx: (ctx.conn, ctx.name("bench_user"), GENERATED_PASSWORD_HASH))
+
+# --- db ---
+simple("fetch_page", lambda ctx: db.fetch_page(ctx.conn, "cyber_incidents", "date", descending=True))
+simple("count_rows", lambda ctx: db.count_rows(ctx.conn, "cyber_incidents"))
+simple("filter_rows", lambda ctx: db.filter_rows(ctx.conn, "cyber_incidents", DATE_FILTERS,
+                                                 incidents.INCIDENT_FILTER_COLUMNS))
+simple("build_filter", lambda ctx: db.build_filter(DATE_FILTERS, incidents.INCIDENT_FILTER_COLUMNS))
+simple("fts_query", lambda ctx: db.fts_query('vpn "dropouts'))
+simple("encode_cursor", lambda ctx: db.encode_cursor(["2025-12-31", 123456]))
+simple("decode_cursor", lambda ctx: db.decode_cursor(ctx.incident_cursor))
+simple("get_table_versions", lambda ctx: db.get_table_versions(ctx.conn))
+simple("lookup_keys", lambda ctx: db.lookup_keys(ctx.conn, "it_tickets", "ticket_id", ctx.ticket_ids))
+simple("content_hash", lambda ctx: db.content_hash("2025-12-31", "Phishing", "bench", "alice"))
+simple("file_fingerprint", lambda ctx: db.file_fingerprint(ctx.csv_dir / "it_tickets.csv"))
+
+
+def _empty_load(ctx):
+    return ctx.fresh_database(), ctx.csv_dir / "it_tickets.csv", "it_tickets"
+
+
+case("load_csv_in_chunks", db.load_csv_in_chunks, _empty_load, repeat=3)
+case("load_all_csv_data", db.load_all_csv_data, _empty_load, repeat=3)
+case("sync_csv_data (new rows)", db.sync_csv_data, _empty_load, repeat=3)
+simple("sync_csv_data (unchanged file)",
+       lambda ctx: db.sync_csv_data(ctx.conn, ctx.csv_dir / "it_tickets.csv", "it_tickets"))
+case("save_message", db.save_message,
+     lambda ctx: (ctx.conn, *ctx.chat_user, "user", ctx.name("bench message")))
+case("save_message_async", db.save_message_async,
+     lambda ctx: (ctx.conn, *ctx.chat_user, "user", ctx.name("bench message")))
+simple("load_messages", lambda ctx: db.load_messages(ctx.conn, *ctx.chat_user))
+simple("load_recent_messages", lambda ctx: db.load_recent_messages(ctx.conn, *ctx.chat_user))
+simple("load_recent_messages (token budget)",
+       lambda ctx: db.load_recent_messages(ctx.conn, *ctx.chat_user, limit=None, max_tokens=4000))
+simple("estimate_tokens", lambda ctx: db.estimate_tokens("How do I rotate the VPN certificates?"))
+
+
+def _queued_messages(ctx):
+    user = ctx.name("bench_chat")
+    for i in range(BATCH_ROWS):
+        db.save_message_async(ctx.conn, user, "Cybersecurity", "user", f"bench message {i}")
+    return (10.0,)  # timeout
+
+
+def _saved_chat(ctx):
+    user = ctx.name("bench_clear")
+    for i in range(10):
+        db.save_message_async(ctx.conn, user, "Cybersecurity", "user", f"bench message {i}")
+    chatwriter.flush_chat_writes()
+    return ctx.conn, user, "Cybersecurity"
+
+
+case(f"flush_chat_writes ({BATCH_ROWS} queued)", chatwriter.flush_chat_writes, _queued_messages)
+case("clear_messages", db.clear_messages, _saved_chat)
+
+
+def _pooled_round_trip(ctx):
+    with db.pooled_connection() as conn:
+        conn.execute("SELECT 1").fetchone()
+
+
+simple("pooled_connection", _pooled_round_trip)
+
+# --- sessions ---
+case("create_session", sessions.create_session, lambda ctx: (ctx.conn, ctx.usernames[0]))
+simple("validate_session", lambda ctx: sessions.validate_session(ctx.conn, ctx.session_token))
+simple("hash_token", lambda ctx: sessions.hash_token(ctx.session_token))
+case("revoke_session", sessions.revoke_session,
+     lambda ctx: (ctx.conn, sessions.create_session(ctx.conn, ctx.usernames[0])))
+simple("purge_expired_sessions", lambda ctx: sessions.purge_expired_sessions(ctx.conn))
+
+# --- spikes ---
+case("update_spike_state", spikes.update_spike_state, lambda ctx: (ctx.conn, "Phishing", "2025-12-31"))
+case("rebuild_spike_state", spikes.rebuild_spike_state, lambda ctx: (ctx.conn,), repeat=3)
+simple("get_current_spikes", lambda ctx: spikes.get_current_spikes(ctx.conn))
+simple("flag_spikes", lambda ctx: spikes.flag_spikes(list(range(365))))
+
+# --- cache ---
+simple("cached_read (hit)",
+       lambda ctx: cache.cached_read(ctx.conn, ("cyber_incidents",), incidents.get_incidents_by_type_count))
+simple("get_table_version", lambda ctx: cache.get_table_version(ctx.conn, "cyber_incidents"))
+simple("bump_table_version", lambda ctx: cache.bump_table_version(ctx.conn, "datasets_metadata"))
+
+# --- query log ---
+simple("recent_queries", lambda ctx: querylog.recent_queries(100))
+simple("query_stats", lambda ctx: querylog.query_stats())
+simple("get_slow_queries", lambda ctx: querylog.get_slow_queries(ctx.conn))
+simple("get_slow_query_offenders", lambda ctx: querylog.get_slow_query_offenders(ctx.conn))
+simple("fingerprint", lambda ctx: querylog.fingerprint.__wrapped__(
+    "SELECT * FROM cyber_incidents WHERE status IN (?, ?, ?) AND date >= '2025-01-01' LIMIT 50"))
+simple("param_types", lambda ctx: querylog.param_types(("2025-12-31", "Phishing", 3, 1.5)))
+simple("params_shape", lambda ctx: querylog.params_shape((str, str, int, float)))
+
+# --- lockout ---
+simple("get_lock_remaining", lambda ctx: lockout.get_lock_remaining(ctx.conn, ctx.usernames[0]))
+case("record_failed_attempt", lockout.record_failed_attempt,
+     lambda ctx: (ctx.conn, ctx.name("bench_locked")))
+case("reset_failed_attempts", lockout.reset_failed_attempts,
+     lambda ctx: (ctx.conn, ctx.pick(ctx.usernames)))
+case("record_login_attempt", lockout.record_login_attempt,
+     lambda ctx: (ctx.conn, "client", ctx.name("bench_client")))
+simple("is_rate_limited", lambda ctx: lockout.is_rate_limited(ctx.conn, "user", ctx.usernames[0], 10))
+simple("check_login_allowed", lambda ctx: lockout.check_login_allowed(ctx.conn, ctx.usernames[0], "bench"))
+simple("failed_login_message", lambda ctx: lockout.failed_login_message(2, 0))
+
+# --- chat context ---
+CHAT_SAMPLE = [{"role": "user" if i % 2 == 0 else "assistant",
+                "content": f"Message {i}: " + "how do I contain a phishing campaign? " * 10}
+               for i in range(200)]
+simple(f"build_chat_context ({len(CHAT_SAMPLE)} messages)",
+       lambda ctx: chat_context.build_chat_context("You are a cybersecurity expert.", CHAT_SAMPLE))
+simple("summarise_turns", lambda ctx: chat_context.summarise_turns(CHAT_SAMPLE, more_history=True))
+
+# --- services (bcrypt dominates, so few repeats) ---
+case("register_user", user_service.register_user,
+     lambda ctx: (ctx.name("bench_reg"), "BenchPass123!", "user"), repeat=3)
+# A different account each time so the per-user rate limit never kicks in
+case("login_user", user_service.login_user,
+     lambda ctx: (ctx.pick(ctx.usernames), GENERATED_PASSWORD, ctx.name("client")), repeat=3)
+case("user_service.create_session", user_service.create_session, lambda ctx: (ctx.usernames[0],))
+case("hash_password", auth_executor.hash_password, lambda ctx: ("BenchPass123!",), repeat=3)
+case("verify_password", auth_executor.verify_password,
+     lambda ctx: (GENERATED_PASSWORD, GENERATED_PASSWORD_HASH), repeat=3)
+
+
+def _users_file(ctx):
+    path = ctx.root / f"users_{next(ctx.unique)}.txt"
+    path.write_text("".join(f"{ctx.name('bench_migrated')},{GENERATED_PASSWORD_HASH},user\n"
+                            for _ in range(100)))
+    return ctx.conn, path
+
+
+case("migrate_users_from_file (100 users)", user_service.migrate_users_from_file, _users_file, repeat=3)
+
+# --- generator ---
+simple("generate_rows (1000 incidents)", lambda ctx: list(generate_rows("cyber_incidents", 1000)))
+
+
+# ----------------- TIMING -----------------
+def time_case(ctx, func, setup, repeat):
+    """Return the per-call times (seconds) of one case."""
+    times = []
+    if setup is None:
+        func(ctx)  # warm-up (page cache, cached_read entry, ...)
+        loops, elapsed = 1, 0.0
+        while loops < MAX_LOOPS:
+            start = time.perf_counter()
+            for _ in range(loops):
+                func(ctx)
+            elapsed = time.perf_counter() - start
+            if elapsed >= BATCH_SECONDS:
+                break
+            loops *= 10
+        times.append(elapsed / loops)
+        for _ in range(repeat - 1):
+            start = time.perf_counter()
+            for _ in range(loops):
+                func(ctx)
+            times.append((time.perf_counter() - start) / loops)
+        return times
+
+    for _ in range(repeat):
+        args = setup(ctx)
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+        if isinstance(args[0], sqlite3.Connection) and args[0] is not ctx.conn:
+            args[0].close()
+    return times
+
+
+def run_size(size, selected, repeat):
+    """Seed a database of the given size and time the selected cases."""
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        ctx = Context(Path(tmp), size)
+        os.chdir(tmp)  # the services open DATA/intelligence_platform.db
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                ctx.seed()
+            print(f"Seeded {size:,} incidents in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+            for name in selected:
+                func, setup, case_repeat = CASES[name]
+                with contextlib.redirect_stdout(io.StringIO()):
+                    times = time_case(ctx, func, setup, case_repeat or repeat)
+                ms = [t * 1000 for t in times]
+                results[name] = {"min_ms": min(ms), "median_ms": statistics.median(ms), "runs": len(ms)}
+                print(f"{size:>9} {name:<45} {results[name]['median_ms']:>12.3f} ms")
+        finally:
+            ctx.conn and ctx.conn.close()
+            close_all_pools()
+            os.chdir(cwd)
+    return results
+
+
+# ----------------- COVERAGE & COMPARISON -----------------
+def uncovered_functions():
+    """Public functions of COVERED_MODULES without a case."""
+    covered = {name.split()[0].split(".")[-1] for name in CASES}
+    missing = []
+    for module in COVERED_MODULES:
+        for name, func in inspect.getmembers(module, inspect.isfunction):
+            if (func.__module__ == module.__name__ and not name.startswith("_")
+                    and name not in covered and name not in NOT_BENCHMARKED):
+                missing.append(f"{module.__name__}.{name}")
+    return missing
+
+
+def compare(current, previous, threshold, min_delta_ms):
+    """
+    Return the cases whose median got slower than the previous run.
+
+    A case regresses when its median grew by more than threshold (0.25 =
+    25 %) and by more than min_delta_ms, so microsecond noise is ignored.
+    """
+    regressions = []
+    for size, cases in current["results"].items():
+        for name, result in cases.items():
+            old = previous["results"].get(size, {}).get(name)
+            if old is None:
+                continue
+            new_ms, old_ms = result["median_ms"], old["median_ms"]
+            if new_ms > old_ms * (1 + threshold) and new_ms - old_ms > min_delta_ms:
+                regressions.append((size, name, old_ms, new_ms))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", default=None, help="Only cases whose name contains this text")
+    parser.add_argument("--output", default=None,
+                        help="Results file (default benchmarks/results/suite_<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="Previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed slowdown of the median (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="Ignore slowdowns smaller than this")
+    parser.add_argument("--list", action="store_true", help="List the cases and exit")
+    args = parser.parse_args()
+
+    selected = [name for name in CASES if not args.only or args.only in name]
+    if args.list:
+        print("\n".join(selected))
+        return 0
+
+    missing = uncovered_functions()
+    if missing:
+        print("⚠️ Functions without a benchmark case: " + ", ".join(missing), file=sys.stderr)
+
+    run = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "seed": SEED,
+        "results": {},
+    }
+    print(f"{'size':>9} {'case':<45} {'median':>15}")
+    for size in args.sizes:
+        run["results"][str(size)] = run_size(size, selected, args.repeat)
+
+    output = Path(args.output) if args.output else (
+        RESULTS_DIR / f"suite_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(run, indent=2))
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text())
+        regressions = compare(run, previous, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for size, name, old_ms, new_ms in regressions:
+                print(f"  {size:>9} {name:<45} {old_ms:>10.3f} -> {new_ms:>10.3f} ms")
+            return 1
+        print(f"\n✅ No regressions over {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+wal_concurrency.py - Benchmark concurrent reads while incidents are being written.
+
+Compares the default rollback-journal connection with the WAL connection
+profile from app/data/db.py. Reader threads run an Analytics-style query
+while one writer thread keeps inserting incidents.
+
+Usage (from the project root):
+    python -m benchmarks.wal_concurrency --readers 4 --seconds 5
+"""
+
+# ---------------
+# Import modules
+# ---------------
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from app.data.db import ConnectionPool, CONNECTION_PROFILE
+from app.data.schema import apply_migrations
+from app.data.incidents import insert_incident, get_incidents_by_type_count
+
+# Profiles to compare
+PROFILES = {
+    "rollback journal (default)": {"journal_mode": "DELETE", "synchronous": "FULL"},
+    "WAL profile": CONNECTION_PROFILE,
+}
+SEED_ROWS = 5000
+
+
+def seed(pool):
+    """Migrate the schema and fill cyber_incidents with SEED_ROWS rows."""
+    with pool.connection() as conn:
+        apply_migrations(conn)
+        rows = [
+            (f"2025-01-{i % 28 + 1:02d}", ["Phishing", "Malware", "DDoS"][i % 3],
+             "High", "Open", "seed incident", "bench")
+            for i in range(SEED_ROWS)
+        ]
+        with conn:
+            conn.executemany(
+                "INSERT INTO cyber_incidents (date, incident_type, severity, status, description, reported_by) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+
+def run_profile(name, profile, readers, seconds):
+    """Run the read/write workload against a fresh database using one profile."""
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(Path(tmp) / "bench.db", max_size=readers + 1,
+                              timeout=30, profile=profile)
+        seed(pool)
+
+        stop = threading.Event()
+        reads = [0] * readers
+        writes = [0]
+        errors = [0]
+
+        def reader(slot):
+            while not stop.is_set():
+                with pool.connection() as conn:
+                    get_incidents_by_type_count(conn)
+                reads[slot] += 1
+
+        def writer():
+            while not stop.is_set():
+                with pool.connection() as conn:
+                    if insert_incident(conn, "2025-02-01", "Phishing", "Low", "Open",
+                                       "benchmark write", "bench") is None:
+                        errors[0] += 1
+                    else:
+                        writes[0] += 1
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        threads.append(threading.Thread(target=writer))
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        pool.close_all()
+
+    total_reads = sum(reads)
+    print(f"{name:<28} reads/s: {total_reads / seconds:>9.1f}   "
+          f"writes/s: {writes[0] / seconds:>8.1f}   failed writes: {errors[0]}")
+    return total_reads / seconds, writes[0] / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent read throughput during writes")
+    parser.add_argument("--readers", type=int, default=4, help="number of reader threads")
+    parser.add_argument("--seconds", type=float, default=5, help="duration of each run")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"Readers: {args.readers} | Writer: 1 | Duration: {args.seconds}s per profile")
+    print("=" * 80)
+    for name, profile in PROFILES.items():
+        run_profile(name, profile, args.readers, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+# generate_data.py - Fill the database (or CSV files) with synthetic data
+-----------------------------------------------------------------------
+Examples (from the project root):
+    python generate_data.py --scale 10
+    python generate_data.py --incidents 5000000 --tickets 0 --db DATA/scale.db
+    python generate_data.py --csv DATA/generated --seed 7
+
+--scale multiplies the default row counts of every table; the per-table
+options override it. Generated users log in with the password
+"Generated123!".
+"""
+
+# ---------------
+# Import modules
+# ---------------
+import argparse
+import time
+
+from app.data.db import connect_database, apply_connection_profile, DB_PATH, CSV_CHUNK_SIZE
+from app.data.schema import apply_migrations
+from app.data.generator import (
+    DEFAULT_COUNTS,
+    DEFAULT_SEED,
+    GENERATED_PASSWORD,
+    write_database,
+    write_csv,
+)
+
+# Command line option -> table
+TABLE_OPTIONS = {
+    "users": "users",
+    "incidents": "cyber_incidents",
+    "tickets": "it_tickets",
+    "datasets": "datasets_metadata",
+    "chats": "chat_history",
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate synthetic platform data.")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiplier applied to the default row counts")
+    for option, table in TABLE_OPTIONS.items():
+        parser.add_argument(f"--{option}", type=int, default=None,
+                            help=f"Rows for {table} (default {DEFAULT_COUNTS[table]:,} x scale)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--db", default=str(DB_PATH), help="Database to insert into")
+    parser.add_argument("--csv", default=None, metavar="DIR",
+                        help="Write CSV files to DIR instead of inserting")
+    parser.add_argument("--chunk-size", type=int, default=CSV_CHUNK_SIZE)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    counts = {}
+    for option, table in TABLE_OPTIONS.items():
+        value = getattr(args, option)
+        counts[table] = int(DEFAULT_COUNTS[table] * args.scale) if value is None else value
+
+    print("=" * 60)
+    print("Synthetic Data Generator".center(60))
+    print("=" * 60)
+    for table, count in counts.items():
+        print(f"  {table:<20} {count:>12,} rows")
+
+    last_report = [0.0]
+
+    def progress(table_name, rows):
+        if time.perf_counter() - last_report[0] >= 2 or rows == counts[table_name]:
+            last_report[0] = time.perf_counter()
+            print(f"  ... {table_name}: {rows:,} / {counts[table_name]:,}")
+
+    start = time.perf_counter()
+    if args.csv:
+        written = write_csv(args.csv, counts, args.seed, progress)
+        for table, path in written.items():
+            print(f"✅ {table} -> {path}")
+        print("Load them with load_all_csv_data() into empty tables.")
+    else:
+        conn = connect_database(args.db)
+        if conn is None:
+            return
+        apply_connection_profile(conn)
+        apply_migrations(conn)
+        inserted = write_database(conn, counts, args.seed, args.chunk_size, progress)
+        conn.execute("ANALYZE")
+        conn.close()
+        for table, rows in inserted.items():
+            print(f"✅ {table}: {rows:,} new rows")
+        print(f"Generated users log in with password '{GENERATED_PASSWORD}'.")
+
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+
+
+# Run Program
+if __name__ == "__main__":
+    main()
@@ -21,7 +21,7 @@ DATA_DIR = PROJECT_ROOT / "DATA"                # DATA folder inside project
 DATA_DIR.mkdir(parents=True, exist_ok=True)          # Create folder if missing
 
 from app.data.db import connect_database, DB_PATH, load_all_csv_data
-from app.data.schema import create_all_tables
+from app.data.schema import apply_migrations, ensure_schema, schema_is_current
 from app.services.user_service import (
     register_user, 
     login_user, 
@@ -55,7 +55,7 @@ def test_run():
     
     # Setup database
     conn = connect_database()
-    create_all_tables(conn)
+    ensure_schema(conn)
     migrate_users_from_file(conn)
     
     # Register and login a test user
@@ -111,7 +111,13 @@ def setup_database_complete():
     
     # Step 2: Create tables
     print("\n[2/5] Creating database tables...")
-    create_all_tables(conn)
+    applied = apply_migrations(conn)
+    if schema_is_current(conn):
+        print(f"✔ Schema up to date ({applied} migrations applied)")
+    else:
+        print(f"❌ Schema is incomplete ({applied} migrations applied, see the error above)")
+        conn.close()
+        return
     
     # Step 3: Migrate users
     print("\n[3/5] Migrating users from users.txt...")
@@ -1,4 +1,6 @@
 # Import requried modules
+import os
+import secrets
 import streamlit as st
 from authentication import (
     register_user,
@@ -28,6 +30,11 @@ st.markdown(
 
 st.caption("Register / Login")
 
+# ---------- Client identity ----------
+# Reverse proxies in front of the app that append to X-Forwarded-For.
+# 0 = the header is client-controlled and never trusted.
+TRUSTED_PROXY_HOPS = int(os.environ.get("TRUSTED_PROXY_HOPS", "0"))
+
 # ---------- Session state ----------
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
@@ -35,6 +42,30 @@ if "username" not in st.session_state:
     st.session_state.username = ""
 if "active_tab" not in st.session_state:
     st.session_state.active_tab = "Login"
+if "client_id" not in st.session_state:
+    # Fallback identity for per-client rate limiting when no address is known
+    st.session_state.client_id = secrets.token_hex(8)
+
+
+def client_identifier():
+    """
+    Identify the caller for per-client login rate limiting.
+
+    Uses the client IP, which survives opening a new browser session.
+    X-Forwarded-For is only read behind TRUSTED_PROXY_HOPS configured
+    proxies, and then only the address the outermost of them appended:
+    earlier entries are sent by the client and could be rotated to get a
+    fresh rate-limit bucket. Falls back to the session id (the per-account
+    limit still applies) when no address is known.
+    """
+    context = getattr(st, "context", None)
+    address = getattr(context, "ip_address", None)
+    if TRUSTED_PROXY_HOPS and context is not None:
+        forwarded = getattr(context, "headers", {}).get("X-Forwarded-For", "")
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        if len(hops) >= TRUSTED_PROXY_HOPS:
+            address = hops[-TRUSTED_PROXY_HOPS]
+    return address or st.session_state.client_id
 
 
 # ---------- Redirect if already logged in ----------
@@ -69,13 +100,13 @@ with tab_login:
 
         # 3. Valid input 
         else:
-            login_result = login_user(login_username, login_password)
+            login_result = login_user(login_username, login_password, client_identifier())
 
             if login_result is True:
                 st.session_state.logged_in = True
                 st.session_state.username = login_username
                 st.success(f"🎉 Welcome back, {login_username}!")
-                create_session(login_username)
+                st.session_state.session_token = create_session(login_username)
                 st.balloons()
             else:
                 st.error(login_result)
@@ -6,24 +6,34 @@ CST1510 Week 7 Lab: Secure Authentication System
 '''
 
 # --------- Step 3 - Import Required Modules
-import bcrypt
 import os
 from pathlib import Path
 import string # Challenge 1: Password strength
 import re # For Input Validation
-import time # Challenge 3: Account lockout
-import secrets # Challenge 4: Session management
+import sys
+import threading # Guards the cached user index
+
+# Make the shared 'app' package importable (project root is one level up)
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(BASE_DIR)
+
+# bcrypt runs on a worker process pool so logins don't block the script thread
+from app.services import auth_executor
+from app.data.db import pooled_connection
+from app.data.schema import ensure_schema
+from app.data import sessions as session_store  # Challenge 4: SQLite session store
+
+# Challenge 3: lockout state is kept in SQLite (shared by all app processes)
+from app.services.lockout import (
+    ACCOUNT_LOCK_TIME, check_login_allowed,
+    record_failed_attempt, reset_failed_attempts, failed_login_message
+)
 
 # ---------  Step 6. Define Constants & Files
 # Define paths
 DATA_DIR = Path("DATA")       
 USER_DATA_FILE = DATA_DIR / "users.txt"
-SESSION_FILE = DATA_DIR / "sessions.txt" # For Challenge 4
-MAX_ATTEMPTS = 3 # Maximum login attempts
-ACCOUNT_LOCK_TIME = 300  # 5 minutes lockout time (seconds)
-
-#  ---------Dictionary to track failed attempts
-failed_attempts = {} # Challenge 3
+DB_FILE = os.path.join(BASE_DIR, "DATA", "intelligence_platform.db") # Lockout & session state
 
 # --------- Step 4 - Implement the Password Hashing Function
 def hash_password(plain_text_password: str) -> str:
@@ -36,17 +46,9 @@ def hash_password(plain_text_password: str) -> str:
     Returns:
       str: The hashed password as a UTF-8 string
     '''
-    # Encode the password to bytes (bcrypt requires byte strings)
-    password_bytes = plain_text_password.encode('utf-8')
-
-    # Generate a salt using bcrypt.gensalt()
-    salt = bcrypt.gensalt()
-
-    # Hash the password using bcrypt.hashpw()
-    hashed_password = bcrypt.hashpw(password_bytes, salt)
-
-    # Decode the hash back to a string to store in a text file
-    return hashed_password.decode('utf-8')
+    # Hash on the bcrypt worker pool (bcrypt.gensalt() + bcrypt.hashpw())
+    # and get back a UTF-8 string to store in the text file
+    return auth_executor.hash_password(plain_text_password)
 
 # --------- Step 5 - Implement the Password Verification Function
 def verify_password(plain_text_password: str, hashed_password: str) -> bool:
@@ -61,17 +63,13 @@ def verify_password(plain_text_password: str, hashed_password: str) -> bool:
        bool: True if the password matches, False otherwise
 
     '''
-    # Encode both the plaintext password and the stored hash to bytes
-    password_bytes = plain_text_password.encode('utf-8')
-    hashed_password_bytes = hashed_password.encode('utf-8')
-
     # Use try-except to handle potential errors during verification
-    # Use bcrypt.checkpw() to verify the password
+    # bcrypt.checkpw() runs on the worker pool (invalid hashes return False)
     try:
-        return bcrypt.checkpw(password_bytes, hashed_password_bytes)
-    
-    except ValueError:
-        print("Error: Invalid hash format.")
+        return auth_executor.verify_password(plain_text_password, hashed_password)
+
+    except TimeoutError as e:
+        print(f"Error: {e}")
         return False
     
     except Exception as e:
@@ -101,6 +99,53 @@ def verify_password(plain_text_password: str, hashed_password: str) -> bool:
 # - print(f"Verification with incorrect password: {is_invalid}")
 
 
+# --------- User index: users.txt is parsed once and re-read only when it changes
+_user_index = {}           # username -> (hashed_password, role)
+_user_names_lower = set()  # lower-cased usernames for case-insensitive checks
+_user_index_stamp = None   # (mtime_ns, size) of USER_DATA_FILE when indexed
+_user_index_lock = threading.Lock()
+
+def load_user_index() -> dict:
+    '''
+    Returns the in-memory index of users.txt, rebuilding it only when the
+    file's modification time or size has changed since the last read.
+
+    Returns:
+      dict: username -> (hashed_password, role)
+    '''
+    global _user_index, _user_names_lower, _user_index_stamp
+
+    # Handle the case where the file doesn't exist yet
+    try:
+        stat = os.stat(USER_DATA_FILE)
+    except FileNotFoundError:
+        with _user_index_lock:
+            _user_index, _user_names_lower, _user_index_stamp = {}, set(), None
+        return _user_index
+
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _user_index_lock:
+        if stamp != _user_index_stamp:
+            index = {}
+            try:
+                with open(USER_DATA_FILE, "r") as f:
+                    for line in f:
+                        # Format: username,hashed_password,role (skip malformed lines)
+                        parts = line.strip().split(",", 2)
+                        if len(parts) < 2 or not parts[0]:
+                            continue
+                        role = parts[2] if len(parts) == 3 else "user"
+                        index.setdefault(parts[0], (parts[1], role))  # first entry wins
+            except Exception as e:
+                print(f"Error loading users: {e}")
+                return _user_index
+
+            _user_index = index
+            _user_names_lower = {name.lower() for name in index}
+            _user_index_stamp = stamp
+        return _user_index
+
+
 # --------- Step 8. Implement the User Existence Check
 def user_exists(username: str) -> bool:
     '''
@@ -112,23 +157,9 @@ def user_exists(username: str) -> bool:
     Returns:
       bool: True if the user exists, False otherwise
     '''
-    # Handle the case where the file doesn't exist yet
-    if not os.path.exists(USER_DATA_FILE):
-        return False
-    
-    # Read the file and check each line for the username
-    try:
-        with open(USER_DATA_FILE, "r") as f:
-            # Read each line and compare stored username with input
-            for line in f:
-                saved_username = line.strip().split(",")[0]
-                if username.lower() == saved_username.lower(): # Case-insensitive check
-                    return True
-                
-    # Error handling to prevent crashes          
-    except Exception as e:
-        print(f"Error checking user existence: {e}")
-    return False
+    # O(1) lookup in the cached index (case-insensitive check)
+    load_user_index()
+    return username.lower() in _user_names_lower
 
 # --------- Step 7. Implement the Registration Function
 def register_user(username: str, password: str, role: str = None) -> bool:
@@ -152,8 +183,17 @@ def register_user(username: str, password: str, role: str = None) -> bool:
         print(f"Error: Username '{username}' already exists.")
         return False
     
-    # Hash the password
-    hashed_password = hash_password(password)
+    # Hash the password (the worker pool may be busy or unavailable)
+    try:
+        hashed_password = hash_password(password)
+
+    except TimeoutError as e:
+        print(f"Error: {e}")
+        return False
+
+    except Exception as e:
+        print(f"Error hashing password: {e}")
+        return False
 
     # --- Challenge 2: User Role System
     # Validate role input
@@ -186,64 +226,47 @@ def register_user(username: str, password: str, role: str = None) -> bool:
 
 # --------- Step 9, Implement the Login Function
 
-def login_user(username, password):
+def login_user(username, password, client_id=None):
     '''
     Authenticates a user by verifying their username and password.
 
     Args:
         username (str): The username to authenticate
         password (str): The plaintext password to verify
+        client_id (str): Optional caller identifier for per-client rate limiting
 
     Returns:
-        bool: True if authentication successful, False otherwise
+        bool: True if authentication successful, otherwise a message (str)
     '''
 
     # Handle the case where the file doesn't exist yet
     if not os.path.exists(USER_DATA_FILE):
         return "⚠️ No users registered yet."
     
-    # Initialize failed attempts for the user if not present
-    if username not in failed_attempts:
-        failed_attempts[username] = 0
-    
-    # Check if account is locked
-    if failed_attempts[username] >= MAX_ATTEMPTS:
-        return f"🚫 Account is locked. Please wait {ACCOUNT_LOCK_TIME // 60} minutes before trying again."
-    
-    # Read the user data file
     try:
-        # Open the user data file
-        with open(USER_DATA_FILE) as f:
-            # Check each line for the username
-            username_found = False
-            for line in f.readlines():
-                # Split line into username, hash, and role
-                user, hash, role = line.strip().split(',', 2)
-
-                # If username matches, verify the password
-                if user == username:
-                    username_found = True
-
-                    # Verify the password
-                    if verify_password(password, hash):
-                        failed_attempts[username] = 0  # Reset on successful login
-                        return True
-                  
-                    failed_attempts[username] += 1
-                    remaining_attempts = MAX_ATTEMPTS - failed_attempts[username]
-                    if remaining_attempts > 0:
-                        return f"❌ Incorrect password. Attempts used: {failed_attempts[username]}. Attempts remaining: {remaining_attempts}"
-                    else:
-                        add_failed_attempt(username)
-        
-
-        # Username not found after checking all lines
-        if not username_found:
+        # Check if account is locked or rate limited (answered without waiting)
+        with pooled_connection(DB_FILE) as conn:
+            ensure_schema(conn)
+            allowed, message = check_login_allowed(conn, username, client_id)
+        if not allowed:
+            return message
+
+        # Look up the user in the cached index instead of scanning the file
+        entry = load_user_index().get(username)
+
+        # Username not found
+        if entry is None:
             return "❌ Username not found."
 
-    except FileNotFoundError:
-        print("⚠️ No users registered yet.")
-        return False
+        hash, role = entry
+
+        # Verify the password
+        if verify_password(password, hash):
+            with pooled_connection(DB_FILE) as conn:
+                reset_failed_attempts(conn, username)  # Reset on successful login
+            return True
+
+        return add_failed_attempt(username)
 
     except Exception as e:
         print(f"Error during login: {e}")
@@ -386,45 +409,31 @@ def check_password_strength(password):
     
 # == Challenge 3: Account Lockout ==
 def add_failed_attempt(username):
-    """Implement a system that locks accounts after 3 failed login attempts:"""
-
-    print("🚫 Too many failed attempts. Account locked for 5 minutes.")
+    """
+    Record a failed login; the account locks after 3 failed attempts.
 
-    # Countdown timer for lockout
-    remaining_time = ACCOUNT_LOCK_TIME
+    The lock is a 'locked until' timestamp in SQLite, so nothing sleeps and
+    other processes see the same lock.
 
-    # Display countdown
-    while remaining_time > 0:
-        # Calculate minutes and seconds
-        minutes = remaining_time // 60
-        seconds = remaining_time % 60
-
-        # Display remaining_time time
-        print(f"\r🔒 Try again in {minutes}m {seconds}s", end="")
-
-        # Wait for 1 second
-        time.sleep(1)
-
-        # Decrement remaining time
-        remaining_time -= 1
-
-    # Unlock message
-    print("\n🔓 Account unlocked. You can try logging in again.")
-    failed_attempts[username] = 0  # Reset after lockout
+    Returns:
+        str: Message describing the attempts left or the lock
+    """
+    with pooled_connection(DB_FILE) as conn:
+        attempts_used, lock_seconds = record_failed_attempt(conn, username)
 
-    return True # Account unlocked
+    if lock_seconds:
+        print(f"🚫 Too many failed attempts. Account locked for {ACCOUNT_LOCK_TIME // 60} minutes.")
+    return failed_login_message(attempts_used, lock_seconds)
 
 
 # == Challenge 4: Session Management ==
 def create_session(username):
     """Create a session token for the logged-in user."""
 
-    # Generate a secure random token
-    token = secrets.token_hex(16)
-
-    # Store token with timestamp
-    with open(SESSION_FILE, 'a') as f:
-        f.write(f"{username},{token}\n")
+    # Generate a secure random token and store its hash with an expiry
+    with pooled_connection(DB_FILE) as conn:
+        ensure_schema(conn)
+        token = session_store.create_session(conn, username)
 
     # Display session token
     print(f"🛡️ Session token created: {token}")
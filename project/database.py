@@ -0,0 +1,35 @@
+"""
+database.py - Database connections for the Streamlit pages.
+ - page_connection(): pooled connection for one block of page queries
+
+Pages check a connection out only around the queries they run, not for
+the whole script run (and never while waiting on the OpenAI API), so the
+bounded pool in app/data/db.py is enough for many analysts at once.
+"""
+
+# ------------------- IMPORTS -------------------
+from contextlib import contextmanager
+import streamlit as st
+
+from app.data.db import pooled_connection
+
+# ------------------- CONNECTIONS -------------------
+@contextmanager
+def page_connection(db_file):
+    """
+    Check out a pooled connection for one block of queries.
+
+    If no connection frees up within the pool timeout, the page shows an
+    error and stops instead of running queries on None.
+
+    Args:
+        db_file: Path to the database file
+
+    Yields:
+        sqlite3.Connection: Pooled connection, released when the block ends
+    """
+    with pooled_connection(db_file) as conn:
+        if conn is None:
+            st.error("⚠️ The database is busy right now. Please try again in a moment.")
+            st.stop()
+        yield conn
@@ -8,28 +8,38 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 sys.path.append(BASE_DIR)
 
 # ------------ DB + Modules ------------
-from app.data.db import connect_database, load_all_csv_data
-from app.data.schema import create_all_tables
+from app.data.db import sync_csv_data
+from app.data.schema import ensure_schema
+from app.data.spikes import rebuild_spike_state
+from app.data.sessions import validate_session, revoke_session
 
 # Utility functions
-from utils import view_records, add_new_record, update_delete_record
+from database import page_connection
+from utils import view_records, add_new_record, update_delete_record, bulk_actions, search_records
 
 # ------------------- DATABASE -------------------
 DATA_DIR = os.path.join(BASE_DIR, "DATA")
 DB_FILE = os.path.join(DATA_DIR, "intelligence_platform.db")
 
-conn = connect_database(DB_FILE)
-create_all_tables(conn)
+# Connections are checked out per block of queries and returned right after
+with page_connection(DB_FILE) as conn:
+    ensure_schema(conn)  # runs migrations once per process
 
-load_all_csv_data(conn, os.path.join(DATA_DIR, "cyber_incidents.csv"), "cyber_incidents")
-load_all_csv_data(conn, os.path.join(DATA_DIR, "it_tickets.csv"), "it_tickets")
-load_all_csv_data(conn, os.path.join(DATA_DIR, "datasets_metadata.csv"), "datasets_metadata")
+    if sync_csv_data(conn, os.path.join(DATA_DIR, "cyber_incidents.csv"), "cyber_incidents"):
+        rebuild_spike_state(conn)  # bulk changes: recompute spike statistics once
+    sync_csv_data(conn, os.path.join(DATA_DIR, "it_tickets.csv"), "it_tickets")
+    sync_csv_data(conn, os.path.join(DATA_DIR, "datasets_metadata.csv"), "datasets_metadata")
 
 # ------------------- LOGIN CHECK -------------------
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
 
-# Guard login
+# Guard login (session token validated against the session store)
+if st.session_state.logged_in:
+    with page_connection(DB_FILE) as conn:
+        if not validate_session(conn, st.session_state.get("session_token")):
+            st.session_state.logged_in = False
+
 if not st.session_state.logged_in:
     st.error("You must be logged in.")
     if st.button("Go to Login"):
@@ -48,7 +58,7 @@ st.markdown(
 # ------------------- SIDEBAR -------------------
 domain = st.sidebar.selectbox("Select Domain", ["Cybersecurity", "IT Operations", "Data Science"])
 options = st.sidebar.multiselect(
-    "Select Actions", ["📄 View Records", "➕ Add New Record", "✏ Update / Delete"], default="📄 View Records"
+    "Select Actions", ["📄 View Records", "➕ Add New Record", "✏ Update / Delete", "🗂 Bulk Actions"], default="📄 View Records"
     )
 
 # ------------------- ACTIONS -------------------
@@ -60,17 +70,24 @@ domain_options = {
 
 table_name = domain_options[domain]
 
-if "📄 View Records" in options:
-    view_records(conn, table_name)
-if "➕ Add New Record" in options:
-    add_new_record(conn, table_name)
-if "✏ Update / Delete" in options:
-    update_delete_record(conn, table_name)
-    st.stop()
+with page_connection(DB_FILE) as conn:
+    search_records(conn, table_name)
+
+    if "📄 View Records" in options:
+        view_records(conn, table_name)
+    if "➕ Add New Record" in options:
+        add_new_record(conn, table_name)
+    if "🗂 Bulk Actions" in options:
+        bulk_actions(conn, table_name)
+    if "✏ Update / Delete" in options:
+        update_delete_record(conn, table_name)
+        st.stop()
 
 # ------------------- LOGOUT -------------------
 st.divider()
 if st.button("Log Out"):
+    with page_connection(DB_FILE) as conn:
+        revoke_session(conn, st.session_state.pop("session_token", None))
     st.session_state.logged_in = False
     st.success("Logged out!")
     st.switch_page("Home.py")
@@ -5,6 +5,7 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 import altair as alt
 import time
+from datetime import date, timedelta
 import numpy as np
 import pandas as pd
 import sys
@@ -15,35 +16,56 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 sys.path.append(BASE_DIR)
 
 # ------------  Modules ------------
-from app.data.db import connect_database, load_all_csv_data
-from app.data.schema import create_all_tables
+from app.data.db import load_all_csv_data
+from app.data.schema import ensure_schema
+from app.data.cache import cached_read
+from app.data.spikes import get_current_spikes, SPIKE_RECENT_DAYS
+from app.data.sessions import validate_session
+
+# Record pages with filters evaluated in SQL
+from utils import paged_records
+from database import page_connection
 
 # Cybersecurity
 from app.data.incidents import (
-    get_all_incidents, get_incidents_by_type_count, 
+    count_incidents, get_all_incidents, get_incidents_by_type_count, 
     get_high_severity_by_status, get_incident_types_with_many_cases, 
     get_incident_trend, unresolved_incidents_by_type,
-    get_threat_spike, get_resolution_bottleneck
+    get_threat_spike, get_resolution_bottleneck, get_monthly_incident_counts
 )
 
 # IT Ops
 from app.data.tickets import (
-    get_ticket_trend, get_all_tickets,
+    count_tickets, get_ticket_trend, get_all_tickets,
     update_ticket, delete_ticket,
     get_unresolved_tickets, get_ticket_delays
 )
 
 # Data Science
 from app.data.datasets import (
-     insert_dataset, update_dataset, get_all_datasets,
+     count_datasets, insert_dataset, update_dataset, get_all_datasets,
      list_datasets_by_source, delete_dataset,
      get_top_recent_updates, display_resource_usage
 )
 
+# ------------------- DATABASE -------------------
+DATA_DIR = os.path.join(BASE_DIR, "DATA")
+DB_FILE = os.path.join(DATA_DIR, "intelligence_platform.db")
+
+# Connections are checked out per block of queries and returned right after
+with page_connection(DB_FILE) as conn:
+    ensure_schema(conn)  # runs migrations once per process
+
 # ------------------- LOGIN CHECK -------------------
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
 
+# Guard login (session token validated against the session store)
+if st.session_state.logged_in:
+    with page_connection(DB_FILE) as conn:
+        if not validate_session(conn, st.session_state.get("session_token")):
+            st.session_state.logged_in = False
+
 if not st.session_state.logged_in:
     st.error("You must be logged in.")
     if st.button("Go to Login"):
@@ -54,19 +76,13 @@ if not st.session_state.logged_in:
 # ---------- Streamlit Page Config ----------
 st.set_page_config(page_title="Wave - Analytics", layout="wide", page_icon="logo.png")
 
-# ------------------- DATABASE -------------------
-DATA_DIR = os.path.join(BASE_DIR, "DATA")
-DB_FILE = os.path.join(DATA_DIR, "intelligence_platform.db")
-
-conn = connect_database(DB_FILE)
-create_all_tables(conn)
-
 domain = st.sidebar.selectbox("Select Domain", ["Cybersecurity", "IT Operations", "Data Science"])
 
-# Initilize global variables
-df_incidents = get_all_incidents(conn)
-df_datasets = get_all_datasets(conn)
-df_tickets = get_all_tickets(conn)
+# Initilize global variables (served from memory until a table changes)
+with page_connection(DB_FILE) as conn:
+    df_incidents = cached_read(conn, "cyber_incidents", get_all_incidents)
+    df_datasets = cached_read(conn, "datasets_metadata", get_all_datasets)
+    df_tickets = cached_read(conn, "it_tickets", get_all_tickets)
 
 
 # ------------------- VIEW RECORDS -------------------
@@ -100,13 +116,13 @@ def view_records(conn, domain):
             default=["Open", "Investigating", "Resolved", "Closed"]
         )
 
-        filtered_df = df_incidents[
-            df_incidents["severity"].isin(severity_filter) &
-            df_incidents["status"].isin(status_filter)   # check this
-        ]
+        # Filter in SQLite and only fetch the visible page
+        filters = {"severity": severity_filter, "status": status_filter}
+        total = cached_read(conn, "cyber_incidents", count_incidents, filters=filters)
 
-        st.caption(f"{len(filtered_df)} incidents after filtering.")
+        st.caption(f"{total} incidents after filtering.")
         with st.expander(" Filtered Incidents"):
+            filtered_df = paged_records(conn, "cyber_incidents", "analytics_incidents", filters)
             st.dataframe(filtered_df, use_container_width=True)
 
     # ---------------- IT Operations ----------------
@@ -126,22 +142,18 @@ def view_records(conn, domain):
             default=["Open", "Investigating", "Resolved", "Closed"]
         )
 
-        filtered_df = df_tickets[
-            df_tickets["priority"].isin(priority_filter) &
-            df_tickets["status"].isin(status_filter)
-        ]
-
+        filters = {"priority": priority_filter, "status": status_filter}
+        total = cached_read(conn, "it_tickets", count_tickets, filters=filters)
 
-        st.caption(f"Showing {len(filtered_df)} tickets after filtering.")
+        st.caption(f"Showing {total} tickets after filtering.")
         with st.expander("See Filtered Tickets"):
+            filtered_df = paged_records(conn, "it_tickets", "analytics_tickets", filters)
             st.dataframe(filtered_df, use_container_width=True, height=600)
 
     # ---------------- Data Science ----------------
     elif domain == "Data Science":
         st.markdown('<div class="table-header">📊 Data Science Datasets</div>', unsafe_allow_html=True)
 
-        df_datasets["last_updated"] = pd.to_datetime(df_datasets["last_updated"], errors="coerce")
-
         category_filter = st.multiselect(
             "Category",
             options=df_datasets["category"].unique(),
@@ -157,13 +169,15 @@ def view_records(conn, domain):
             value=(min_records, max_records)
         )
 
-        filtered_df = df_datasets[
-            df_datasets["category"].isin(category_filter) &
-            df_datasets["record_count"].between(record_range[0], record_range[1])
-        ]
+        filters = {
+            "category": list(category_filter),
+            "record_count": {"min": record_range[0], "max": record_range[1]},
+        }
+        total = cached_read(conn, "datasets_metadata", count_datasets, filters=filters)
 
-        st.caption(f"Showing {len(filtered_df)} datasets after filtering.")
+        st.caption(f"Showing {total} datasets after filtering.")
         with st.expander("See Filtered Datasets"):
+            filtered_df = paged_records(conn, "datasets_metadata", "analytics_datasets", filters)
             st.dataframe(filtered_df, use_container_width=True, height=600)
 
     else:
@@ -179,7 +193,7 @@ def domain_visulization():
         # ----------------- TAB 1: KPIs + Threat Type Bar -----------------
         with tab1:
 
-            df_types = get_incidents_by_type_count(conn)
+            df_types = cached_read(conn, "cyber_incidents", get_incidents_by_type_count)
 
             # Bar chart of threat types
             st.markdown("<h3 style='text-align: center;'>Threat Types Overview</h3>", unsafe_allow_html=True)
@@ -227,20 +241,23 @@ def domain_visulization():
                 active_incidents = df_incidents[df_incidents["status"].isin(["Open", "Investigating"])].shape[0]
                 st.metric("Active Incidents", active_incidents)
 
+            # Threat spikes flagged by the incremental detector (one indexed read),
+            # limited to recent days so a type that went quiet doesn't stay flagged
+            spike_since = (date.today() - timedelta(days=SPIKE_RECENT_DAYS)).isoformat()
+            for spike in get_current_spikes(conn, since=spike_since):
+                st.warning(
+                    f"🚨 {spike['incident_type']} spike on {spike['day']}: "
+                    f"{spike['count']} incidents (expected ~{spike['expected']}, z={spike['z_score']})"
+                )
+
         # ----------------- TAB 2: Trend Line Chart -----------------
         with tab2:
             st.subheader("📈 Monthly Trend for Multiple Threat Types")
 
-            # 1️⃣ Ensure 'date' is datetime
-            df_incidents['date'] = pd.to_datetime(df_incidents['date'])
-
-            # 2️⃣ Aggregate monthly counts per incident type
-            df_trend = df_incidents.groupby([pd.Grouper(key='date', freq='M'), 'incident_type']).size().reset_index(name='count')
+            # 1️⃣ Monthly counts per incident type, read from the rollup table
+            df_trend = cached_read(conn, "cyber_incidents", get_monthly_incident_counts)
 
-            # 3️⃣ Format month nicely
-            df_trend['month'] = df_trend['date'].dt.strftime('%Y-%m')
-
-            # 4️⃣ Plot line chart with Plotly Express
+            # 2️⃣ Plot line chart with Plotly Express
             fig = px.line(
                 df_trend,
                 x='month',
@@ -251,7 +268,7 @@ def domain_visulization():
                 title='📈 Monthly Trend of Incidents'
             )
 
-            # 5️⃣ Display chart in Streamlit
+            # 3️⃣ Display chart in Streamlit
             st.plotly_chart(fig, use_container_width=True)
 
 
@@ -260,31 +277,17 @@ def domain_visulization():
 
 
             # 1️⃣ Get unresolved incident counts by type
-            df_unresolved = unresolved_incidents_by_type(conn)
-
-            # 2️⃣ Get all incidents to get monthly info
-            df_all = get_all_incidents(conn)
-            df_all['date'] = pd.to_datetime(df_all['date'])
-
-            # 3️⃣ Merge to get monthly counts only for unresolved types
-            df_unresolved_types = df_all[df_all['status'] != 'Resolved']
-            df_unresolved_types = df_unresolved_types[df_unresolved_types['incident_type'].isin(df_unresolved['incident_type'])]
-
-            # 4️⃣ Aggregate by month and type
-            df_heat = (
-                df_unresolved_types
-                .groupby([pd.Grouper(key='date', freq='M'), 'incident_type'])
-                .size()
-                .reset_index(name='count')
-            )
+            df_unresolved = cached_read(conn, "cyber_incidents", unresolved_incidents_by_type)
 
-            # 5️⃣ Format month nicely
-            df_heat['month'] = df_heat['date'].dt.strftime('%Y-%m')
+            # 2️⃣ Monthly counts of unresolved incidents from the rollup table
+            df_heat = cached_read(conn, "cyber_incidents", get_monthly_incident_counts,
+                                  exclude_statuses=("Resolved",))
+            df_heat = df_heat[df_heat['incident_type'].isin(df_unresolved['incident_type'])]
 
-            # 6️⃣ Pivot for heatmap
+            # 3️⃣ Pivot for heatmap
             df_pivot = df_heat.pivot(index='incident_type', columns='month', values='count').fillna(0)
 
-            # 7️⃣ Plot heatmap
+            # 4️⃣ Plot heatmap
             fig = px.imshow(
                 df_pivot,
                 text_auto=True,
@@ -310,7 +313,7 @@ def domain_visulization():
 
     elif domain == "Data Science":
         # Load all datasets
-        df = get_all_datasets(conn)
+        df = cached_read(conn, "datasets_metadata", get_all_datasets)
 
         # ------------------ Metrics ------------------
         # Aggregate some simple numbers
@@ -430,4 +433,6 @@ def domain_visulization():
     else:
         pass
     
-domain_visulization()
+# Charts query through the module-level conn, checked out for this block only
+with page_connection(DB_FILE) as conn:
+    domain_visulization()
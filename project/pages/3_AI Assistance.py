@@ -7,16 +7,37 @@ import sys
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 sys.path.append(BASE_DIR)
 
-from app.data.db import connect_database, load_all_csv_data, save_message, load_messages
-from app.data.schema import create_all_tables
+from app.data.db import (
+    sync_csv_data, save_message_async, load_messages, load_recent_messages, clear_messages,
+    CHAT_WINDOW_SIZE
+)
+from app.services.chat_context import build_chat_context
+from app.data.schema import ensure_schema
+from app.data.spikes import rebuild_spike_state
+from app.data.sessions import validate_session
+from database import page_connection
 
 # ------------------- OPENAI -----------------
 client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
 
+# ------------------- DATABASE -------------------
+DATA_DIR = os.path.join(BASE_DIR, "DATA")
+DB_FILE = os.path.join(DATA_DIR, "intelligence_platform.db")
+# Connections are checked out per block of queries and returned right after;
+# none is held while OpenAI streams a reply
+with page_connection(DB_FILE) as conn:
+    ensure_schema(conn)  # runs migrations once per process
+
 # ------------------- LOGIN CHECK -------------------
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
 
+# Guard login (session token validated against the session store)
+if st.session_state.logged_in:
+    with page_connection(DB_FILE) as conn:
+        if not validate_session(conn, st.session_state.get("session_token")):
+            st.session_state.logged_in = False
+
 if not st.session_state.logged_in:
     st.error("You must be logged in.")
     if st.button("Go to Login"):
@@ -29,12 +50,6 @@ if not username:
     st.error("Username not found in session.")
     st.stop()
 
-# ------------------- DATABASE -------------------
-DATA_DIR = os.path.join(BASE_DIR, "DATA")
-DB_FILE = os.path.join(DATA_DIR, "intelligence_platform.db")
-conn = connect_database(DB_FILE)
-create_all_tables(conn)
-
 # Ensure user exists in DB
 def ensure_user(conn, username):
     cursor = conn.cursor()
@@ -46,12 +61,14 @@ def ensure_user(conn, username):
     cursor.execute("SELECT id FROM users WHERE username=?", (username,))
     return cursor.fetchone()[0]  # numeric user_id
 
-user_id = ensure_user(conn, username)
+with page_connection(DB_FILE) as conn:
+    user_id = ensure_user(conn, username)
 
-# Optional: Load CSV data into DB
-load_all_csv_data(conn, os.path.join(DATA_DIR, "cyber_incidents.csv"), "cyber_incidents")
-load_all_csv_data(conn, os.path.join(DATA_DIR, "it_tickets.csv"), "it_tickets")
-load_all_csv_data(conn, os.path.join(DATA_DIR, "datasets_metadata.csv"), "datasets_metadata")
+    # Optional: Sync new or changed CSV rows into DB (skipped when files are unchanged)
+    if sync_csv_data(conn, os.path.join(DATA_DIR, "cyber_incidents.csv"), "cyber_incidents"):
+        rebuild_spike_state(conn)  # bulk changes: recompute spike statistics once
+    sync_csv_data(conn, os.path.join(DATA_DIR, "it_tickets.csv"), "it_tickets")
+    sync_csv_data(conn, os.path.join(DATA_DIR, "datasets_metadata.csv"), "datasets_metadata")
 
 # ------------------- PAGE CONFIG -------------------
 st.set_page_config(page_title="Wave - AI Assistant", layout="wide", page_icon="logo.png")
@@ -86,15 +103,20 @@ You are a Data Science expert.
 # ------------------- INITIALIZE SESSION STATE -------------------
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = {}
+if "chat_has_older" not in st.session_state:
+    st.session_state.chat_has_older = {}
 
 user_key = f"{username}_{domain}"
 
 if user_key not in st.session_state.chat_history:
-    messages = load_messages(conn, user_id, domain)
+    # Only the newest messages; older ones are paged in with "Load older"
+    with page_connection(DB_FILE) as conn:
+        messages, has_older = load_recent_messages(conn, user_id, domain, limit=CHAT_WINDOW_SIZE)
 
     if not messages or messages[0]["role"] != "system":
         messages.insert(0, {"role": "system", "content": domain_prompts[domain]})
     st.session_state.chat_history[user_key] = messages
+    st.session_state.chat_has_older[user_key] = has_older
 
 messages = st.session_state.chat_history[user_key]
 
@@ -111,6 +133,16 @@ st.markdown(
 st.caption("Powered by GPT-4o")
 
 # ------------------- DISPLAY CHAT -------------------
+if st.session_state.chat_has_older.get(user_key):
+    if st.button("⬆ Load older messages"):
+        oldest_id = min(m["id"] for m in messages if "id" in m)
+        with page_connection(DB_FILE) as conn:
+            older, has_older = load_recent_messages(conn, user_id, domain, limit=CHAT_WINDOW_SIZE,
+                                                    before_id=oldest_id)
+        messages[1:1] = older  # after the system prompt
+        st.session_state.chat_has_older[user_key] = has_older
+        st.rerun()
+
 for message in messages:
     if message["role"] != "system":
         with st.chat_message(message["role"]):
@@ -123,31 +155,39 @@ with st.sidebar:
     st.metric("Messages", message_count)
 
     if st.button("🗑 Clear Chat", use_container_width=True):
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM chat_history WHERE user_id=? AND domain=?", (user_id, domain))
-        conn.commit()
+        with page_connection(DB_FILE) as conn:
+            clear_messages(conn, user_id, domain)
         st.session_state.chat_history[user_key] = [{"role": "system", "content": domain_prompts[domain]}]
+        st.session_state.chat_has_older[user_key] = False
         st.toast("Chat cleared!", icon="🧹")
         st.rerun()
 
     # ---- DOWNLOAD CHAT (PURE FILE HANDLING VERSION) ----
     chat_filename = f"{username}_{domain}_chat.txt"
 
-    # Create the file using pure file handling
-    with open(chat_filename, "w", encoding="utf-8") as file:
-        for m in messages:
-            if m["role"] != "system":
-                file.write(f"{m['role'].upper()}:\n{m['content']}\n\n")
-
-    # Download button
-    with open(chat_filename, "rb") as file:
-        st.sidebar.download_button(
-            label="📥 Download Chat",
-            data=file,
-            file_name=chat_filename,
-            mime="text/plain",
-            use_container_width=True
-        )   
+    # The loaded window is the whole chat unless older messages exist; then
+    # the full history is read only when the user asks for it
+    export = None if st.session_state.chat_has_older.get(user_key) else messages
+    if export is None and st.button("📄 Prepare full chat download", use_container_width=True):
+        with page_connection(DB_FILE) as conn:
+            export = load_messages(conn, user_id, domain)
+
+    if export is not None:
+        # Create the file using pure file handling
+        with open(chat_filename, "w", encoding="utf-8") as file:
+            for m in export:
+                if m["role"] != "system":
+                    file.write(f"{m['role'].upper()}:\n{m['content']}\n\n")
+
+        # Download button
+        with open(chat_filename, "rb") as file:
+            st.sidebar.download_button(
+                label="📥 Download Chat",
+                data=file,
+                file_name=chat_filename,
+                mime="text/plain",
+                use_container_width=True
+            )
 
     model = st.selectbox("Model", ["gpt-4o"], index=0)
     temperature = st.slider(
@@ -165,13 +205,18 @@ if prompt:
 
     # Save user message
     st.session_state.chat_history[user_key].append({"role": "user", "content": prompt})
-    save_message(conn, user_id, domain, "user", prompt)
+    with page_connection(DB_FILE) as conn:
+        save_message_async(conn, user_id, domain, "user", prompt)
 
     # OpenAI Streaming response
     with st.spinner("Thinking..."):
         completion = client.chat.completions.create(
             model=model,
-            messages=st.session_state.chat_history[user_key],
+            messages=build_chat_context(
+                domain_prompts[domain],
+                [m for m in st.session_state.chat_history[user_key] if m["role"] != "system"],
+                more_history=st.session_state.chat_has_older.get(user_key, False)
+            ),
             temperature=temperature,
             stream=True
         )
@@ -187,4 +232,5 @@ if prompt:
             container.markdown(full_reply)
 
         st.session_state.chat_history[user_key].append({"role": "assistant", "content": full_reply})
-        save_message(conn, user_id, domain, "assistant", full_reply)
+        with page_connection(DB_FILE) as conn:
+            save_message_async(conn, user_id, domain, "assistant", full_reply)
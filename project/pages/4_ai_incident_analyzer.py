@@ -16,8 +16,10 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 sys.path.append(BASE_DIR)
 
 # ------------------- MODULES -------------------
-from app.data.db import connect_database, load_all_csv_data
-from app.data.schema import create_all_tables
+from app.data.db import load_all_csv_data
+from app.data.schema import ensure_schema
+from app.data.cache import cached_read
+from database import page_connection
 
 # Cybersecurity
 from app.data.incidents import (
@@ -49,13 +51,14 @@ st.set_page_config(page_title="Wave - AI Incident Analyzer", layout="wide", page
 DATA_DIR = os.path.join(BASE_DIR, "DATA")
 DB_FILE = os.path.join(DATA_DIR, "intelligence_platform.db")
 
-conn = connect_database(DB_FILE)
-create_all_tables(conn)
+# Released before the OpenAI call below, so a slow analysis holds no connection
+with page_connection(DB_FILE) as conn:
+    ensure_schema(conn)  # runs migrations once per process
 
-# ------------------- INITIALIZE DATA -------------------
-df_incidents = get_all_incidents(conn)
-df_tickets = get_all_tickets(conn)
-df_datasets = get_all_datasets(conn)
+    # ------------------- INITIALIZE DATA -------------------
+    df_incidents = cached_read(conn, "cyber_incidents", get_all_incidents)
+    df_tickets = cached_read(conn, "it_tickets", get_all_tickets)
+    df_datasets = cached_read(conn, "datasets_metadata", get_all_datasets)
 
 # ------------------- OPENAI CLIENT -------------------
 client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
@@ -0,0 +1,144 @@
+# ------------------- IMPORTS -------------------
+import streamlit as st
+import pandas as pd
+import sys
+import os
+from datetime import datetime
+
+# Path setup
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(BASE_DIR)
+
+# ------------  Modules ------------
+from app.data.db import pool_stats
+from app.data.schema import ensure_schema
+from app.data.cache import cache_stats
+from app.data.chatwriter import chat_writer_stats
+from app.data.sessions import validate_session
+from app.data.querylog import (
+    query_log_stats, query_stats, recent_queries, set_slow_query_threshold, enable_query_log,
+    get_slow_queries, get_slow_query_offenders, clear_slow_query_log, flush_slow_query_log
+)
+from authentication import load_user_index
+from database import page_connection
+
+# ------------------- DATABASE -------------------
+DATA_DIR = os.path.join(BASE_DIR, "DATA")
+DB_FILE = os.path.join(DATA_DIR, "intelligence_platform.db")
+
+# Connections are checked out per block of queries and returned right after
+with page_connection(DB_FILE) as conn:
+    ensure_schema(conn)  # runs migrations once per process
+
+# ------------------- LOGIN CHECK -------------------
+if "logged_in" not in st.session_state:
+    st.session_state.logged_in = False
+
+if st.session_state.logged_in:
+    with page_connection(DB_FILE) as conn:
+        if not validate_session(conn, st.session_state.get("session_token")):
+            st.session_state.logged_in = False
+
+if not st.session_state.logged_in:
+    st.error("You must be logged in.")
+    if st.button("Go to Login"):
+        st.switch_page("Home.py")
+    st.stop()
+
+# Admins only (role comes from users.txt, like the login itself)
+_, role = load_user_index().get(st.session_state.get("username"), (None, "user"))
+if role.strip().lower() != "admin":
+    st.error("⛔ The query monitor is only available to admins.")
+    st.stop()
+
+# ---------- Streamlit Page Config ----------
+st.set_page_config(page_title="Wave - Query Monitor", layout="wide", page_icon="logo.png")
+st.markdown(
+    """<h1 style='text-align: center; color: #1f77b4; font-family: "Segoe UI", sans-serif;'>
+    Query Monitor
+    </h1>""",
+    unsafe_allow_html=True
+)
+
+# ------------------- SIDEBAR -------------------
+stats = query_log_stats()
+threshold = st.sidebar.number_input("Slow query threshold (ms)", min_value=1.0,
+                                    value=float(stats["slow_ms"]), step=10.0)
+recording = st.sidebar.checkbox("Record queries", value=stats["enabled"])
+if threshold != stats["slow_ms"] or recording != stats["enabled"]:
+    set_slow_query_threshold(threshold)
+    enable_query_log(recording)
+    st.rerun()
+
+if st.sidebar.button("🗑 Clear slow query log"):
+    with page_connection(DB_FILE) as conn:
+        removed = clear_slow_query_log(conn)
+    st.sidebar.success(f"Removed {removed} rows.")
+
+# ------------------- COUNTERS -------------------
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Queries recorded", f"{stats['recorded']:,}")
+col2.metric("Slow queries", f"{stats['slow']:,}")
+col3.metric("Waiting to be logged", stats["pending_writes"])
+col4.metric("Dropped / failed writes", stats["dropped"] + stats["write_errors"])
+
+tab1, tab2, tab3, tab4 = st.tabs(["🐢 Top Offenders", "🕒 Recent Slow Queries",
+                                  "📡 Live (this process)", "🔌 Pool & Cache"])
+
+# ------------------- SLOW QUERY LOG -------------------
+flush_slow_query_log(timeout=1)
+
+with tab1:
+    st.subheader("Slowest statements by total time")
+    with page_connection(DB_FILE) as conn:
+        offenders = get_slow_query_offenders(conn)
+    if offenders.empty:
+        st.info(f"No statement has taken longer than {stats['slow_ms']:.0f} ms yet.")
+    else:
+        st.dataframe(offenders, use_container_width=True, hide_index=True)
+
+with tab2:
+    st.subheader("Latest slow statements")
+    with page_connection(DB_FILE) as conn:
+        slow = get_slow_queries(conn, limit=200)
+    if slow.empty:
+        st.info("The slow query log is empty.")
+    else:
+        st.dataframe(slow, use_container_width=True, hide_index=True)
+
+# ------------------- RING BUFFER -------------------
+with tab3:
+    st.subheader(f"Last {stats['buffered']} statements run by this server")
+    grouped = pd.DataFrame(query_stats())
+    if grouped.empty:
+        st.info("No statements recorded yet.")
+    else:
+        st.dataframe(grouped[["fingerprint", "calls", "total_ms", "avg_ms", "max_ms", "rows", "errors"]],
+                     use_container_width=True, hide_index=True)
+
+        recent = pd.DataFrame(recent_queries(limit=100))
+        recent["at"] = recent["at"].map(lambda t: datetime.fromtimestamp(t).strftime("%H:%M:%S"))
+        with st.expander("Most recent 100 statements"):
+            st.dataframe(recent[["at", "ms", "rows", "params", "sql", "error"]],
+                         use_container_width=True, hide_index=True)
+
+# ------------------- POOL & CACHE -------------------
+with tab4:
+    st.subheader("Connection pools")
+    st.dataframe(pd.DataFrame(pool_stats()), use_container_width=True, hide_index=True)
+
+    st.subheader("Read cache")
+    cache = cache_stats()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Hit ratio", f"{cache['hit_ratio']:.1%}")
+    c2.metric("Entries", cache["entries"])
+    c3.metric("Hits / misses", f"{cache['hits']:,} / {cache['misses']:,}")
+    c4.metric("Evictions", cache["evictions"])
+
+    st.subheader("Chat write-behind queue")
+    chat = chat_writer_stats()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Messages written", f"{chat['written']:,}")
+    c2.metric("Batches", f"{chat['batches']:,}")
+    c3.metric("Waiting", chat["pending"])
+    c4.metric("Failed", chat["failed"])
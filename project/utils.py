@@ -14,28 +14,31 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 sys.path.append(BASE_DIR)
 
 # ------------  Modules ------------
-from app.data.db import connect_database, load_all_csv_data
-from app.data.schema import create_all_tables
+from app.data.db import load_all_csv_data
+from app.data.schema import ensure_schema
+from app.data.cache import cached_read
+from database import page_connection
 
 # Cybersecurity
 from app.data.incidents import (
-     insert_incident, get_all_incidents,
+     insert_incident, get_incidents_page, search_incidents, count_incidents, INCIDENT_SORT_KEYS,
     update_incident_status, delete_incident,
+    update_incident_status_many, delete_incidents_many,
     get_incidents_by_type_count, get_high_severity_by_status,
     get_incident_types_with_many_cases, get_incident_trend, unresolved_incidents_by_type
 )
 
 # IT Ops
 from app.data.tickets import (
-    insert_ticket, get_all_tickets,
-    update_ticket, delete_ticket,
+    insert_ticket, get_tickets_page, search_tickets, count_tickets, TICKET_SORT_KEYS,
+    update_ticket, delete_ticket, update_tickets_many, delete_tickets_many,
     get_unresolved_tickets, get_ticket_delays
 )
 
 # Data Science
 from app.data.datasets import (
-     insert_dataset, update_dataset, get_all_datasets,
-     list_datasets_by_source, delete_dataset,
+     insert_dataset, update_dataset, get_datasets_page, count_datasets, DATASET_SORT_KEYS,
+     list_datasets_by_source, delete_dataset, update_datasets_many, delete_datasets_many,
      get_top_recent_updates, display_resource_usage
 )
 
@@ -43,8 +46,65 @@ from app.data.datasets import (
 DATA_DIR = os.path.join(BASE_DIR, "DATA")
 DB_FILE = os.path.join(DATA_DIR, "intelligence_platform.db")
 
-conn = connect_database(DB_FILE)
-create_all_tables(conn)
+with page_connection(DB_FILE) as conn:
+    ensure_schema(conn)
+
+# ------------------- PAGINATION -------------------
+# table -> (page fetcher, row counter, sortable columns)
+PAGED_TABLES = {
+    "cyber_incidents": (get_incidents_page, count_incidents, INCIDENT_SORT_KEYS),
+    "it_tickets": (get_tickets_page, count_tickets, TICKET_SORT_KEYS),
+    "datasets_metadata": (get_datasets_page, count_datasets, DATASET_SORT_KEYS),
+}
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def paged_records(conn, table_name, key, filters=None):
+    """
+    Show sort/page controls and return only the visible page of a table.
+
+    The cursors of the pages already visited are kept in session_state so
+    "Previous" can step back; changing the sort, page size or filters
+    starts over. Filters are evaluated by SQLite (see db.build_filter).
+
+    Args:
+        conn: Database connection
+        table_name: One of PAGED_TABLES
+        key: Unique widget key prefix (one per component on the page)
+        filters: Optional dict of column -> filter value
+
+    Returns:
+        pandas.DataFrame: Rows of the current page
+    """
+    get_page, count, sort_keys = PAGED_TABLES[table_name]
+
+    col1, col2, col3 = st.columns(3)
+    sort_key = col1.selectbox("Sort by", sort_keys, key=f"{key}_sort")
+    page_size = col2.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_size")
+    descending = col3.checkbox("Descending", key=f"{key}_desc")
+
+    # Start from the first page whenever the ordering or filters change
+    view = (sort_key, page_size, descending, repr(filters))
+    if st.session_state.get(f"{key}_view") != view:
+        st.session_state[f"{key}_view"] = view
+        st.session_state[f"{key}_cursors"] = [None]
+    cursors = st.session_state[f"{key}_cursors"]
+
+    df, next_cursor = cached_read(conn, table_name, get_page, page_size, cursors[-1],
+                                  sort_key, descending, filters=filters)
+    total = cached_read(conn, table_name, count, filters=filters)
+    pages = max(1, -(-total // page_size))
+
+    prev_col, info_col, next_col = st.columns([1, 4, 1])
+    if prev_col.button("⬅ Previous", key=f"{key}_prev", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    info_col.caption(f"Page {len(cursors)} of {pages} · {total} records")
+    if next_col.button("Next ➡", key=f"{key}_next", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        st.rerun()
+
+    return df
 
 
 # ------------------- VIEW RECORDS -------------------
@@ -63,24 +123,79 @@ def view_records(conn, table_name):
     )
 # work on the html
         if table_name == "cyber_incidents":
-            df = get_all_incidents(conn)
             st.markdown('<div class="table-header">🔒 Cyber Incidents</div>', unsafe_allow_html=True)
 
         elif table_name == "it_tickets":
-            df = get_all_tickets(conn)
             st.markdown('<div class="table-header">💻 IT Tickets</div>', unsafe_allow_html=True)
 
         elif table_name == "datasets_metadata":
-            df = get_all_datasets(conn)
             st.markdown('<div class="table-header">📊 Data Science Datasets</div>', unsafe_allow_html=True)
 
         else:
             st.error("Unknown table")
             return
+        # Only the visible page is queried and sent to the browser
+        df = paged_records(conn, table_name, key=f"view_{table_name}")
         st.dataframe(df, use_container_width=True)
 
 
 
+# ------------------- SEARCH -------------------
+# table -> (search function, label)
+SEARCHABLE_TABLES = {
+    "cyber_incidents": (search_incidents, "incident descriptions"),
+    "it_tickets": (search_tickets, "ticket subjects and descriptions"),
+}
+SEARCH_PAGE_SIZE = 10
+
+
+def search_records(conn, table_name):
+    """
+    Search box backed by the FTS5 indexes, with ranked, paged results.
+
+    Args:
+        conn: Database connection
+        table_name: One of SEARCHABLE_TABLES (others show nothing)
+    """
+    if table_name not in SEARCHABLE_TABLES:
+        return
+    search, label = SEARCHABLE_TABLES[table_name]
+
+    text = st.text_input(f"🔎 Search {label}", key=f"search_{table_name}")
+    if not text.strip():
+        return
+
+    # Back to the first page when the search text changes
+    page_key = f"search_{table_name}_page"
+    if st.session_state.get(f"{page_key}_text") != text:
+        st.session_state[f"{page_key}_text"] = text
+        st.session_state[page_key] = 1
+    page = st.session_state[page_key]
+
+    results, total = search(conn, text, page=page, page_size=SEARCH_PAGE_SIZE)
+    if total == 0:
+        st.info("No matches found.")
+        return
+
+    pages = -(-total // SEARCH_PAGE_SIZE)
+    st.caption(f"{total} matches · page {page} of {pages}")
+    for row in results.to_dict("records"):
+        if table_name == "cyber_incidents":
+            st.markdown(f"**#{row['id']}** · {row['date']} · {row['incident_type']} · "
+                        f"{row['severity']} · {row['status']}  \n{row['snippet']}")
+        else:
+            st.markdown(f"**{row['ticket_id']}** · {row['subject']} · {row['priority']} · "
+                        f"{row['status']}  \n{row['snippet']}")
+
+    prev_col, _, next_col = st.columns([1, 4, 1])
+    if prev_col.button("⬅ Previous", key=f"{page_key}_prev", disabled=page == 1):
+        st.session_state[page_key] -= 1
+        st.rerun()
+    if next_col.button("Next ➡", key=f"{page_key}_next", disabled=page >= pages):
+        st.session_state[page_key] += 1
+        st.rerun()
+
+
 # ------------------- ADD NEW RECORD -------------------
 def add_new_record(conn, table_name):
     if table_name == "cyber_incidents":
@@ -140,18 +255,18 @@ def update_delete_record(conn, table_name):
 
     # ------------------- Get Records -------------------
     if table_name == "cyber_incidents":
-        records = get_all_incidents(conn)
         key = "id"
     elif table_name == "it_tickets":
-        records = get_all_tickets(conn)
         key = "ticket_id"
     elif table_name == "datasets_metadata":
-        records = get_all_datasets(conn)
         key = "dataset_name"
     else:
         st.error("Unknown table name")
         return
 
+    # Pick from the current page only instead of every id in the table
+    records = paged_records(conn, table_name, key=f"edit_{table_name}")
+
     if records.empty:
         st.info("No records available to update or delete.")
         return
@@ -234,4 +349,78 @@ def update_delete_record(conn, table_name):
             st.error(f"Action failed: {e}")
 
 
+# ------------------- BULK ACTIONS -------------------
+def bulk_actions(conn, table_name):
+    """
+    Multi-select records of the current page and update or delete them
+    in one transaction.
+    """
+    if table_name == "cyber_incidents":
+        key = "id"
+    elif table_name == "it_tickets":
+        key = "ticket_id"
+    elif table_name == "datasets_metadata":
+        key = "dataset_name"
+    else:
+        st.error("Unknown table name")
+        return
+
+    st.subheader("Bulk Actions")
+
+    # Outcome of the last bulk action (kept across the rerun below)
+    result = st.session_state.pop(f"bulk_result_{table_name}", None)
+    if result:
+        st.success(result)
+
+    records = paged_records(conn, table_name, key=f"bulk_{table_name}")
+    if records.empty:
+        st.info("No records available for bulk actions.")
+        return
+
+    ids = records[key].tolist()
+    select_all = st.checkbox("Select every record on this page", key=f"bulk_all_{table_name}")
+    selected = st.multiselect(f"Select records ({key})", ids,
+                              default=ids if select_all else [], key=f"bulk_pick_{table_name}_{select_all}")
+
+    with st.form(f"bulk_form_{table_name}"):
+        action = st.radio("Action", ["Update", "Delete"], horizontal=True)
+        if table_name == "datasets_metadata":
+            new_value = st.number_input("Record Count", min_value=0, value=0, step=1)
+        else:
+            status_options = ["Open", "In Progress", "Closed", "Resolved", "Investigating"]
+            new_value = st.selectbox("Status", status_options)
+        submit = st.form_submit_button(f"Apply to {len(selected)} selected")
+
+    if not submit:
+        return
+    if not selected:
+        st.warning("Select at least one record first.")
+        return
+
+    # ------------------- Perform Action -------------------
+    if action == "Update":
+        if table_name == "cyber_incidents":
+            outcomes = update_incident_status_many(conn, selected, new_value)
+        elif table_name == "it_tickets":
+            outcomes = update_tickets_many(conn, selected, new_value)
+        else:
+            outcomes = update_datasets_many(conn, [(name, int(new_value)) for name in selected])
+        verb = "updated"
+    else:
+        if table_name == "cyber_incidents":
+            outcomes = delete_incidents_many(conn, selected)
+        elif table_name == "it_tickets":
+            outcomes = delete_tickets_many(conn, selected)
+        else:
+            outcomes = delete_datasets_many(conn, selected)
+        verb = "deleted"
+
+    missed = [str(k) for k, done in zip(selected, outcomes) if not done]
+    message = f"{sum(outcomes)} of {len(selected)} records {verb}."
+    if missed:
+        message += f" Not changed: {', '.join(missed)}"
+    st.session_state[f"bulk_result_{table_name}"] = message
+    st.rerun()
+
+
 